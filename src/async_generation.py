@@ -0,0 +1,130 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class GenerationCancelled(Exception):
+    """请求已被更新的命令取代，由进度回调在后台线程中抛出以提前结束生成"""
+
+class AsyncTreeGenerator:
+    """
+    在后台线程中生成行为树，避免LLM请求阻塞游戏循环
+
+    同一时间只关心最新的一条命令：新命令提交后，旧请求如果还没开始就被取消，
+    已经在执行的请求结果会被丢弃；流式模式下旧请求在下一次报告进度时抛出GenerationCancelled，
+    关闭响应流并让出后台线程，不会让新命令等待旧请求完整返回。结果通过poll()在主线程取回，
+    由调用方在两帧之间替换行为树。
+
+    流式模式下生成函数还会收到一个进度回调，后台线程通过它报告部分结果，
+    主线程用poll_progress()取回最新的一条，用于提前预览或切换行为树。
+    """
+
+    def __init__(self, generate_fn, max_workers=1, streaming=False):
+        """
+        参数:
+            generate_fn: 生成函数，接受自然语言命令并返回行为树JSON字符串；
+                流式模式下额外接受进度回调on_progress(kind, data)
+            max_workers: 后台线程数量
+            streaming: 是否向生成函数传入进度回调
+        """
+        self.generate_fn = generate_fn
+        self.streaming = streaming
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="tree-generator")
+        self.request_id = 0
+        self.future = None
+        self.pending_command = None
+        self.started_at = None
+
+        # 最新一条未取回的进度：(请求编号, 类型, 数据)，由后台线程写入
+        self.progress = None
+        self.progress_lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """是否有尚未取回结果的请求"""
+        return self.future is not None
+
+    def elapsed(self):
+        """当前请求已经等待的秒数"""
+        if self.started_at is None:
+            return 0.0
+        return time.monotonic() - self.started_at
+
+    def submit(self, command):
+        """
+        提交一条命令，取代之前未完成的请求
+
+        返回:
+            请求编号
+        """
+        self.cancel()
+        self.request_id += 1
+        self.pending_command = command
+        self.started_at = time.monotonic()
+        self.future = self.executor.submit(self._run, self.request_id, command)
+        return self.request_id
+
+    def _run(self, request_id, command):
+        """在后台线程中执行生成，开始前已被取代的请求直接放弃"""
+        if request_id != self.request_id:
+            raise GenerationCancelled(command)
+        if self.streaming:
+            return self.generate_fn(command, lambda kind, data: self._report(request_id, kind, data))
+        return self.generate_fn(command)
+
+    def _report(self, request_id, kind, data):
+        """后台线程报告进度；请求已被取代或取消时抛出GenerationCancelled，中断流式生成"""
+        with self.progress_lock:
+            if request_id != self.request_id or self.future is None:
+                raise GenerationCancelled(request_id)
+            self.progress = (request_id, kind, data)
+
+    def poll_progress(self):
+        """
+        在主线程中取回最新的进度，中间的进度会被后来的覆盖
+
+        返回:
+            没有新进度时返回None，否则返回(命令, 类型, 数据)
+        """
+        with self.progress_lock:
+            progress = self.progress
+            self.progress = None
+        if progress is None or progress[0] != self.request_id:
+            return None
+        return self.pending_command, progress[1], progress[2]
+
+    def cancel(self):
+        """取消当前请求；已经开始的非流式请求无法中断，但其结果会被丢弃"""
+        if self.future is not None:
+            self.future.cancel()
+        with self.progress_lock:
+            self.future = None
+            self.progress = None
+        self.pending_command = None
+        self.started_at = None
+
+    def poll(self):
+        """
+        在主线程中检查最新请求是否完成
+
+        返回:
+            未完成时返回None，完成时返回(命令, 结果, 异常)，结果只会返回一次
+        """
+        future = self.future
+        if future is None or not future.done():
+            return None
+
+        command = self.pending_command
+        self.future = None
+        self.pending_command = None
+        self.started_at = None
+
+        error = future.exception()
+        if error is not None:
+            return command, None, error
+        return command, future.result(), None
+
+    def shutdown(self):
+        """退出时丢弃所有请求，不等待正在执行的网络调用"""
+        self.cancel()
+        self.executor.shutdown(wait=False)
@@ -1,146 +1,209 @@
-from .node import Node, NodeStatus
-import random
+from .node import Node, NodeStatus, DEFAULT_DT
+
+def ticks_until(elapsed, duration, step=DEFAULT_DT):
+    """返回计时器从elapsed每次累加step直到不小于duration所需的tick数"""
+    ticks = 0
+    while elapsed < duration:
+        elapsed += step
+        ticks += 1
+    return ticks
+
+def advance_timer(elapsed, ticks, step=DEFAULT_DT):
+    """按tick逐次累加step，保证与逐帧执行的浮点结果一致"""
+    for _ in range(ticks):
+        elapsed += step
+    return elapsed
+
+def move_chance(chance, dt=DEFAULT_DT):
+    """
+    把每DEFAULT_DT秒一次的移动概率换算为本次tick的概率
+
+    模拟频率不同时，单位游戏时间内的期望移动次数保持不变；dt为DEFAULT_DT时就是chance本身。
+    """
+    return min(1.0, chance * (dt / DEFAULT_DT))
 
 class Sleep(Node):
+    __slots__ = ("cat", "sleep_duration", "sleep_time")
+    
     def __init__(self, name, cat):
         super().__init__(name)
         self.cat = cat
-        self.sleep_duration = random.randint(3, 8)
+        self.sleep_duration = self.cat.rng.randint(3, 8)
         self.sleep_time = 0
         
-    def tick(self):
+    def tick(self, dt=DEFAULT_DT):
         if self.sleep_time >= self.sleep_duration:
             self.reset()
             return NodeStatus.SUCCESS
             
         self.cat.state = "sleeping"
-        self.sleep_time += 0.1
+        self.sleep_time += dt
         return NodeStatus.RUNNING
         
+    def wake_in(self, dt=DEFAULT_DT):
+        # 只有已经开始计时（状态已设置）才能安全跳过后续tick
+        if self.sleep_time <= 0:
+            return 0
+        return ticks_until(self.sleep_time, self.sleep_duration, dt)
+        
+    def fast_forward(self, ticks, dt=DEFAULT_DT):
+        self.sleep_time = advance_timer(self.sleep_time, ticks, dt)
+        
     def reset(self):
         super().reset()
         self.sleep_time = 0
-        self.sleep_duration = random.randint(3, 8)
+        self.sleep_duration = self.cat.rng.randint(3, 8) if self.param is None else self.param
 
 class Wander(Node):
+    __slots__ = ("cat", "move_cooldown")
+    
     def __init__(self, name, cat):
         super().__init__(name)
         self.cat = cat
         self.move_cooldown = 0
         
-    def tick(self):
+    def tick(self, dt=DEFAULT_DT):
         if self.move_cooldown <= 0:
-            dx = random.choice([-1, 0, 1])
-            dy = random.choice([-1, 0, 1])
+            dx = self.cat.rng.choice([-1, 0, 1])
+            dy = self.cat.rng.choice([-1, 0, 1])
             self.cat.move(dx, dy)
-            self.move_cooldown = random.uniform(0.5, 2.0)
+            self.move_cooldown = self.cat.rng.uniform(0.5, 2.0)
             
-        self.move_cooldown -= 0.1
+        self.move_cooldown -= dt
         self.cat.state = "wandering"
         return NodeStatus.RUNNING
         
     def reset(self):
         super().reset()
-        self.move_cooldown = 0
+        self.move_cooldown = 0 if self.param is None else self.param
 
 class Play(Node):
+    __slots__ = ("cat", "play_duration", "play_time")
+    
     def __init__(self, name, cat):
         super().__init__(name)
         self.cat = cat
-        self.play_duration = random.randint(2, 5)
+        self.play_duration = self.cat.rng.randint(2, 5)
         self.play_time = 0
         
-    def tick(self):
+    def tick(self, dt=DEFAULT_DT):
         if self.play_time >= self.play_duration:
             self.reset()
             return NodeStatus.SUCCESS
             
-        if random.random() < 0.3:
-            dx = random.choice([-2, -1, 1, 2])
-            dy = random.choice([-2, -1, 1, 2])
+        if self.cat.rng.random() < move_chance(0.3, dt):
+            dx = self.cat.rng.choice([-2, -1, 1, 2])
+            dy = self.cat.rng.choice([-2, -1, 1, 2])
             self.cat.move(dx, dy)
             
         self.cat.state = "playing"
-        self.play_time += 0.1
+        self.play_time += dt
         return NodeStatus.RUNNING
         
     def reset(self):
         super().reset()
         self.play_time = 0
-        self.play_duration = random.randint(2, 5)
+        self.play_duration = self.cat.rng.randint(2, 5) if self.param is None else self.param
 
 class ObserveItems(Node):
     """观察并检索周围物品"""
+    __slots__ = ("cat", "observe_time", "observe_duration")
+    
     def __init__(self, name, cat):
         super().__init__(name)
         self.cat = cat
         self.observe_time = 0
-        self.observe_duration = random.uniform(0.5, 1.5)
+        self.observe_duration = self.cat.rng.uniform(0.5, 1.5)
         
-    def tick(self):
+    def tick(self, dt=DEFAULT_DT):
         if self.observe_time >= self.observe_duration:
             self.reset()
             return NodeStatus.SUCCESS
             
         self.cat.state = "observing"
-        self.observe_time += 0.1
+        self.observe_time += dt
         return NodeStatus.RUNNING
         
+    def wake_in(self, dt=DEFAULT_DT):
+        if self.observe_time <= 0:
+            return 0
+        return ticks_until(self.observe_time, self.observe_duration, dt)
+        
+    def fast_forward(self, ticks, dt=DEFAULT_DT):
+        self.observe_time = advance_timer(self.observe_time, ticks, dt)
+        
     def reset(self):
         super().reset()
         self.observe_time = 0
-        self.observe_duration = random.uniform(0.5, 1.5)
+        self.observe_duration = self.cat.rng.uniform(0.5, 1.5) if self.param is None else self.param
 
 class RandomWait(Node):
     """随机等待"""
+    __slots__ = ("cat", "wait_time", "wait_duration")
+    
     def __init__(self, name, cat):
         super().__init__(name)
         self.cat = cat
         self.wait_time = 0
-        self.wait_duration = random.uniform(1.0, 3.0)
+        self.wait_duration = self.cat.rng.uniform(1.0, 3.0)
         
-    def tick(self):
+    def tick(self, dt=DEFAULT_DT):
         if self.wait_time >= self.wait_duration:
             self.reset()
             return NodeStatus.SUCCESS
             
         self.cat.state = "waiting"
-        self.wait_time += 0.1
+        self.wait_time += dt
         return NodeStatus.RUNNING
         
+    def wake_in(self, dt=DEFAULT_DT):
+        if self.wait_time <= 0:
+            return 0
+        return ticks_until(self.wait_time, self.wait_duration, dt)
+        
+    def fast_forward(self, ticks, dt=DEFAULT_DT):
+        self.wait_time = advance_timer(self.wait_time, ticks, dt)
+        
     def reset(self):
         super().reset()
         self.wait_time = 0
-        self.wait_duration = random.uniform(1.0, 3.0)
+        self.wait_duration = self.cat.rng.uniform(1.0, 3.0) if self.param is None else self.param
 
 class MoveToTarget(Node):
-    """移动到目标点"""
+    """移动到目标点，每DEFAULT_DT秒游戏时间走一格"""
+    __slots__ = ("cat", "target_x", "target_y", "move_steps", "max_steps", "move_progress")
+    
     def __init__(self, name, cat):
         super().__init__(name)
         self.cat = cat
         self.target_x = None
         self.target_y = None
         self.move_steps = 0
-        self.max_steps = random.randint(5, 15)
-        
-    def tick(self):
-        if self.target_x is None or self.move_steps >= self.max_steps:
-            # 设置新的随机目标
-            self.target_x = random.randint(5, 75)
-            self.target_y = random.randint(5, 20)
-            self.move_steps = 0
-            
-        dx = 1 if self.target_x > self.cat.x else -1 if self.target_x < self.cat.x else 0
-        dy = 1 if self.target_y > self.cat.y else -1 if self.target_y < self.cat.y else 0
+        self.max_steps = self.cat.rng.randint(5, 15)
+        # 不足一格的移动进度，累积到下一次tick
+        self.move_progress = 0.0
         
-        self.cat.move(dx, dy)
+    def tick(self, dt=DEFAULT_DT):
         self.cat.state = "moving"
-        self.move_steps += 1
-        
-        # 检查是否到达目标点附近
-        if abs(self.cat.x - self.target_x) <= 1 and abs(self.cat.y - self.target_y) <= 1:
-            self.reset()
-            return NodeStatus.SUCCESS
+        self.move_progress += dt / DEFAULT_DT
+        while self.move_progress >= 1.0:
+            self.move_progress -= 1.0
+            if self.target_x is None or self.move_steps >= self.max_steps:
+                # 设置新的随机目标
+                self.target_x = self.cat.rng.randint(5, 75)
+                self.target_y = self.cat.rng.randint(5, 20)
+                self.move_steps = 0
+                
+            dx = 1 if self.target_x > self.cat.x else -1 if self.target_x < self.cat.x else 0
+            dy = 1 if self.target_y > self.cat.y else -1 if self.target_y < self.cat.y else 0
+            
+            self.cat.move(dx, dy)
+            self.move_steps += 1
+            
+            # 检查是否到达目标点附近
+            if abs(self.cat.x - self.target_x) <= 1 and abs(self.cat.y - self.target_y) <= 1:
+                self.reset()
+                return NodeStatus.SUCCESS
             
         return NodeStatus.RUNNING
         
@@ -149,84 +212,99 @@ class MoveToTarget(Node):
         self.target_x = None
         self.target_y = None
         self.move_steps = 0
-        self.max_steps = random.randint(5, 15)
+        self.move_progress = 0.0
+        self.max_steps = self.cat.rng.randint(5, 15)
 
 class Interact(Node):
     """互动"""
+    __slots__ = ("cat", "interact_time", "interact_duration")
+    
     def __init__(self, name, cat):
         super().__init__(name)
         self.cat = cat
         self.interact_time = 0
-        self.interact_duration = random.uniform(1.0, 2.0)
+        self.interact_duration = self.cat.rng.uniform(1.0, 2.0)
         
-    def tick(self):
+    def tick(self, dt=DEFAULT_DT):
         if self.interact_time >= self.interact_duration:
             self.reset()
             return NodeStatus.SUCCESS
             
-        if random.random() < 0.2:
-            dx = random.choice([-1, 0, 1])
-            dy = random.choice([-1, 0, 1])
+        if self.cat.rng.random() < move_chance(0.2, dt):
+            dx = self.cat.rng.choice([-1, 0, 1])
+            dy = self.cat.rng.choice([-1, 0, 1])
             self.cat.move(dx, dy)
             
         self.cat.state = "interacting"
-        self.interact_time += 0.1
+        self.interact_time += dt
         return NodeStatus.RUNNING
         
     def reset(self):
         super().reset()
         self.interact_time = 0
-        self.interact_duration = random.uniform(1.0, 2.0)
+        self.interact_duration = self.cat.rng.uniform(1.0, 2.0)
 
 class ObserveAndWait(Node):
     """观望等待"""
+    __slots__ = ("cat", "observe_time", "observe_duration")
+    
     def __init__(self, name, cat):
         super().__init__(name)
         self.cat = cat
         self.observe_time = 0
-        self.observe_duration = random.uniform(2.0, 4.0)
+        self.observe_duration = self.cat.rng.uniform(2.0, 4.0)
         
-    def tick(self):
+    def tick(self, dt=DEFAULT_DT):
         if self.observe_time >= self.observe_duration:
             self.reset()
             return NodeStatus.SUCCESS
             
         self.cat.state = "observing_wait"
-        self.observe_time += 0.1
+        self.observe_time += dt
         return NodeStatus.RUNNING
         
+    def wake_in(self, dt=DEFAULT_DT):
+        if self.observe_time <= 0:
+            return 0
+        return ticks_until(self.observe_time, self.observe_duration, dt)
+        
+    def fast_forward(self, ticks, dt=DEFAULT_DT):
+        self.observe_time = advance_timer(self.observe_time, ticks, dt)
+        
     def reset(self):
         super().reset()
         self.observe_time = 0
-        self.observe_duration = random.uniform(2.0, 4.0)
+        self.observe_duration = self.cat.rng.uniform(2.0, 4.0) if self.param is None else self.param
 
 class Explore(Node):
     """探索"""
+    __slots__ = ("cat", "explore_time", "explore_duration", "move_cooldown")
+    
     def __init__(self, name, cat):
         super().__init__(name)
         self.cat = cat
         self.explore_time = 0
-        self.explore_duration = random.uniform(3.0, 6.0)
+        self.explore_duration = self.cat.rng.uniform(3.0, 6.0)
         self.move_cooldown = 0
         
-    def tick(self):
+    def tick(self, dt=DEFAULT_DT):
         if self.explore_time >= self.explore_duration:
             self.reset()
             return NodeStatus.SUCCESS
             
         if self.move_cooldown <= 0:
-            dx = random.choice([-1, -1, 0, 1, 1])  # 更倾向于水平移动
-            dy = random.choice([-1, 0, 0, 1])  # 更倾向于原地或小幅度垂直移动
+            dx = self.cat.rng.choice([-1, -1, 0, 1, 1])  # 更倾向于水平移动
+            dy = self.cat.rng.choice([-1, 0, 0, 1])  # 更倾向于原地或小幅度垂直移动
             self.cat.move(dx, dy)
-            self.move_cooldown = random.uniform(0.3, 0.8)
+            self.move_cooldown = self.cat.rng.uniform(0.3, 0.8)
             
-        self.move_cooldown -= 0.1
+        self.move_cooldown -= dt
         self.cat.state = "exploring"
-        self.explore_time += 0.1
+        self.explore_time += dt
         return NodeStatus.RUNNING
         
     def reset(self):
         super().reset()
         self.explore_time = 0
-        self.explore_duration = random.uniform(3.0, 6.0)
+        self.explore_duration = self.cat.rng.uniform(3.0, 6.0)
         self.move_cooldown = 0 
\ No newline at end of file
@@ -0,0 +1,287 @@
+from array import array
+
+from .node import NodeStatus, DEFAULT_DT
+from .composite import Sequence, Selector
+from .actions import move_chance
+from .rng import AgentStreams, resolve_seed
+
+# 批量模拟中使用的状态名称，下标即为状态编码
+STATE_NAMES = [
+    "idle", "sleeping", "playing", "wandering", "observing", "waiting",
+    "moving", "interacting", "observing_wait", "exploring"
+]
+STATE_CODES = {name: i for i, name in enumerate(STATE_NAMES)}
+
+# 叶子节点操作码
+OP_SUCCEED = 0       # 空的Sequence，立即成功
+OP_FAIL = 1          # 空的Selector，立即失败
+OP_TIMER = 2         # 纯计时节点: Sleep, ObserveItems, RandomWait, ObserveAndWait
+OP_WANDER = 3
+OP_PLAY = 4
+OP_INTERACT = 5
+OP_EXPLORE = 6
+OP_MOVE = 7
+
+# 动作类名 -> (操作码, 状态名, 时长范围, 是否为整数时长)
+# 时长范围与actions.py中各节点的random调用保持一致
+LEAF_SPECS = {
+    "Sleep": (OP_TIMER, "sleeping", (3, 8), True),
+    "ObserveItems": (OP_TIMER, "observing", (0.5, 1.5), False),
+    "RandomWait": (OP_TIMER, "waiting", (1.0, 3.0), False),
+    "ObserveAndWait": (OP_TIMER, "observing_wait", (2.0, 4.0), False),
+    "Wander": (OP_WANDER, "wandering", None, False),
+    "Play": (OP_PLAY, "playing", (2, 5), True),
+    "Interact": (OP_INTERACT, "interacting", (1.0, 2.0), False),
+    "Explore": (OP_EXPLORE, "exploring", (3.0, 6.0), False),
+    "MoveToTarget": (OP_MOVE, "moving", (5, 15), True),
+}
+
+class BatchEngine:
+    """
+    批量行为树引擎：多只猫共享同一棵行为树定义，每只猫的运行状态保存在紧凑数组中
+
+    行为树中的Sequence/Selector都会在完成时重置自己，因此每只猫的全部运行状态
+    可以归结为"当前运行的叶子节点"加上该叶子的计时器。叶子节点返回SUCCESS/FAILURE
+    后跳转到哪个叶子在加载时就能确定，所以复合节点被预先展开成跳转表，
+    每次tick只需要执行一个叶子操作和一次查表。
+
+    JSON中为叶子指定了参数（如Sleep的时长、Wander的冷却时间）时使用该参数，
+    没有指定时才从LEAF_SPECS的时长范围中抽取。
+
+    每只猫有自己的随机数流（见rng.AgentStreams），只由seed和猫的全局编号决定。
+    把猫按编号拆分给多个引擎（first_agent为各分片的起始编号）模拟时，
+    每只猫的轨迹与在一个引擎中模拟完全相同。
+    """
+
+    def __init__(self, root, count, positions=None, width=80, height=24, seed=None, first_agent=0):
+        """
+        参数:
+            root: 行为树根节点（会被所有猫共享，只读取结构）
+            count: 猫的数量
+            positions: 可选的初始坐标列表[(x, y), ...]，默认放在区域中心
+            width: 活动区域宽度
+            height: 活动区域高度
+            seed: 随机数种子，None表示从全局random取一个
+            first_agent: 第一只猫的全局编号，分片模拟时使用
+        """
+        self.count = count
+        self.width = width
+        self.height = height
+        self.seed = resolve_seed(seed)
+        self.first_agent = first_agent
+
+        self._compile(root)
+
+        if positions is None:
+            positions = [(width // 2, height // 2)] * count
+        self._init_state(positions)
+
+        # 统计信息
+        self.tick_count = 0
+        self.node_ticks = 0
+
+    def _init_state(self, positions):
+        """分配每只猫的运行状态数组"""
+        count = self.count
+        self.streams = AgentStreams(self.seed, count, self.first_agent)
+        self.x = array('i', (p[0] for p in positions))
+        self.y = array('i', (p[1] for p in positions))
+        self.state = array('b', [STATE_CODES["idle"]]) * count
+        self.cursor = array('i', [self.first_leaf]) * count
+        self.elapsed = array('d', [0.0]) * count
+        self.duration = array('d', [0.0]) * count
+        self.cooldown = array('d', [0.0]) * count
+        self.target_x = array('i', [-1]) * count
+        self.target_y = array('i', [-1]) * count
+        self.steps = array('i', [0]) * count
+
+        for i in range(count):
+            self._enter_leaf(i, self.first_leaf)
+
+    @classmethod
+    def from_cat(cls, cat, count, **kwargs):
+        """使用某只猫当前的行为树作为共享定义创建批量引擎"""
+        return cls(cat.root, count, **kwargs)
+
+    def _compile(self, root):
+        """将节点对象图展开为叶子表和跳转表"""
+        leaves = []
+        leaf_index = {}
+
+        def collect(node, parent_path):
+            path = parent_path + [node]
+            is_composite = isinstance(node, (Sequence, Selector))
+            if is_composite and node.children:
+                for child in node.children:
+                    collect(child, path)
+                return
+            if is_composite:
+                spec = (OP_SUCCEED if isinstance(node, Sequence) else OP_FAIL, None, None, False)
+            else:
+                spec = LEAF_SPECS.get(node.__class__.__name__)
+                if spec is None:
+                    raise ValueError(f"批量引擎不支持的节点类型: {node.__class__.__name__}")
+            leaf_index[id(node)] = len(leaves)
+            leaves.append((node, path, spec))
+
+        collect(root, [])
+
+        def first_leaf(node):
+            while isinstance(node, (Sequence, Selector)) and node.children:
+                node = node.children[0]
+            return leaf_index[id(node)]
+
+        def resolve(path, status):
+            """从叶子向上回溯，返回下一次tick将执行的叶子"""
+            for depth in range(len(path) - 1, 0, -1):
+                parent, child = path[depth - 1], path[depth]
+                index = next(i for i, c in enumerate(parent.children) if c is child)
+                # Sequence在子节点成功时继续，Selector在子节点失败时继续
+                proceed = NodeStatus.SUCCESS if isinstance(parent, Sequence) else NodeStatus.FAILURE
+                if status != proceed:
+                    continue
+                if index + 1 < len(parent.children):
+                    return first_leaf(parent.children[index + 1])
+                # 最后一个子节点也完成了，父节点以相同结果结束
+            # 根节点结束后重置，下一次从头开始
+            return first_leaf(root)
+
+        self.leaf_nodes = [leaf[0] for leaf in leaves]
+        self.leaf_op = array('b', (leaf[2][0] for leaf in leaves))
+        self.leaf_state = array('b', (STATE_CODES[leaf[2][1]] if leaf[2][1] else 0 for leaf in leaves))
+        self.leaf_range = [leaf[2][2] for leaf in leaves]
+        self.leaf_int_range = [leaf[2][3] for leaf in leaves]
+        # JSON中指定的参数（Node.param）：带时长范围的叶子每次进入都使用该时长而不再抽取，
+        # Wander的参数作为进入时的冷却时间
+        self.leaf_fixed = [float(leaf[0].param) if leaf[0].param is not None and leaf[2][2] else None
+                           for leaf in leaves]
+        self.leaf_cooldown = array('d', (
+            float(leaf[0].param) if leaf[0].param is not None and leaf[2][0] == OP_WANDER else 0.0
+            for leaf in leaves))
+        # 每个叶子的路径长度，即一次tick会经过的节点数
+        self.leaf_depth = array('i', (len(leaf[1]) for leaf in leaves))
+        self.next_on_success = array('i', (resolve(leaf[1], NodeStatus.SUCCESS) for leaf in leaves))
+        self.next_on_failure = array('i', (resolve(leaf[1], NodeStatus.FAILURE) for leaf in leaves))
+        self.first_leaf = first_leaf(root)
+
+    def _draw(self, i, leaf):
+        low, high = self.leaf_range[leaf]
+        if self.leaf_int_range[leaf]:
+            return self.streams.randint(i, low, high)
+        return self.streams.uniform(i, low, high)
+
+    def _enter_leaf(self, i, leaf):
+        """切换到新的叶子节点并重置其计时器，只有没有指定参数的叶子才抽取时长"""
+        self.cursor[i] = leaf
+        self.elapsed[i] = 0.0
+        self.cooldown[i] = self.leaf_cooldown[leaf]
+        self.target_x[i] = -1
+        self.steps[i] = 0
+        fixed = self.leaf_fixed[leaf]
+        if fixed is not None:
+            self.duration[i] = fixed
+        elif self.leaf_range[leaf] is not None:
+            self.duration[i] = self._draw(i, leaf)
+
+    def tick(self, dt=DEFAULT_DT):
+        """所有猫各执行一次行为树tick，dt为本次推进的行为时间"""
+        streams = self.streams
+        rand = streams.random
+        choice = streams.choice
+        uniform = streams.uniform
+        randint = streams.randint
+        max_x = self.width - 1
+        max_y = self.height - 1
+        xs, ys, states = self.x, self.y, self.state
+        cursor, elapsed, duration, cooldown = self.cursor, self.elapsed, self.duration, self.cooldown
+        target_x, target_y, steps = self.target_x, self.target_y, self.steps
+        leaf_op, leaf_state, leaf_depth = self.leaf_op, self.leaf_state, self.leaf_depth
+        next_on_success, next_on_failure = self.next_on_success, self.next_on_failure
+        enter_leaf = self._enter_leaf
+        # 移动概率和步数按游戏时间换算，与模拟频率无关（见actions.move_chance）
+        steps_per_tick = dt / DEFAULT_DT
+        play_chance = move_chance(0.3, dt)
+        interact_chance = move_chance(0.2, dt)
+        node_ticks = 0
+
+        for i in range(self.count):
+            leaf = cursor[i]
+            op = leaf_op[leaf]
+            node_ticks += leaf_depth[leaf]
+
+            if op == OP_TIMER:
+                if elapsed[i] >= duration[i]:
+                    enter_leaf(i, next_on_success[leaf])
+                    continue
+                elapsed[i] += dt
+            elif op == OP_MOVE:
+                states[i] = leaf_state[leaf]
+                # cooldown用作不足一格的移动进度，每DEFAULT_DT秒走一格
+                cooldown[i] += steps_per_tick
+                while cooldown[i] >= 1.0:
+                    cooldown[i] -= 1.0
+                    if target_x[i] < 0 or steps[i] >= duration[i]:
+                        target_x[i] = randint(i, 5, 75)
+                        target_y[i] = randint(i, 5, 20)
+                        steps[i] = 0
+                    x, y = xs[i], ys[i]
+                    tx, ty = target_x[i], target_y[i]
+                    x = max(0, min(max_x, x + (1 if tx > x else -1 if tx < x else 0)))
+                    y = max(0, min(max_y, y + (1 if ty > y else -1 if ty < y else 0)))
+                    xs[i], ys[i] = x, y
+                    steps[i] += 1
+                    if abs(x - tx) <= 1 and abs(y - ty) <= 1:
+                        enter_leaf(i, next_on_success[leaf])
+                        break
+                continue
+            elif op == OP_WANDER:
+                if cooldown[i] <= 0:
+                    xs[i] = max(0, min(max_x, xs[i] + choice(i, (-1, 0, 1))))
+                    ys[i] = max(0, min(max_y, ys[i] + choice(i, (-1, 0, 1))))
+                    cooldown[i] = uniform(i, 0.5, 2.0)
+                cooldown[i] -= dt
+            elif op == OP_PLAY or op == OP_INTERACT:
+                if elapsed[i] >= duration[i]:
+                    enter_leaf(i, next_on_success[leaf])
+                    continue
+                if op == OP_PLAY:
+                    if rand(i) < play_chance:
+                        xs[i] = max(0, min(max_x, xs[i] + choice(i, (-2, -1, 1, 2))))
+                        ys[i] = max(0, min(max_y, ys[i] + choice(i, (-2, -1, 1, 2))))
+                elif rand(i) < interact_chance:
+                    xs[i] = max(0, min(max_x, xs[i] + choice(i, (-1, 0, 1))))
+                    ys[i] = max(0, min(max_y, ys[i] + choice(i, (-1, 0, 1))))
+                elapsed[i] += dt
+            elif op == OP_EXPLORE:
+                if elapsed[i] >= duration[i]:
+                    enter_leaf(i, next_on_success[leaf])
+                    continue
+                if cooldown[i] <= 0:
+                    xs[i] = max(0, min(max_x, xs[i] + choice(i, (-1, -1, 0, 1, 1))))
+                    ys[i] = max(0, min(max_y, ys[i] + choice(i, (-1, 0, 0, 1))))
+                    cooldown[i] = uniform(i, 0.3, 0.8)
+                cooldown[i] -= dt
+                elapsed[i] += dt
+            elif op == OP_SUCCEED:
+                enter_leaf(i, next_on_success[leaf])
+                continue
+            else:
+                enter_leaf(i, next_on_failure[leaf])
+                continue
+
+            states[i] = leaf_state[leaf]
+
+        self.tick_count += 1
+        self.node_ticks += node_ticks
+
+    def get_state(self, i):
+        """返回第i只猫的状态名称"""
+        return STATE_NAMES[self.state[i]]
+
+    def get_active_node(self, i):
+        """返回第i只猫当前运行的叶子节点（共享定义中的节点对象）"""
+        return self.leaf_nodes[self.cursor[i]]
+
+    def positions(self):
+        """返回所有猫的坐标列表"""
+        return list(zip(self.x, self.y))
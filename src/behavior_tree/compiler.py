@@ -0,0 +1,318 @@
+from array import array
+
+from .node import DEFAULT_DT
+from .actions import ticks_until, advance_timer, move_chance
+from .composite import Selector
+from .registry import NODE_REGISTRY, NodeSpec, TreeValidationError
+from .batch import (
+    LEAF_SPECS, STATE_NAMES, STATE_CODES,
+    OP_TIMER, OP_WANDER, OP_PLAY, OP_INTERACT, OP_EXPLORE, OP_MOVE
+)
+
+# 复合节点操作码（叶子节点操作码与batch.py共用）
+OP_SEQUENCE = 8
+OP_SELECTOR = 9
+
+# 节点返回状态，用整数代替NodeStatus以减少解释器开销
+RUNNING = 0
+SUCCESS = 1
+FAILURE = 2
+
+class CompiledTree:
+    """
+    扁平化的行为树：节点按先序排列，每个节点的子树占据连续的下标区间
+
+    数组字段:
+        op: 节点操作码
+        child_start/child_count: 子节点在child_list中的区间
+        subtree_end: 子树结束下标（不含），用于批量重置
+        parent: 父节点下标，根节点为-1
+        first_leaf: 子树中第一个要执行的叶子（沿第一个子节点下降），进入子树时直接跳转
+        state: 叶子的显示状态（batch.STATE_CODES）
+        range_low/range_high/range_int: 叶子的随机时长范围及是否为整数，没有范围的节点range_high为-1
+        param: JSON参数（时长），NaN表示没有参数，每次进入叶子时重新抽取
+        start_cooldown: 进入叶子时的冷却时间（Wander的参数），其余节点为0
+    """
+
+    def __init__(self):
+        self.op = array('b')
+        self.child_start = array('i')
+        self.child_count = array('i')
+        self.child_list = array('i')
+        self.subtree_end = array('i')
+        self.parent = array('i')
+        self.first_leaf = array('i')
+        self.param = array('d')
+        self.start_cooldown = array('d')
+        # 叶子节点的显示状态和时长范围，编译时从LEAF_SPECS中取出以免tick时查表
+        self.state = array('b')
+        self.range_low = array('d')
+        self.range_high = array('d')
+        self.range_int = array('b')
+        # 只用于显示和调试
+        self.names = []
+        self.types = []
+
+    def __len__(self):
+        return len(self.op)
+
+def _resolve_type(target, name, node_data):
+    """返回已校验节点的(操作码, 动作类名, 节点名称, 参数)，编译器不支持的动作类返回None"""
+    if not isinstance(target, NodeSpec):
+        op = OP_SELECTOR if issubclass(target, Selector) else OP_SEQUENCE
+        return op, target.__name__, name, float("nan")
+
+    class_name = target.node_class.__name__
+    spec = LEAF_SPECS.get(class_name)
+    if spec is None:
+        return None
+    param = target.param(node_data.get("params"))
+    return (spec[0], class_name, target.node_name or name,
+            float(param) if param is not None else float("nan"))
+
+def compile_tree(tree_data):
+    """
+    将behavior_tree.json格式的字典编译为CompiledTree
+
+    与Cat.apply_behavior_tree使用同一张节点注册表校验，一次报告全部错误。
+
+    参数:
+        tree_data: 行为树JSON数据（可以带Root包装）
+
+    返回:
+        CompiledTree实例
+
+    异常:
+        TreeValidationError: 任一节点不合法或不能编译时，包含所有错误
+    """
+    if not isinstance(tree_data, dict):
+        raise TreeValidationError([("root", "行为树必须是对象")])
+    if tree_data.get("type") == "Root" and tree_data.get("children"):
+        tree_data = tree_data["children"][0]
+
+    tree = CompiledTree()
+    errors = []
+
+    def emit(node_data, path, parent):
+        resolved = NODE_REGISTRY.check_node(node_data, path, errors)
+        if resolved is None:
+            return None
+        resolved = _resolve_type(*resolved, node_data)
+        if resolved is None:
+            errors.append((path, f"编译的行为树不支持的动作: {node_data.get('name', node_data.get('type'))!r}"))
+            return None
+
+        index = len(tree.op)
+        op, class_name, name, param = resolved
+        tree.op.append(op)
+        tree.types.append(class_name)
+        tree.names.append(name)
+        tree.param.append(param)
+        # Wander的参数是冷却时间而不是时长，每次进入都从该冷却开始
+        if class_name == "Wander" and param == param:
+            tree.start_cooldown.append(param)
+            tree.param[index] = float("nan")
+        else:
+            tree.start_cooldown.append(0.0)
+        spec = LEAF_SPECS.get(class_name)
+        tree.state.append(STATE_CODES[spec[1]] if spec else 0)
+        low, high = spec[2] if spec and spec[2] else (0, -1)
+        tree.range_low.append(low)
+        tree.range_high.append(high)
+        tree.range_int.append(bool(spec and spec[3]))
+        tree.child_start.append(0)
+        tree.child_count.append(0)
+        tree.subtree_end.append(0)
+        tree.parent.append(parent)
+        tree.first_leaf.append(index)
+
+        if op in (OP_SEQUENCE, OP_SELECTOR):
+            children = NODE_REGISTRY.check_children(node_data, path, errors)
+            child_indices = [emit(child, f"{path}.children[{i}]", index) for i, child in enumerate(children)]
+            # 不合法的子节点已记录错误，编译结束时统一抛出
+            child_indices = [child for child in child_indices if child is not None]
+            tree.child_start[index] = len(tree.child_list)
+            tree.child_count[index] = len(child_indices)
+            tree.child_list.extend(child_indices)
+            if child_indices:
+                tree.first_leaf[index] = tree.first_leaf[child_indices[0]]
+
+        tree.subtree_end[index] = len(tree.op)
+        return index
+
+    emit(tree_data, "root", -1)
+    if errors:
+        raise TreeValidationError(errors)
+    return tree
+
+class CompiledTreeRunner:
+    """
+    CompiledTree的解释器，与composite.py中Sequence/Selector的语义一致
+
+    编译结果可以被多只猫共享，每个运行器只保存当前子节点下标和叶子计时器数组。
+    与ResumingExecutor一样记住正在运行的叶子：叶子返回RUNNING时只执行该叶子，
+    完成时才沿parent数组向上回溯，tick过程中不分配任何对象。
+    """
+
+    __slots__ = ("tree", "cat", "leaf", "current_child", "elapsed", "cooldown",
+                 "target_x", "target_y", "duration")
+
+    def __init__(self, tree, cat):
+        self.tree = tree
+        self.cat = cat
+        n = len(tree)
+        self.current_child = array('i', [0]) * n
+        self.elapsed = array('d', [0.0]) * n
+        self.cooldown = array('d', tree.start_cooldown)
+        self.target_x = array('i', [-1]) * n
+        self.target_y = array('i', [-1]) * n
+        # 时长为负数表示在下一次tick时重新确定（JSON参数或随机抽取）
+        self.duration = array('d', [-1.0]) * n
+        self.leaf = tree.first_leaf[0]
+
+    def reset(self, index=0):
+        """重置节点及其整个子树（对应Node.reset的递归语义）"""
+        end = self.tree.subtree_end[index]
+        size = end - index
+        self.current_child[index:end] = array('i', [0]) * size
+        self.elapsed[index:end] = array('d', [0.0]) * size
+        self.cooldown[index:end] = self.tree.start_cooldown[index:end]
+        self.target_x[index:end] = array('i', [-1]) * size
+        self.duration[index:end] = array('d', [-1.0]) * size
+        self.leaf = self._descend(0)
+
+    def _descend(self, node):
+        """沿current_child下降，返回正在执行的叶子下标"""
+        op, child_start, child_count, child_list = (self.tree.op, self.tree.child_start,
+                                                    self.tree.child_count, self.tree.child_list)
+        while op[node] >= OP_SEQUENCE and child_count[node]:
+            node = child_list[child_start[node] + self.current_child[node]]
+        return node
+
+    def _draw_duration(self, index):
+        tree = self.tree
+        param = tree.param[index]
+        if param == param:
+            return param
+        if tree.range_int[index]:
+            return self.cat.rng.randint(int(tree.range_low[index]), int(tree.range_high[index]))
+        return self.cat.rng.uniform(tree.range_low[index], tree.range_high[index])
+
+    def _reset_leaf(self, i):
+        self.elapsed[i] = 0.0
+        self.cooldown[i] = self.tree.start_cooldown[i]
+        self.target_x[i] = -1
+        self.duration[i] = -1.0
+
+    def active_leaf(self):
+        """返回正在执行的叶子下标"""
+        return self.leaf
+
+    def wake_in(self, dt=DEFAULT_DT):
+        """与Node.wake_in相同：当前叶子是已经开始计时的纯计时节点时，返回还会空转的tick数"""
+        i = self.leaf
+        if self.tree.op[i] != OP_TIMER or self.elapsed[i] <= 0:
+            return 0
+        return ticks_until(self.elapsed[i], self.duration[i], dt)
+
+    def fast_forward(self, ticks, dt=DEFAULT_DT):
+        """补齐调度器跳过的ticks次计时"""
+        i = self.leaf
+        if self.tree.op[i] == OP_TIMER:
+            self.elapsed[i] = advance_timer(self.elapsed[i], ticks, dt)
+
+    def tick(self, dt=DEFAULT_DT):
+        """执行一次tick，返回根节点状态（RUNNING/SUCCESS/FAILURE）"""
+        tree = self.tree
+        op = tree.op
+        node = self.leaf
+
+        leaf_op = op[node]
+        if leaf_op == OP_SEQUENCE:
+            status = SUCCESS
+        elif leaf_op == OP_SELECTOR:
+            status = FAILURE
+        else:
+            status = self._tick_leaf(node, leaf_op, dt)
+            if status == RUNNING:
+                return RUNNING
+
+        # 向上回溯，只有完成的子节点才会推进父节点。
+        # 完成的叶子已经重置了自己的计时器，之前完成的兄弟子树也已经重置，
+        # 所以父节点结束时只需要把自己的current_child归零
+        parent, child_count, current_child = tree.parent, tree.child_count, self.current_child
+        node = parent[node]
+        while node >= 0:
+            # Sequence遇到失败、Selector遇到成功时直接结束
+            if (status == FAILURE) == (op[node] == OP_SEQUENCE):
+                current_child[node] = 0
+                node = parent[node]
+                continue
+            current_child[node] += 1
+            if current_child[node] >= child_count[node]:
+                current_child[node] = 0
+                node = parent[node]
+                continue
+            # 进入下一个子节点，新子树处于初始状态，第一个叶子在编译时已经确定
+            self.leaf = tree.first_leaf[tree.child_list[tree.child_start[node] + current_child[node]]]
+            return RUNNING
+
+        # 根节点已完成，下次从第一个叶子开始
+        self.leaf = tree.first_leaf[0]
+        return status
+
+    def _tick_leaf(self, i, op, dt):
+        """执行叶子节点，逻辑与actions.py中对应的类一致"""
+        cat = self.cat
+        rng = cat.rng
+        elapsed = self.elapsed
+        if op != OP_WANDER and self.duration[i] < 0:
+            self.duration[i] = self._draw_duration(i)
+
+        if op == OP_MOVE:
+            cat.state = "moving"
+            # elapsed用作已移动步数，cooldown用作不足一格的移动进度
+            cooldown = self.cooldown
+            cooldown[i] += dt / DEFAULT_DT
+            while cooldown[i] >= 1.0:
+                cooldown[i] -= 1.0
+                if self.target_x[i] < 0 or elapsed[i] >= self.duration[i]:
+                    self.target_x[i] = rng.randint(5, 75)
+                    self.target_y[i] = rng.randint(5, 20)
+                    elapsed[i] = 0
+                tx, ty = self.target_x[i], self.target_y[i]
+                cat.move(1 if tx > cat.x else -1 if tx < cat.x else 0,
+                         1 if ty > cat.y else -1 if ty < cat.y else 0)
+                elapsed[i] += 1
+                if abs(cat.x - tx) <= 1 and abs(cat.y - ty) <= 1:
+                    self._reset_leaf(i)
+                    return SUCCESS
+            return RUNNING
+
+        if op == OP_WANDER:
+            if self.cooldown[i] <= 0:
+                cat.move(rng.choice([-1, 0, 1]), rng.choice([-1, 0, 1]))
+                self.cooldown[i] = rng.uniform(0.5, 2.0)
+            self.cooldown[i] -= dt
+            cat.state = "wandering"
+            return RUNNING
+
+        if elapsed[i] >= self.duration[i]:
+            self._reset_leaf(i)
+            return SUCCESS
+
+        if op == OP_PLAY:
+            if rng.random() < move_chance(0.3, dt):
+                cat.move(rng.choice([-2, -1, 1, 2]), rng.choice([-2, -1, 1, 2]))
+        elif op == OP_INTERACT:
+            if rng.random() < move_chance(0.2, dt):
+                cat.move(rng.choice([-1, 0, 1]), rng.choice([-1, 0, 1]))
+        elif op == OP_EXPLORE:
+            if self.cooldown[i] <= 0:
+                cat.move(rng.choice([-1, -1, 0, 1, 1]), rng.choice([-1, 0, 0, 1]))
+                self.cooldown[i] = rng.uniform(0.3, 0.8)
+            self.cooldown[i] -= dt
+
+        cat.state = STATE_NAMES[self.tree.state[i]]
+        elapsed[i] += dt
+        return RUNNING
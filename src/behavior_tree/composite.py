@@ -1,18 +1,79 @@
-from .node import Node, NodeStatus
+from .node import Node, NodeStatus, DEFAULT_DT
 
-class Sequence(Node):
+def mark_structure_changed(node):
+    """
+    记录一次行为树结构变化
+
+    node及其所有祖先复合节点的结构版本号加一，版本号只属于所在的那棵树，
+    其他猫的行为树不受影响。node为叶子节点时没有需要记录的版本号。
+    """
+    while isinstance(node, Composite):
+        node.structure_version += 1
+        node = node.parent
+
+class ChildList(list):
+    """复合节点的子节点列表，任何修改都会增加所属行为树的结构版本号"""
+    __slots__ = ("owner",)
+    
+    def __init__(self, children=(), owner=None):
+        super().__init__(children)
+        self.owner = owner
+        self._adopt()
+        
+    def _adopt(self):
+        """把子复合节点的parent指向所属节点，一个复合节点同一时间只能属于一棵树"""
+        owner = self.owner
+        for child in self:
+            if isinstance(child, Composite):
+                child.parent = owner
+
+def _marking(name):
+    """包装list的修改方法，调用后记录一次结构变化"""
+    method = getattr(list, name)
+    def mutate(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._adopt()
+        mark_structure_changed(self.owner)
+        return result
+    mutate.__name__ = name
+    return mutate
+
+for _name in ("append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse",
+              "__setitem__", "__delitem__", "__iadd__", "__imul__"):
+    setattr(ChildList, _name, _marking(_name))
+
+class Composite(Node):
+    """带子节点的节点，替换children时同样会增加结构版本号"""
+    __slots__ = ("_children", "current_child", "parent", "structure_version")
+    
     def __init__(self, name, children=None):
         super().__init__(name)
+        self.parent = None
+        self.structure_version = 0
         self.children = children or []
         self.current_child = 0
         
-    def tick(self):
-        if not self.children:
+    @property
+    def children(self):
+        return self._children
+        
+    @children.setter
+    def children(self, children):
+        self._children = ChildList(children, self)
+        mark_structure_changed(self)
+
+class Sequence(Composite):
+    __slots__ = ()
+    
+    def tick(self, dt=DEFAULT_DT):
+        if not self._children:
             return NodeStatus.SUCCESS
             
-        current = self.children[self.current_child]
-        status = current.tick()
+        current = self._children[self.current_child]
+        return self.on_child_status(current.tick(dt))
         
+    def on_child_status(self, status):
+        """根据当前子节点返回的状态推进本节点，返回本节点的状态"""
         if status == NodeStatus.FAILURE:
             self.reset()
             return NodeStatus.FAILURE
@@ -21,7 +82,7 @@ class Sequence(Node):
             return NodeStatus.RUNNING
             
         self.current_child += 1
-        if self.current_child >= len(self.children):
+        if self.current_child >= len(self._children):
             self.reset()
             return NodeStatus.SUCCESS
             
@@ -30,22 +91,21 @@ class Sequence(Node):
     def reset(self):
         super().reset()
         self.current_child = 0
-        for child in self.children:
+        for child in self._children:
             child.reset()
 
-class Selector(Node):
-    def __init__(self, name, children=None):
-        super().__init__(name)
-        self.children = children or []
-        self.current_child = 0
-        
-    def tick(self):
-        if not self.children:
+class Selector(Composite):
+    __slots__ = ()
+    
+    def tick(self, dt=DEFAULT_DT):
+        if not self._children:
             return NodeStatus.FAILURE
             
-        current = self.children[self.current_child]
-        status = current.tick()
+        current = self._children[self.current_child]
+        return self.on_child_status(current.tick(dt))
         
+    def on_child_status(self, status):
+        """根据当前子节点返回的状态推进本节点，返回本节点的状态"""
         if status == NodeStatus.SUCCESS:
             self.reset()
             return NodeStatus.SUCCESS
@@ -54,7 +114,7 @@ class Selector(Node):
             return NodeStatus.RUNNING
             
         self.current_child += 1
-        if self.current_child >= len(self.children):
+        if self.current_child >= len(self._children):
             self.reset()
             return NodeStatus.FAILURE
             
@@ -63,5 +123,5 @@ class Selector(Node):
     def reset(self):
         super().reset()
         self.current_child = 0
-        for child in self.children:
+        for child in self._children:
             child.reset() 
\ No newline at end of file
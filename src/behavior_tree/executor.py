@@ -0,0 +1,63 @@
+from .node import NodeStatus, DEFAULT_DT
+
+class ResumingExecutor:
+    """
+    记住当前运行中的叶子路径并直接tick该叶子的执行器
+
+    Sequence/Selector只在子节点返回SUCCESS/FAILURE时才会改变状态，所以叶子返回RUNNING时
+    整条路径上的复合节点都会原样返回RUNNING。执行器缓存从根到叶子的路径，叶子运行期间
+    每次tick的开销与树深度无关，只有叶子完成时才沿路径向上回溯。
+
+    根节点子树中的子节点列表被修改时，根节点的结构版本号会增加，执行器据此自动重新下降；
+    替换根节点后需要调用invalidate()。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.path = []
+        self.version = root.structure_version
+
+    def invalidate(self, root=None):
+        """丢弃缓存的路径，可选地切换到新的根节点"""
+        if root is not None:
+            self.root = root
+        self.path = []
+        self.version = self.root.structure_version
+
+    def _descend(self, node):
+        """从node开始沿current_child向下，把经过的节点追加到路径"""
+        path = self.path
+        path.append(node)
+        while getattr(node, "children", None) and hasattr(node, "on_child_status"):
+            node = node.children[node.current_child]
+            path.append(node)
+
+    def active_path(self):
+        """返回从根节点到当前运行叶子的节点列表"""
+        version = self.root.structure_version
+        if not self.path or self.version != version:
+            self.path = []
+            self.version = version
+            self._descend(self.root)
+        return self.path
+
+    def tick(self, dt=DEFAULT_DT):
+        """执行一次tick，返回根节点状态"""
+        path = self.active_path()
+        status = path[-1].tick(dt)
+        if status == NodeStatus.RUNNING:
+            return status
+
+        # 叶子完成，逐层交给父节点处理，直到某个父节点仍在运行
+        depth = len(path) - 1
+        while depth > 0:
+            depth -= 1
+            status = path[depth].on_child_status(status)
+            if status == NodeStatus.RUNNING:
+                del path[depth + 1:]
+                self._descend(path[depth].children[path[depth].current_child])
+                return status
+
+        # 根节点已完成并重置，下次从头开始
+        self.path = []
+        return status
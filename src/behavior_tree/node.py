@@ -1,19 +1,48 @@
 from enum import Enum
 
+# 每个tick默认推进的行为时间（原游戏以30 ticks/s运行，即每秒3个时间单位）
+DEFAULT_DT = 0.1
+
 class NodeStatus(Enum):
     SUCCESS = "SUCCESS"
     FAILURE = "FAILURE"
     RUNNING = "RUNNING"
 
 class Node:
+    # 节点使用__slots__，大量猫和很深的生成行为树不会为每个节点分配实例字典；
+    # 子类需要声明自己新增的属性，布局等外部数据应保存在调用方自己的表中
+    __slots__ = ("name", "status", "param")
+    
+    # 以本节点为根的子树的结构版本号，由复合节点在子节点变化时增加（见composite.mark_structure_changed）；
+    # 叶子节点没有子节点，始终为0。可视化器和执行器比较根节点的版本号即可判断缓存的结构信息是否过期
+    structure_version = 0
+    # 所属的复合节点，只有复合节点会记录（用于把结构变化传递给祖先）
+    parent = None
+    
     def __init__(self, name):
         self.name = name
         self.status = NodeStatus.RUNNING
+        # JSON中指定的参数（见registry.NodeSpec），叶子每次reset后仍使用该值；None表示每次重新随机抽取
+        self.param = None
         
-    def tick(self):
-        """Execute the node's logic"""
+    def tick(self, dt=DEFAULT_DT):
+        """Execute the node's logic, advancing timers by dt"""
         raise NotImplementedError
         
     def reset(self):
         """Reset the node's state"""
-        self.status = NodeStatus.RUNNING 
\ No newline at end of file
+        self.status = NodeStatus.RUNNING
+        
+    def wake_in(self, dt=DEFAULT_DT):
+        """
+        返回节点在不产生其他副作用的情况下还会连续返回RUNNING的tick数
+
+        调度器可以让猫在这段时间内休眠，唤醒时调用fast_forward补齐计时。
+        默认返回0，表示每个tick都需要执行。
+        """
+        return 0
+        
+    def fast_forward(self, ticks, dt=DEFAULT_DT):
+        """一次性补齐被调度器跳过的ticks次计时"""
+        pass
+
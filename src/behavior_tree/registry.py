@@ -0,0 +1,321 @@
+from .composite import Sequence, Selector
+from .actions import (
+    Sleep, Wander, Play, ObserveItems, RandomWait,
+    MoveToTarget, Interact, ObserveAndWait, Explore
+)
+
+class TreeValidationError(ValueError):
+    """行为树JSON不合法，errors为[(节点路径, 说明)]，一次构建中收集全部错误"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        lines = [f"{path}: {message}" for path, message in errors]
+        super().__init__("行为树JSON不合法:\n  " + "\n  ".join(lines))
+
+class NodeSpec:
+    """
+    一种叶子节点的构造方式
+
+    参数值按以下顺序确定：takes_params为True且JSON提供了params时取params[0]，
+    否则取default_param；结果不为None时写入节点的param_attr属性，并记录在节点的param上
+    （节点reset时和各个批量引擎都据此区分指定的参数和随机抽取的默认值，指定的参数每次运行都生效）。
+    """
+
+    def __init__(self, node_class, param_attr=None, default_param=None, takes_params=True,
+                 node_name=None, description=""):
+        """
+        参数:
+            node_class: 动作类
+            param_attr: 参数对应的节点属性，导出时也从这个属性读取
+            default_param: JSON中没有参数时使用的值，None表示保留类的随机默认值
+            takes_params: 是否读取JSON中的params
+            node_name: 固定的节点名称，None表示使用JSON中的name
+            description: 提供给LLM的说明
+        """
+        self.node_class = node_class
+        self.param_attr = param_attr
+        self.default_param = default_param
+        self.takes_params = takes_params and param_attr is not None
+        self.node_name = node_name
+        self.description = description
+
+    def param(self, params):
+        """返回实际使用的参数值，可能为None"""
+        if self.takes_params and params:
+            return params[0]
+        return self.default_param
+
+    def create(self, name, cat, params):
+        node = self.node_class(self.node_name or name, cat)
+        value = self.param(params)
+        if value is not None:
+            setattr(node, self.param_attr, value)
+            node.param = value
+        return node
+
+class NodeRegistry:
+    """
+    JSON节点类型注册表，由加载（Cat.build_behavior_tree、compile_tree）、
+    导出（Cat.behavior_tree_to_json）和LLM工具定义共用
+
+    JSON中的type决定查找方式：
+        Sequence/Selector等复合类型直接对应复合节点类；
+        CustomAction/CustomCondition（以及别名Action/Condition）按name查找对应的表；
+        其余type（WaitTime、behavior_tree_to_json导出的动作类名）直接对应一个NodeSpec。
+    """
+
+    def __init__(self):
+        self.composites = {}
+        # type -> 按name查找的表
+        self.named_types = {}
+        self.actions = {}
+        self.conditions = {}
+        # type -> NodeSpec
+        self.leaf_types = {}
+        # 动作类 -> 导出时读取的参数属性
+        self.export_params = {}
+        # 提供给LLM的自定义动作/条件名称，保持注册顺序
+        self.exposed_actions = []
+        self.exposed_conditions = []
+
+        for type_name in ("CustomAction", "Action"):
+            self.named_types[type_name] = ("CustomAction", self.actions)
+        for type_name in ("CustomCondition", "Condition"):
+            self.named_types[type_name] = ("CustomCondition", self.conditions)
+
+    def register_composite(self, type_name, node_class):
+        self.composites[type_name] = node_class
+
+    def register_action(self, name, spec, exposed=False):
+        """注册一个CustomAction名称，exposed为True时出现在LLM工具定义中"""
+        self.actions[name] = spec
+        if exposed and name not in self.exposed_actions:
+            self.exposed_actions.append(name)
+
+    def register_condition(self, name, spec, exposed=False):
+        """注册一个CustomCondition名称，exposed为True时出现在LLM工具定义中"""
+        self.conditions[name] = spec
+        if exposed and name not in self.exposed_conditions:
+            self.exposed_conditions.append(name)
+
+    def register_leaf(self, type_name, spec):
+        """注册一个直接以type表示的叶子类型"""
+        self.leaf_types[type_name] = spec
+
+    def register_export(self, node_class, param_attr=None):
+        """注册动作类的导出格式：type为类名，param_attr的值作为params"""
+        self.export_params[node_class] = param_attr
+        self.register_leaf(node_class.__name__, NodeSpec(node_class, param_attr))
+
+    def resolve(self, node_data):
+        """
+        查找节点对应的构造方式
+
+        参数:
+            node_data: 节点字典
+
+        返回:
+            (复合节点类或NodeSpec, 节点名称)
+
+        异常:
+            ValueError: 类型或名称未注册时，说明原因
+        """
+        node_type = node_data.get("type")
+        node_name = node_data.get("name", node_type)
+
+        composite = self.composites.get(node_type)
+        if composite is not None:
+            return composite, node_name
+        spec = self.leaf_types.get(node_type)
+        if spec is not None:
+            return spec, node_name
+        named = self.named_types.get(node_type)
+        if named is not None:
+            kind, table = named
+            spec = table.get(node_name)
+            if spec is None:
+                raise ValueError(f"未知的{kind}: {node_name!r}（可用: {', '.join(table)}）")
+            return spec, node_name
+        if node_type is None:
+            raise ValueError("缺少type字段")
+        raise ValueError(f"未知的节点类型: {node_type!r}")
+
+    def _check_params(self, params):
+        if params is None:
+            return None
+        if not isinstance(params, list):
+            return "params必须是数组"
+        if params:
+            value = params[0]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return f"参数必须是数字: {value!r}"
+            if value < 0:
+                return f"参数不能为负数: {value!r}"
+        return None
+
+    def build(self, node_data, cat, path="root"):
+        """
+        一次遍历构建整棵行为树并校验
+
+        参数:
+            node_data: 节点字典（不带Root包装）
+            cat: 叶子节点控制的猫
+            path: 错误信息中根节点的路径名
+
+        返回:
+            根节点
+
+        异常:
+            TreeValidationError: 任一节点不合法时，包含所有错误
+        """
+        errors = []
+        root = self._build(node_data, cat, path, errors)
+        if errors:
+            raise TreeValidationError(errors)
+        return root
+
+    def validate(self, node_data, path="root"):
+        """
+        只校验整棵行为树而不创建节点（不需要猫），与build报告相同的错误
+
+        参数:
+            node_data: 节点字典（不带Root包装）
+            path: 错误信息中根节点的路径名
+
+        异常:
+            TreeValidationError: 任一节点不合法时，包含所有错误
+        """
+        errors = []
+        self._validate(node_data, path, errors)
+        if errors:
+            raise TreeValidationError(errors)
+
+    def _validate(self, node_data, path, errors):
+        resolved = self.check_node(node_data, path, errors)
+        if resolved is None or isinstance(resolved[0], NodeSpec):
+            return
+        for i, child in enumerate(self.check_children(node_data, path, errors)):
+            self._validate(child, f"{path}.children[{i}]", errors)
+
+    def check_node(self, node_data, path, errors):
+        """
+        校验单个节点的类型、名称和参数（不递归子节点），供构建和编译共用
+
+        参数:
+            node_data: 节点字典
+            path: 错误信息中的节点路径
+            errors: 错误列表，节点不合法时追加(path, 说明)
+
+        返回:
+            (复合节点类或NodeSpec, 节点名称)，节点不合法时返回None
+        """
+        if not isinstance(node_data, dict):
+            errors.append((path, f"节点必须是对象: {node_data!r}"))
+            return None
+        try:
+            target, name = self.resolve(node_data)
+        except ValueError as e:
+            errors.append((path, str(e)))
+            return None
+
+        if isinstance(target, NodeSpec) and target.takes_params:
+            problem = self._check_params(node_data.get("params"))
+            if problem:
+                errors.append((path, problem))
+                return None
+        return target, name
+
+    def check_children(self, node_data, path, errors):
+        """返回复合节点的子节点字典列表，children不是数组时记录错误并返回空列表"""
+        children = node_data.get("children", [])
+        if not isinstance(children, list):
+            errors.append((path, "children必须是数组"))
+            return []
+        return children
+
+    def _build(self, node_data, cat, path, errors):
+        resolved = self.check_node(node_data, path, errors)
+        if resolved is None:
+            return None
+        target, name = resolved
+        if isinstance(target, NodeSpec):
+            return target.create(name, cat, node_data.get("params"))
+
+        # 先构建全部子节点再创建复合节点，整棵树只产生一次结构变化
+        nodes = [self._build(child, cat, f"{path}.children[{i}]", errors)
+                 for i, child in enumerate(self.check_children(node_data, path, errors))]
+        return target(name, nodes)
+
+    def to_dict(self, node, include_status=False):
+        """
+        将节点及其子树转换为导出格式的字典
+
+        参数:
+            node: 行为树节点
+            include_status: 是否包含节点运行状态
+
+        返回:
+            节点字典，type为节点类名
+        """
+        node_info = {
+            "name": node.name if hasattr(node, "name") else node.__class__.__name__,
+            "type": node.__class__.__name__
+        }
+
+        # 只有当有参数时才添加params字段
+        param_attr = self.export_params.get(node.__class__)
+        if param_attr is not None and hasattr(node, param_attr):
+            node_info["params"] = [getattr(node, param_attr)]
+
+        # 添加状态信息（如果需要）
+        if include_status and hasattr(node, "status"):
+            node_info["status"] = node.status.value
+
+        # 处理子节点
+        if hasattr(node, "children") and node.children:
+            node_info["children"] = [self.to_dict(child, include_status) for child in node.children]
+
+        return node_info
+
+# 默认注册表
+NODE_REGISTRY = NodeRegistry()
+
+NODE_REGISTRY.register_composite("Sequence", Sequence)
+NODE_REGISTRY.register_composite("Selector", Selector)
+
+# behavior_tree_to_json导出的格式：type为动作类名，params为对应属性
+NODE_REGISTRY.register_export(Sleep, "sleep_duration")
+NODE_REGISTRY.register_export(Wander, "move_cooldown")
+NODE_REGISTRY.register_export(Play, "play_duration")
+NODE_REGISTRY.register_export(RandomWait, "wait_duration")
+NODE_REGISTRY.register_export(ObserveItems, "observe_duration")
+NODE_REGISTRY.register_export(ObserveAndWait, "observe_duration")
+NODE_REGISTRY.register_export(MoveToTarget)
+NODE_REGISTRY.register_export(Interact)
+NODE_REGISTRY.register_export(Explore)
+
+# 示例行为树中使用的等待节点
+NODE_REGISTRY.register_leaf("WaitTime", NodeSpec(RandomWait, "wait_duration", default_param=1.0))
+
+# CustomAction名称，exposed的名称会出现在LLM工具定义中
+NODE_REGISTRY.register_action("AgentPatrol", NodeSpec(Wander, description="Makes the agent patrol an area"), exposed=True)
+NODE_REGISTRY.register_action("AgentDestination", NodeSpec(MoveToTarget, description="Makes the agent move to a specific destination"), exposed=True)
+NODE_REGISTRY.register_action("Eat", NodeSpec(Interact, description="Makes the agent eat"), exposed=True)
+NODE_REGISTRY.register_action("Sleep", NodeSpec(Sleep, "sleep_duration", description="Makes the agent sleep"), exposed=True)
+NODE_REGISTRY.register_action("Play", NodeSpec(Play, "play_duration", default_param=1.0, description="Makes the agent play"), exposed=True)
+NODE_REGISTRY.register_action("Talk", NodeSpec(Interact, description="Makes the agent talk"), exposed=True)
+NODE_REGISTRY.register_action("Work", NodeSpec(Interact, description="Makes the agent work"), exposed=True)
+NODE_REGISTRY.register_action("SelectAction", NodeSpec(Interact, description="Makes the agent select an action based on conditions"), exposed=True)
+NODE_REGISTRY.register_action("Wander", NodeSpec(Wander, "move_cooldown", default_param=0.5))
+NODE_REGISTRY.register_action("ObserveItems", NodeSpec(ObserveItems))
+NODE_REGISTRY.register_action("RandomWait", NodeSpec(RandomWait, "wait_duration", default_param=1.0))
+NODE_REGISTRY.register_action("WaitTime", NodeSpec(RandomWait, "wait_duration", default_param=1.0))
+NODE_REGISTRY.register_action("Explore", NodeSpec(Explore))
+
+# CustomCondition名称：条件被简化为对应的动作，节点名称和参数固定
+NODE_REGISTRY.register_condition("IsTired", NodeSpec(Sleep, "sleep_duration", default_param=1.0, takes_params=False,
+                                                     node_name="IsTired", description="Checks if the agent is tired"), exposed=True)
+NODE_REGISTRY.register_condition("IsHungry", NodeSpec(Interact, node_name="Eat", description="Checks if the agent is hungry"), exposed=True)
+NODE_REGISTRY.register_condition("IsBored", NodeSpec(Play, node_name="Play", description="Checks if the agent is bored"), exposed=True)
+NODE_REGISTRY.register_condition("IsLonely", NodeSpec(ObserveItems, node_name="Observe", description="Checks if the agent is lonely"), exposed=True)
+NODE_REGISTRY.register_condition("HaveNextAction", NodeSpec(ObserveItems, node_name="Observe", description="Checks if the agent has a next action"), exposed=True)
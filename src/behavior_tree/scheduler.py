@@ -0,0 +1,82 @@
+import heapq
+
+from .node import DEFAULT_DT
+
+class TickScheduler:
+    """
+    事件驱动的tick调度器
+
+    每次tick之后询问猫还能连续"空转"多少个tick（见Node.wake_in），如果当前叶子是
+    RandomWait、Sleep等纯等待节点，就把这只猫从活动集合中移出并放入按唤醒时间排序的堆，
+    到期后一次性补齐计时再继续tick。每帧的开销只与活动的猫数量有关。
+
+    调度的对象需要提供update(dt)、sleep_ticks(dt)和fast_forward(ticks, dt)方法（见Cat）。
+    调度以固定步长dt推进，休眠时长按tick数计算。
+    """
+
+    def __init__(self, agents=None, dt=DEFAULT_DT):
+        self.dt = dt
+        self.now = 0
+        self.active = []
+        # 堆元素: (唤醒tick, 序号, 猫)，序号保证相同唤醒时间时按入堆顺序处理
+        self.sleeping = []
+        self._sleep_info = {}
+        self._counter = 0
+
+        # 统计信息
+        self.updates = 0
+
+        for agent in agents or []:
+            self.add(agent)
+
+    def add(self, agent):
+        """加入一只猫，下一次tick时开始执行"""
+        self.active.append(agent)
+
+    def __len__(self):
+        return len(self.active) + len(self._sleep_info)
+
+    def wake(self, agent):
+        """
+        立即唤醒一只休眠的猫，需要在修改它的行为树之前调用
+
+        已经跳过的tick会先补齐到当前叶子上，堆中的旧条目在弹出时被忽略。
+        """
+        info = self._sleep_info.pop(id(agent), None)
+        if info is None:
+            return
+        slept_at, _ = info
+        agent.fast_forward(self.now - slept_at, self.dt)
+        self.active.append(agent)
+
+    def tick(self):
+        """推进一个tick，只执行活动的猫"""
+        self.now += 1
+        now = self.now
+        dt = self.dt
+
+        # 唤醒到期的猫
+        sleeping = self.sleeping
+        while sleeping and sleeping[0][0] <= now:
+            wake_at, seq, agent = heapq.heappop(sleeping)
+            info = self._sleep_info.get(id(agent))
+            if info is None or info[1] != seq:
+                continue  # 已被提前唤醒
+            del self._sleep_info[id(agent)]
+            # 补齐休眠期间跳过的tick（不包括本次tick）
+            agent.fast_forward(now - info[0] - 1, dt)
+            self.active.append(agent)
+
+        still_active = []
+        for agent in self.active:
+            agent.update(dt)
+            ticks = agent.sleep_ticks(dt)
+            if ticks > 0:
+                self._counter += 1
+                self._sleep_info[id(agent)] = (now, self._counter)
+                heapq.heappush(sleeping, (now + ticks + 1, self._counter, agent))
+            else:
+                still_active.append(agent)
+
+        self.updates += len(self.active)
+        self.active = still_active
@@ -0,0 +1,273 @@
+import numpy as np
+
+from .node import DEFAULT_DT
+from .actions import move_chance
+from .batch import (
+    BatchEngine, STATE_CODES, STATE_NAMES,
+    OP_SUCCEED, OP_FAIL, OP_TIMER, OP_WANDER, OP_PLAY, OP_INTERACT, OP_EXPLORE, OP_MOVE
+)
+from .rng import GAMMA, DOUBLE_UNIT, mix64
+
+# 状态数组中的取值
+STATUS_RUNNING = 0
+STATUS_SUCCESS = 1
+STATUS_FAILURE = 2
+
+def mix64_array(z):
+    """rng.mix64的NumPy版本，对uint64数组逐元素混合（溢出按64位回绕）"""
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+class VectorAgentStreams:
+    """
+    AgentStreams的批量抽取版本：每只猫一个基于计数器的随机数流，种子和计数保存在NumPy数组中
+
+    每个方法接收猫的下标数组，为每只选中的猫各抽取一个数并推进它的计数，
+    结果与rng.AgentRandom/AgentStreams中同一只猫逐个抽取的序列完全一致。
+    下标数组中不能有重复的猫。
+    """
+
+    def __init__(self, seed, count, first=0):
+        """
+        参数:
+            seed: 整数种子（见rng.resolve_seed）
+            count: 猫的数量
+            first: 第一只猫的全局编号
+        """
+        # 与rng.derive_seed相同的推导，一次算出所有猫的种子
+        index = np.arange(first + 1, first + count + 1, dtype=np.uint64)
+        self.keys = mix64_array(np.uint64(mix64(seed)) + index * np.uint64(GAMMA))
+        self.counters = np.zeros(count, dtype=np.uint64)
+
+    def random(self, index):
+        """为选中的猫各抽取一个[0, 1)浮点数"""
+        counter = self.counters[index] + np.uint64(1)
+        self.counters[index] = counter
+        z = mix64_array(self.keys[index] + counter * np.uint64(GAMMA))
+        return (z >> np.uint64(11)).astype(np.float64) * DOUBLE_UNIT
+
+    def uniform(self, index, low, high):
+        return low + (high - low) * self.random(index)
+
+    def randint(self, index, low, high):
+        """包含上界的整数，与random.randint一致"""
+        return low + np.floor(self.random(index) * (high - low + 1)).astype(np.int64)
+
+    def choice(self, index, options):
+        options = np.asarray(options)
+        return options[(self.random(index) * len(options)).astype(np.int64)]
+
+class VectorTimers:
+    """
+    向量化的计时器叶子节点
+
+    对应actions.py中"累加0.1直到达到随机时长"的节点（Sleep、ObserveItems、RandomWait、
+    ObserveAndWait、Interact、Explore、Play）。每只猫占一个槽位，elapsed/duration/cooldown
+    保存在NumPy数组中，一次调用推进所有选中猫的计时器。
+    """
+
+    def __init__(self, count, streams):
+        self.count = count
+        self.streams = streams
+        self.elapsed = np.zeros(count)
+        self.duration = np.zeros(count)
+        self.cooldown = np.zeros(count)
+
+    def restart(self, index, low, high, integer, ranged):
+        """
+        重置指定槽位并批量抽取新的时长
+
+        与BatchEngine._enter_leaf相同，只有带时长范围的叶子才会抽取，其余槽位不消耗随机数。
+
+        参数:
+            index: 需要重置的槽位下标数组
+            low, high: 每个槽位的时长范围（数组）
+            integer: 每个槽位是否为整数时长（对应random.randint，包含上界）
+            ranged: 每个槽位的叶子是否有时长范围（布尔数组）
+        """
+        self.elapsed[index] = 0.0
+        self.cooldown[index] = 0.0
+        drawn = index[ranged]
+        if len(drawn) == 0:
+            return
+        low, high = low[ranged], high[ranged]
+        u = self.streams.random(drawn)
+        span = high - low
+        self.duration[drawn] = np.where(
+            integer[ranged], low + np.floor(u * (span + 1)), low + span * u)
+
+    def advance(self, active, dt=DEFAULT_DT):
+        """
+        推进选中槽位的计时器
+
+        参数:
+            active: 布尔掩码，选中的猫执行一次计时tick
+            dt: 本次推进的行为时间
+
+        返回:
+            状态数组，已到时的槽位为STATUS_SUCCESS，其余为STATUS_RUNNING
+        """
+        done = active & (self.elapsed >= self.duration)
+        self.elapsed[active & ~done] += dt
+        status = np.full(self.count, STATUS_RUNNING, dtype=np.int8)
+        status[done] = STATUS_SUCCESS
+        return status
+
+    def cooldown_ready(self, active):
+        """返回移动冷却已经结束、本次需要移动的槽位下标"""
+        return np.flatnonzero(active & (self.cooldown <= 0))
+
+    def rearm(self, ready, active, low, high, dt=DEFAULT_DT):
+        """
+        为刚移动过的槽位抽取新的冷却时间，并推进所有选中槽位的冷却
+
+        与BatchEngine相同，冷却时间在移动之后抽取，每只猫的随机数顺序一致。
+        """
+        self.cooldown[ready] = self.streams.uniform(ready, low, high)
+        self.cooldown[active] -= dt
+
+class VectorBatchEngine(BatchEngine):
+    """
+    使用NumPy数组的批量引擎，每种叶子类型每个tick只做一次数组运算
+
+    行为树展开和跳转表与BatchEngine相同，只是逐只猫的循环换成了按操作码分组的向量运算。
+    随机数由VectorAgentStreams按猫批量抽取，分片模拟时每只猫的轨迹同样与分片方式无关。
+    """
+
+    def _init_state(self, positions):
+        count = self.count
+        self.streams = VectorAgentStreams(self.seed, count, self.first_agent)
+
+        self.x = np.array([p[0] for p in positions], dtype=np.int32)
+        self.y = np.array([p[1] for p in positions], dtype=np.int32)
+        self.state = np.full(count, STATE_CODES["idle"], dtype=np.int8)
+        self.cursor = np.full(count, self.first_leaf, dtype=np.int32)
+        self.timers = VectorTimers(count, self.streams)
+        self.target_x = np.full(count, -1, dtype=np.int32)
+        self.target_y = np.full(count, -1, dtype=np.int32)
+        self.steps = np.zeros(count, dtype=np.int32)
+
+        # 跳转表和叶子属性转为NumPy数组以便用下标数组查表
+        self.np_leaf_op = np.asarray(self.leaf_op, dtype=np.int8)
+        self.np_leaf_state = np.asarray(self.leaf_state, dtype=np.int8)
+        self.np_leaf_depth = np.asarray(self.leaf_depth, dtype=np.int64)
+        self.np_next_on_success = np.asarray(self.next_on_success, dtype=np.int32)
+        self.np_next_on_failure = np.asarray(self.next_on_failure, dtype=np.int32)
+        self.np_leaf_low = np.array([r[0] if r else 0 for r in self.leaf_range], dtype=np.float64)
+        self.np_leaf_high = np.array([r[1] if r else 0 for r in self.leaf_range], dtype=np.float64)
+        self.np_leaf_int = np.array(self.leaf_int_range, dtype=bool)
+        # 指定了参数的叶子使用固定时长，只有其余带时长范围的叶子才抽取
+        self.np_leaf_fixed = np.array([np.nan if f is None else f for f in self.leaf_fixed], dtype=np.float64)
+        self.np_leaf_ranged = np.array([r is not None and f is None
+                                        for r, f in zip(self.leaf_range, self.leaf_fixed)], dtype=bool)
+        self.np_leaf_cooldown = np.asarray(self.leaf_cooldown, dtype=np.float64)
+
+        self._enter_leaves(np.arange(count), self.cursor)
+
+    def _enter_leaves(self, index, leaves):
+        """批量切换到新的叶子节点并重置计时器"""
+        if len(index) == 0:
+            return
+        self.cursor[index] = leaves
+        self.target_x[index] = -1
+        self.steps[index] = 0
+        timers = self.timers
+        timers.restart(index, self.np_leaf_low[leaves], self.np_leaf_high[leaves],
+                       self.np_leaf_int[leaves], self.np_leaf_ranged[leaves])
+        timers.cooldown[index] = self.np_leaf_cooldown[leaves]
+        fixed = self.np_leaf_fixed[leaves]
+        has_fixed = ~np.isnan(fixed)
+        if has_fixed.any():
+            timers.duration[index[has_fixed]] = fixed[has_fixed]
+
+    def _move(self, index, choices_x, choices_y):
+        """对下标数组中的猫随机移动一步"""
+        if len(index) == 0:
+            return
+        streams = self.streams
+        self.x[index] = np.clip(self.x[index] + streams.choice(index, choices_x), 0, self.width - 1)
+        self.y[index] = np.clip(self.y[index] + streams.choice(index, choices_y), 0, self.height - 1)
+
+    def _chance(self, mask, probability):
+        """为选中的猫各抽取一次，返回抽中的猫的下标数组"""
+        index = np.flatnonzero(mask)
+        return index[self.streams.random(index) < probability]
+
+    def tick(self, dt=DEFAULT_DT):
+        """所有猫各执行一次行为树tick"""
+        leaf = self.cursor
+        op = self.np_leaf_op[leaf]
+        timers = self.timers
+
+        # 带计时的叶子：先判断是否到时
+        timed = (op == OP_TIMER) | (op == OP_PLAY) | (op == OP_INTERACT) | (op == OP_EXPLORE)
+        status = timers.advance(timed, dt)
+        running = timed & (status == STATUS_RUNNING)
+
+        # 移动概率按游戏时间换算，与模拟频率无关
+        play = running & (op == OP_PLAY)
+        self._move(self._chance(play, move_chance(0.3, dt)), [-2, -1, 1, 2], [-2, -1, 1, 2])
+
+        interact = running & (op == OP_INTERACT)
+        self._move(self._chance(interact, move_chance(0.2, dt)), [-1, 0, 1], [-1, 0, 1])
+
+        explore = running & (op == OP_EXPLORE)
+        ready = timers.cooldown_ready(explore)
+        self._move(ready, [-1, -1, 0, 1, 1], [-1, 0, 0, 1])
+        timers.rearm(ready, explore, 0.3, 0.8, dt)
+
+        wander = op == OP_WANDER
+        ready = timers.cooldown_ready(wander)
+        self._move(ready, [-1, 0, 1], [-1, 0, 1])
+        timers.rearm(ready, wander, 0.5, 2.0, dt)
+
+        move = op == OP_MOVE
+        if move.any():
+            # cooldown用作不足一格的移动进度，每DEFAULT_DT秒走一格，dt较大时一个tick走多格
+            progress = timers.cooldown
+            progress[move] += dt / DEFAULT_DT
+            stepping = np.flatnonzero(move & (progress >= 1.0))
+            while len(stepping):
+                progress[stepping] -= 1.0
+                retarget = stepping[(self.target_x[stepping] < 0) |
+                                    (self.steps[stepping] >= timers.duration[stepping])]
+                if len(retarget):
+                    self.target_x[retarget] = self.streams.randint(retarget, 5, 75)
+                    self.target_y[retarget] = self.streams.randint(retarget, 5, 20)
+                    self.steps[retarget] = 0
+                tx, ty = self.target_x[stepping], self.target_y[stepping]
+                x = np.clip(self.x[stepping] + np.sign(tx - self.x[stepping]), 0, self.width - 1)
+                y = np.clip(self.y[stepping] + np.sign(ty - self.y[stepping]), 0, self.height - 1)
+                self.x[stepping] = x
+                self.y[stepping] = y
+                self.steps[stepping] += 1
+                arrived = (np.abs(x - tx) <= 1) & (np.abs(y - ty) <= 1)
+                status[stepping[arrived]] = STATUS_SUCCESS
+                stepping = stepping[~arrived & (progress[stepping] >= 1.0)]
+
+        status[op == OP_SUCCEED] = STATUS_SUCCESS
+        status[op == OP_FAIL] = STATUS_FAILURE
+
+        # 运行中的猫（以及到达目标的移动节点）更新显示状态
+        shown = (status == STATUS_RUNNING) | move
+        self.state[shown] = self.np_leaf_state[leaf[shown]]
+
+        self.node_ticks += int(self.np_leaf_depth[leaf].sum())
+
+        # 完成的猫按跳转表切换叶子
+        finished = np.flatnonzero(status != STATUS_RUNNING)
+        if len(finished):
+            done_leaf = leaf[finished]
+            next_leaf = np.where(status[finished] == STATUS_SUCCESS,
+                                 self.np_next_on_success[done_leaf],
+                                 self.np_next_on_failure[done_leaf])
+            self._enter_leaves(finished, next_leaf)
+
+        self.tick_count += 1
+
+    def get_state(self, i):
+        return STATE_NAMES[self.state[i]]
+
+    def positions(self):
+        return list(zip(self.x.tolist(), self.y.tolist()))
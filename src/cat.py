@@ -1,17 +1,60 @@
 import json
+import random
 
-from behavior_tree.node import NodeStatus
-from behavior_tree.composite import Sequence, Selector
+from behavior_tree.node import NodeStatus, DEFAULT_DT
+from behavior_tree.composite import Sequence, Selector, mark_structure_changed
 from behavior_tree.actions import (
     Sleep, Wander, Play, ObserveItems, RandomWait,
     MoveToTarget, Interact, ObserveAndWait, Explore
 )
+from behavior_tree.executor import ResumingExecutor
+from behavior_tree.registry import NODE_REGISTRY, TreeValidationError
+from behavior_tree.rng import AgentRandom
+
+# 各状态在游戏视图中显示的字符，未列出的状态显示为"@"
+STATE_CHARS = {
+    "sleeping": "z",
+    "playing": "!",
+    "wandering": "o",
+    "observing": "?",
+    "waiting": ".",
+    "moving": ">",
+    "interacting": "*",
+    "observing_wait": "^",
+    "exploring": "#",
+}
+
+def restart_composites(node):
+    """把子树中所有复合节点的进度重置到第一个子节点，不影响叶子节点"""
+    if hasattr(node, "current_child"):
+        node.current_child = 0
+        node.status = NodeStatus.RUNNING
+        for child in node.children:
+            restart_composites(child)
 
 class Cat:
-    def __init__(self, x, y):
+    __slots__ = (
+        "x", "y", "state", "rng", "resume_running_leaf", "executor", "behavior_weights", "root",
+        # 叶子节点
+        "observe_items_node", "random_wait_node", "move_to_target_node", "interact_node_1",
+        "observe_and_wait_node", "explore_node", "interact_node_2",
+        "sleep_node", "wander_node", "play_node",
+        "sleep_wait_node", "play_wait_node", "wander_wait_node",
+        # 子树
+        "sleep_tree", "play_tree", "wander_tree", "left_sequence", "right_sequence",
+        "action_selector", "standard_behavior", "priority_selector",
+    )
+    
+    def __init__(self, x, y, resume_running_leaf=False, seed=None, rng=None):
         self.x = x
         self.y = y
         self.state = "idle"
+        # 这只猫自己的随机数流，行为树节点的所有随机抽取都来自它；
+        # 多只猫可以用behavior_tree.rng.agent_rng(seed, i)得到互不干扰、可复现的流
+        self.rng = rng if rng is not None else random.Random(seed)
+        # 是否直接tick缓存的运行中叶子，而不是每次从根节点下降
+        self.resume_running_leaf = resume_running_leaf
+        self.executor = None
         # 行为倾向权重初始化
         self.behavior_weights = {
             "sleep": 1.0,
@@ -38,27 +81,32 @@ class Cat:
         self.wander_node = Wander("wander", self)
         self.play_node = Play("play", self)
         
+        # 组装各子树，子树只在这里创建一次，之后调整倾向时只重新组合根节点
+        self.build_subtrees()
+        
         # 重新创建完整行为树
         self.create_behavior_tree()
         
-    def create_behavior_tree(self):
-        """根据当前行为倾向创建行为树"""
-        # 基于权重创建复合行为节点
+    def build_subtrees(self):
+        """创建默认行为树的各个子树"""
         # 睡眠行为树
+        self.sleep_wait_node = RandomWait("sleep_wait", self)
         self.sleep_tree = Sequence("sleep_tree", [
-            RandomWait("sleep_wait", self),
+            self.sleep_wait_node,
             self.sleep_node
         ])
         
         # 玩耍行为树
+        self.play_wait_node = RandomWait("play_wait", self)
         self.play_tree = Sequence("play_tree", [
-            RandomWait("play_wait", self),
+            self.play_wait_node,
             self.play_node
         ])
         
         # 游荡行为树
+        self.wander_wait_node = RandomWait("wander_wait", self)
         self.wander_tree = Sequence("wander_tree", [
-            RandomWait("wander_wait", self),
+            self.wander_wait_node,
             self.wander_node
         ])
         
@@ -88,8 +136,13 @@ class Cat:
             self.action_selector
         ])
         
+        # 高倾向行为优先时使用的根选择器，子节点在create_behavior_tree中按权重设置
+        self.priority_selector = Selector("root", [])
+        
+    def create_behavior_tree(self):
+        """根据当前行为倾向组合行为树，复用已有的子树，不重新分配节点"""
         # 根据行为树图表结构，默认使用标准行为作为根节点
-        self.root = self.standard_behavior
+        root = self.standard_behavior
         
         # 如果有任何特殊指令或高优先级行为，再使用选择器进行判断
         if any(weight > 1.5 for weight in self.behavior_weights.values()):
@@ -103,48 +156,80 @@ class Cat:
                 reverse=True
             )
             
+            # 倾向分支开头的等待节点每次组合时都重新开始，
+            # 分支中的动作节点与标准行为的叶子一样保留计时
+            branches = {
+                "sleep": (self.sleep_tree, self.sleep_wait_node),
+                "play": (self.play_tree, self.play_wait_node),
+                "wander": (self.wander_tree, self.wander_wait_node),
+            }
             for behavior, weight in behaviors:
-                if weight > 1.5:  # 只有权重显著高的行为才会被优先考虑
-                    if behavior == "sleep":
-                        behavior_nodes.append(self.sleep_tree)
-                    elif behavior == "play":
-                        behavior_nodes.append(self.play_tree)
-                    elif behavior == "wander":
-                        behavior_nodes.append(self.wander_tree)
+                if weight > 1.5 and behavior in branches:  # 只有权重显著高的行为才会被优先考虑
+                    branch, wait_node = branches[behavior]
+                    wait_node.reset()
+                    behavior_nodes.append(branch)
             
             # 添加标准行为作为备选行为
             behavior_nodes.append(self.standard_behavior)
             
-            # 创建最终的行为树根节点为选择器
-            self.root = Selector("root", behavior_nodes)
+            # 最终的行为树根节点为选择器
+            self.priority_selector.children = behavior_nodes
+            root = self.priority_selector
+            
+        # 与重新创建时一样从头开始执行：只重置复合节点的进度，叶子的计时保持不变
+        restart_composites(root)
+        self.root = root
+        self._tree_changed()
+        
+    def _tree_changed(self):
+        """替换根节点后增加这棵树的结构版本号并丢弃缓存的运行路径"""
+        mark_structure_changed(self.root)
+        if self.executor is not None:
+            self.executor.invalidate(self.root)
+        
+    def update(self, dt=DEFAULT_DT):
+        """执行一次行为树tick，dt为本次推进的行为时间"""
+        if self.resume_running_leaf:
+            if self.executor is None:
+                self.executor = ResumingExecutor(self.root)
+            self.executor.tick(dt)
+        else:
+            self.root.tick(dt)
         
-    def update(self):
-        self.root.tick()
+    def active_path(self):
+        """
+        返回从根节点到当前运行叶子的节点列表
+        
+        启用resume_running_leaf时直接返回执行器在tick过程中维护的路径，
+        否则沿current_child下降，开销都只与树深度有关。
+        """
+        if self.executor is not None:
+            return self.executor.active_path()
+        node = self.root
+        path = [node]
+        while getattr(node, "children", None) and hasattr(node, "current_child"):
+            node = node.children[node.current_child]
+            path.append(node)
+        return path
+        
+    def running_leaf(self):
+        """返回当前正在运行的叶子节点"""
+        return self.active_path()[-1]
+        
+    def sleep_ticks(self, dt=DEFAULT_DT):
+        """返回可以跳过的tick数（当前叶子是纯等待节点时大于0）"""
+        return self.running_leaf().wake_in(dt)
+        
+    def fast_forward(self, ticks, dt=DEFAULT_DT):
+        """补齐休眠期间跳过的tick"""
+        self.running_leaf().fast_forward(ticks, dt)
         
     def move(self, dx, dy):
         self.x = max(0, min(79, self.x + dx))  # Assuming 80x24 terminal
         self.y = max(0, min(23, self.y + dy))
         
     def get_display_char(self):
-        if self.state == "sleeping":
-            return "z"
-        elif self.state == "playing":
-            return "!"
-        elif self.state == "wandering":
-            return "o"
-        elif self.state == "observing":
-            return "?"
-        elif self.state == "waiting":
-            return "."
-        elif self.state == "moving":
-            return ">"
-        elif self.state == "interacting":
-            return "*"
-        elif self.state == "observing_wait":
-            return "^"
-        elif self.state == "exploring":
-            return "#"
-        return "@"
+        return STATE_CHARS.get(self.state, "@")
         
     def modify_behavior(self, command):
         """根据用户命令修改行为树"""
@@ -213,46 +298,8 @@ class Cat:
         if node is None:
             node = self.root
             
-        # 将节点信息保存为字典
-        def node_to_dict(n):
-            node_info = {
-                "name": n.name if hasattr(n, "name") else n.__class__.__name__,
-                "type": n.__class__.__name__
-            }
-            
-            # 添加参数信息
-            params = []
-            
-            # 根据节点类型添加不同的参数
-            if isinstance(n, Sleep) and hasattr(n, "sleep_duration"):
-                params = [n.sleep_duration]
-            elif isinstance(n, Wander) and hasattr(n, "move_cooldown"):
-                params = [n.move_cooldown]
-            elif isinstance(n, Play) and hasattr(n, "play_duration"):
-                params = [n.play_duration]
-            elif isinstance(n, RandomWait) and hasattr(n, "wait_duration"):
-                params = [n.wait_duration]
-            elif isinstance(n, ObserveItems) and hasattr(n, "observe_duration"):
-                params = [n.observe_duration]
-            elif isinstance(n, ObserveAndWait) and hasattr(n, "observe_duration"):
-                params = [n.observe_duration]
-            
-            # 只有当有参数时才添加params字段
-            if params:
-                node_info["params"] = params
-            
-            # 添加状态信息（如果需要）
-            if include_status and hasattr(n, "status"):
-                node_info["status"] = n.status.value
-            
-            # 处理子节点
-            if hasattr(n, "children") and n.children:
-                node_info["children"] = [node_to_dict(child) for child in n.children]
-            
-            return node_info
-        
-        # 转换根节点
-        tree_dict = node_to_dict(node)
+        # 转换根节点，各类节点的参数属性由节点注册表决定
+        tree_dict = NODE_REGISTRY.to_dict(node, include_status)
         
         # 返回格式化的JSON字符串
         return json.dumps(tree_dict, indent=2, ensure_ascii=False)
@@ -335,117 +382,103 @@ class Cat:
         try:
             with open(filename, "r", encoding="utf-8") as f:
                 tree_data = json.load(f)
-                
-            # 重置当前行为树节点
-            self.setup_behavior_tree()
-            
-            # 从JSON创建新的行为树
-            if isinstance(tree_data, dict):
-                # 判断是否为根节点格式
-                if "type" in tree_data and tree_data["type"] == "Root":
-                    # 如果是根节点，直接提取其children
-                    if "children" in tree_data and len(tree_data["children"]) > 0:
-                        tree_data = tree_data["children"][0]
-                
-                # 递归构建行为树
-                self.root = self._build_node_from_json(tree_data)
-                
-                return f"成功从 {filename} 加载行为树"
-            else:
-                raise ValueError("Invalid JSON structure for behavior tree")
+            self.apply_behavior_tree(tree_data)
+            return f"成功从 {filename} 加载行为树"
         except Exception as e:
             print(f"加载行为树时出错: {e}")
-            # 确保在出错时仍然有一个有效的行为树
-            self.setup_behavior_tree()
             raise e
     
-    def _build_node_from_json(self, node_data):
+    def apply_behavior_tree(self, tree_data, debug_file=None):
         """
-        从JSON数据递归构建行为树节点
+        直接用内存中的行为树结构替换当前行为树
+        
+        新树构建成功后才替换根节点，构建失败时当前行为树保持不变。
         
         参数:
-            node_data: 节点JSON数据
+            tree_data: 行为树字典（例如生成结果中的structure），可以是Root格式
+            debug_file: 可选的调试输出文件，提供时把tree_data写入该文件
             
         返回:
-            构建的行为树节点
+            新的根节点
         """
-        from behavior_tree.composite import Sequence, Selector
-        from behavior_tree.actions import (
-            Sleep, Wander, Play, ObserveItems, RandomWait,
-            MoveToTarget, Interact, ObserveAndWait, Explore
-        )
-        
-        # 获取节点类型和名称
-        node_type = node_data.get("type")
-        node_name = node_data.get("name", node_type)
-        
-        # 根据节点类型创建相应的节点
-        if node_type == "Sequence":
-            node = Sequence(node_name, [])
-        elif node_type == "Selector":
-            node = Selector(node_name, [])
-        elif node_type == "CustomAction":
-            # 根据名称创建相应的动作节点
-            action_name = node_data.get("name")
-            if action_name == "Sleep":
-                # Sleep类只接受name和cat两个参数
-                node = Sleep(action_name, self)
-                # 如果有sleep_duration参数，在对象创建后设置
-                if "params" in node_data and node_data["params"]:
-                    node.sleep_duration = node_data["params"][0]
-            elif action_name == "Wander":
-                params = node_data.get("params", [0.5])
-                node = Wander(action_name, self)
-                if params:
-                    node.move_cooldown = params[0]
-            elif action_name == "Play":
-                params = node_data.get("params", [1.0])
-                node = Play(action_name, self)
-                if params:
-                    node.play_duration = params[0]
-            elif action_name == "AgentPatrol":
-                node = Wander(action_name, self)
-            elif action_name == "AgentDestination":
-                node = MoveToTarget(action_name, self)
-            elif action_name == "Eat" or action_name == "Talk" or action_name == "Work":
-                node = Interact(action_name, self)
-            elif action_name == "ObserveItems":
-                node = ObserveItems(action_name, self)
-            elif action_name == "RandomWait" or action_name == "WaitTime":
-                params = node_data.get("params", [1.0])
-                node = RandomWait(action_name, self)
-                if params:
-                    node.wait_duration = params[0]
-            elif action_name == "Explore":
-                node = Explore(action_name, self)
-            else:
-                # 默认为交互节点
-                node = Interact(action_name, self)
-        elif node_type == "CustomCondition":
-            # 这里简化处理，将条件节点转换为相应的动作
-            condition_name = node_data.get("name")
-            if condition_name == "IsTired":
-                # 如果是疲倦条件，创建休息相关行为
-                node = Sleep("IsTired", self)
-                # 设置较长的睡眠时间
-                node.sleep_duration = 1.0
-            elif condition_name == "IsHungry":
-                # 如果是饥饿条件，创建进食相关行为
-                node = Interact("Eat", self)
-            elif condition_name == "IsBored":
-                # 如果是无聊条件，创建玩耍相关行为
-                node = Play("Play", self)
-            else:
-                # 其他条件默认为观察行为
-                node = ObserveItems("Observe", self)
-        else:
-            # 未知节点类型，默认为序列节点
-            node = Sequence(node_name, [])
-        
-        # 如果有子节点，递归处理
-        if "children" in node_data and isinstance(node_data["children"], list) and hasattr(node, "children"):
-            for child_data in node_data["children"]:
-                child_node = self._build_node_from_json(child_data)
-                node.children.append(child_node)
-                
-        return node 
\ No newline at end of file
+        root = self.build_behavior_tree(tree_data)
+        self.root = root
+        self._tree_changed()
+        
+        if debug_file:
+            with open(debug_file, "w", encoding="utf-8") as f:
+                json.dump(tree_data, f, ensure_ascii=False, indent=2)
+        return root
+    
+    def build_behavior_tree(self, tree_data):
+        """
+        从JSON结构构建行为树，但不替换当前行为树（可用于预览）
+        
+        参数:
+            tree_data: 行为树字典，可以是Root格式
+            
+        返回:
+            构建的根节点
+        """
+        if not isinstance(tree_data, dict):
+            raise TreeValidationError([("root", "行为树必须是对象")])
+        
+        # 判断是否为根节点格式
+        if "type" in tree_data and tree_data["type"] == "Root":
+            # 如果是根节点，直接提取其children
+            if "children" in tree_data and len(tree_data["children"]) > 0:
+                tree_data = tree_data["children"][0]
+        
+        # 按节点注册表一次遍历构建并校验，不合法时抛出TreeValidationError
+        return NODE_REGISTRY.build(tree_data, self)
+
+class CatAgent:
+    """
+    共享行为树模板的轻量猫
+
+    行为树的结构和参数保存在只读的CompiledTree模板中，可以被任意多只猫共享；
+    每只猫只持有位置、状态、随机数流和一个CompiledTreeRunner（各节点的当前子节点下标和计时器数组）。
+    一万只猫加载同一棵生成的行为树时，结构只编译一次。
+    提供update/sleep_ticks/fast_forward，可以直接交给TickScheduler调度。
+    """
+
+    __slots__ = ("x", "y", "state", "rng", "runner")
+
+    def __init__(self, x, y, template, seed=None, rng=None):
+        """
+        参数:
+            x, y: 初始位置
+            template: 共享的CompiledTree（见behavior_tree.compiler.compile_tree）
+            seed: 随机数种子，rng为None时使用
+            rng: 随机数流，默认为AgentRandom(seed)；大量猫时用AgentRandom(seed, i)区分每只猫
+        """
+        self.x = x
+        self.y = y
+        self.state = "idle"
+        self.rng = rng if rng is not None else AgentRandom(seed)
+        self.runner = None
+        self.use_template(template)
+
+    @property
+    def template(self):
+        return self.runner.tree
+
+    def use_template(self, template):
+        """切换到另一棵共享行为树，运行状态从头开始"""
+        from behavior_tree.compiler import CompiledTreeRunner
+        self.runner = CompiledTreeRunner(template, self)
+
+    def update(self, dt=DEFAULT_DT):
+        """执行一次行为树tick"""
+        self.runner.tick(dt)
+
+    def sleep_ticks(self, dt=DEFAULT_DT):
+        """返回可以跳过的tick数"""
+        return self.runner.wake_in(dt)
+
+    def fast_forward(self, ticks, dt=DEFAULT_DT):
+        """补齐休眠期间跳过的tick"""
+        self.runner.fast_forward(ticks, dt)
+
+    move = Cat.move
+    get_display_char = Cat.get_display_char
@@ -0,0 +1,125 @@
+import argparse
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from cat import Cat
+from mock_provider import MockTreeProvider
+
+# 默认轮流使用的命令，覆盖规则表中的各类行为
+DEFAULT_COMMANDS = [
+    "困了就去睡觉",
+    "饿了去找吃的，吃完再玩",
+    "一只好奇的猫，会在房间里巡逻，发现玩具时会去玩耍，发现食物时会去吃，困了会找个地方睡觉。",
+    "孤独的时候找人说话",
+    "explore the room and observe items",
+    "work hard, then rest",
+]
+
+def percentile(values, fraction):
+    """返回已排序列表的近似分位数"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run_pipeline(generate, command, cat, temp_path=None, stream=False):
+    """
+    执行一次完整流程：自然语言 -> 工具参数JSON -> Cat.apply_behavior_tree
+
+    参数:
+        temp_path: 提供时改为经过临时文件和Cat.load_behavior_tree应用，用于对比
+
+    返回:
+        (生成耗时秒, 解析加载耗时秒, 流式时structure完整的耗时秒或None)
+    """
+    start = time.perf_counter()
+    structure_at = []
+
+    def on_progress(kind, data):
+        if kind == "structure":
+            structure_at.append(time.perf_counter() - start)
+
+    result = generate(command, use_cache=False, on_progress=on_progress if stream else None)
+    generated = time.perf_counter()
+
+    tree_data = json.loads(result)
+    if temp_path is None:
+        # 与Game.apply_generated_structure相同的应用方式
+        cat.apply_behavior_tree(tree_data["structure"])
+    else:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(tree_data["structure"], f, ensure_ascii=False, indent=2)
+        cat.load_behavior_tree(temp_path)
+    loaded = time.perf_counter()
+
+    return generated - start, loaded - generated, structure_at[0] if structure_at else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线压测自然语言生成行为树的完整流程")
+    parser.add_argument("--requests", type=int, default=200, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=1, help="并发线程数，每个线程控制一只猫")
+    parser.add_argument("--provider", default="mock", help="服务商名称，非mock时需要网络和密钥")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock服务商的模拟延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="模拟延迟的随机浮动（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="延迟浮动和猫的行为树的随机种子")
+    parser.add_argument("--fixtures", default=None, help="mock服务商回放的录制目录或文件")
+    parser.add_argument("--stream", action="store_true", help="使用流式生成，同时报告structure完整的时间")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="流式返回时片段之间的间隔（秒）")
+    parser.add_argument("--via-file", action="store_true", help="经过临时文件和load_behavior_tree应用（旧流程）")
+    parser.add_argument("--command", action="append", default=[], help="使用的命令，可重复，默认使用内置命令")
+    args = parser.parse_args(argv)
+
+    from test_claude_tooluse import generate_behavior_tree
+
+    if args.provider == "mock":
+        provider = MockTreeProvider(fixtures=args.fixtures, latency=args.latency, jitter=args.jitter,
+                                    seed=args.seed, chunk_delay=args.chunk_delay)
+    else:
+        provider = args.provider
+    generate = lambda command, **kwargs: generate_behavior_tree(command, provider=provider, **kwargs)
+
+    commands = args.command or DEFAULT_COMMANDS
+    cats = [Cat(35, 12, seed=args.seed) for _ in range(args.concurrency)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        def worker(index):
+            cat = cats[index % args.concurrency]
+            temp_path = None
+            if args.via_file:
+                temp_path = os.path.join(temp_dir, f"tree_{index % args.concurrency}.json")
+            return run_pipeline(generate, commands[index % len(commands)], cat, temp_path, args.stream)
+
+        # 生成函数会打印响应，压测时丢弃（sys.stdout是全局的，只能在线程外重定向）
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            if args.concurrency == 1:
+                results = [worker(i) for i in range(args.requests)]
+            else:
+                # 同一只猫一次只处理一个请求：按猫分组，每组在一个线程中顺序执行
+                with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                    groups = pool.map(lambda c: [worker(i) for i in range(c, args.requests, args.concurrency)],
+                                      range(args.concurrency))
+                    results = [result for group in groups for result in group]
+            run_time = time.perf_counter() - start
+
+    generate_times = sorted(r[0] for r in results)
+    load_times = sorted(r[1] for r in results)
+    structure_times = sorted(r[2] for r in results if r[2] is not None)
+
+    print(f"服务商: {args.provider}  请求数: {len(results)}  并发: {args.concurrency}  "
+          f"应用方式: {'临时文件' if args.via_file else '内存'}")
+    print(f"耗时: {run_time:.3f}s")
+    print(f"请求/s: {len(results) / run_time:.1f}")
+    for label, values in [("生成", generate_times), ("解析并加载", load_times), ("structure完整", structure_times)]:
+        if not values:
+            continue
+        print(f"{label}(ms): 中位数 {statistics.median(values) * 1000:.2f}  "
+              f"p95 {percentile(values, 0.95) * 1000:.2f}  最大 {values[-1] * 1000:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import argparse
+import json
+import time
+
+from cat import Cat
+from behavior_tree.node import DEFAULT_DT
+from behavior_tree.rng import agent_rng, resolve_seed
+
+class HeadlessSimulation:
+    """无窗口模拟器，不依赖pygame，直接驱动猫的行为树"""
+
+    def __init__(self, width=70, height=24, tick_rate=0, cat=None, compiled=False,
+                 resume=False, dt=DEFAULT_DT, seed=None):
+        """
+        参数:
+            width: 游戏区域宽度（与Game保持一致）
+            height: 游戏区域高度
+            tick_rate: 每秒tick次数，0表示不限速（尽可能快）
+            cat: 可选的猫实例，默认在区域中心创建
+            compiled: 是否将行为树编译为扁平操作码后解释执行
+            resume: 是否直接tick缓存的运行中叶子（Cat.resume_running_leaf）
+            dt: 每个tick推进的行为时间
+            seed: 默认创建的猫的随机数种子，相同种子的模拟结果完全相同
+        """
+        self.width = width
+        self.height = height
+        self.tick_rate = tick_rate
+        self.dt = dt
+        self.cat = cat if cat is not None else Cat(width // 2, height // 2,
+                                                   resume_running_leaf=resume, seed=seed)
+        self.runner = None
+        if compiled:
+            self.use_compiled_tree(json.loads(self.cat.behavior_tree_to_json()))
+
+        # 统计信息
+        self.tick_count = 0
+        self.elapsed = 0.0
+        self.state_counts = {}
+
+    def use_compiled_tree(self, tree_data):
+        """编译行为树JSON，之后的tick由CompiledTreeRunner执行"""
+        from behavior_tree.compiler import compile_tree, CompiledTreeRunner
+        self.runner = CompiledTreeRunner(compile_tree(tree_data), self.cat)
+
+    def step(self):
+        """执行一次模拟tick"""
+        if self.runner is not None:
+            self.runner.tick(self.dt)
+        else:
+            self.cat.update(self.dt)
+        self.tick_count += 1
+        self.state_counts[self.cat.state] = self.state_counts.get(self.cat.state, 0) + 1
+
+    def run(self, ticks=None, seconds=None, report_interval=0):
+        """
+        运行模拟直到达到指定tick数或墙钟时间
+
+        参数:
+            ticks: 最多执行的tick数，None表示不限制
+            seconds: 最多运行的墙钟秒数，None表示不限制
+            report_interval: 每隔多少tick打印一次进度，0表示不打印
+
+        返回:
+            包含运行统计信息的字典
+        """
+        if ticks is None and seconds is None:
+            raise ValueError("必须指定ticks或seconds中的至少一个")
+
+        interval = 1.0 / self.tick_rate if self.tick_rate > 0 else 0
+        start = time.perf_counter()
+        deadline = start + seconds if seconds is not None else None
+        next_tick = start
+        executed = 0
+
+        while ticks is None or executed < ticks:
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                break
+
+            # 固定频率模式下等待下一个tick时间点
+            if interval:
+                if now < next_tick:
+                    time.sleep(next_tick - now)
+                next_tick += interval
+
+            self.step()
+            executed += 1
+
+            if report_interval and executed % report_interval == 0:
+                run_time = time.perf_counter() - start
+                print(f"已执行 {executed} ticks, {executed / max(run_time, 1e-9):.0f} ticks/s")
+
+        run_time = time.perf_counter() - start
+        self.elapsed += run_time
+
+        return {
+            "ticks": executed,
+            "seconds": run_time,
+            "ticks_per_second": executed / run_time if run_time > 0 else float("inf"),
+            "state_counts": dict(self.state_counts),
+            "position": (self.cat.x, self.cat.y),
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无窗口运行猫咪行为树模拟")
+    parser.add_argument("--ticks", type=int, default=None, help="执行的tick总数")
+    parser.add_argument("--seconds", type=float, default=None, help="最多运行的墙钟秒数")
+    parser.add_argument("--rate", type=float, default=0, help="每秒tick次数，0表示不限速")
+    parser.add_argument("--dt", type=float, default=DEFAULT_DT, help="每个tick推进的行为时间")
+    parser.add_argument("--tree", default=None, help="可选的行为树JSON文件")
+    parser.add_argument("--report", type=int, default=0, help="每隔多少tick打印一次进度")
+    parser.add_argument("--cats", type=int, default=0, help="使用批量引擎同时模拟的猫数量")
+    parser.add_argument("--numpy", action="store_true", help="批量模式下使用NumPy向量化引擎")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="与--cats一起使用：把猫切分给多少个工作进程并行模拟，0表示单进程")
+    parser.add_argument("--step-ticks", type=int, default=1,
+                        help="多进程模式下每次同步之间各进程执行的tick数")
+    parser.add_argument("--compiled", action="store_true", help="使用编译后的扁平行为树执行")
+    parser.add_argument("--resume", action="store_true", help="直接tick运行中的叶子，完成时才回溯")
+    parser.add_argument("--agents", type=int, default=0,
+                        help="用事件驱动调度器模拟的猫数量（等待中的猫不参与tick）")
+    parser.add_argument("--shared", action="store_true",
+                        help="与--agents一起使用：所有猫共享一份编译后的行为树模板，每只猫只保存运行状态")
+    parser.add_argument("--command", action="append", default=[],
+                        help="模拟前对猫执行的预定义命令，可重复，例如 --command sleep")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="随机数种子，默认随机；每只猫的随机数流由种子和猫的编号决定")
+    args = parser.parse_args(argv)
+    # 确定本次使用的种子并打印，便于复现
+    args.seed = resolve_seed(args.seed)
+    print(f"随机数种子: {args.seed}")
+
+    if args.ticks is None and args.seconds is None:
+        # 多猫模式每个tick要处理所有猫，默认tick数相应减少
+        args.ticks = 100 if args.cats or args.agents else 100000
+
+    if args.cats and args.shards:
+        return run_sharded(args)
+    if args.cats:
+        return run_batch(args)
+    if args.agents:
+        return run_scheduled(args)
+
+    sim = HeadlessSimulation(tick_rate=args.rate, resume=args.resume, dt=args.dt, seed=args.seed)
+    for command in args.command:
+        sim.cat.modify_behavior(command)
+    if args.tree:
+        if args.compiled:
+            with open(args.tree, "r", encoding="utf-8") as f:
+                sim.use_compiled_tree(json.load(f))
+        else:
+            print(sim.cat.load_behavior_tree(args.tree))
+    elif args.compiled:
+        # 命令执行完之后再编译，编译结果包含命令修改后的行为树
+        sim.use_compiled_tree(json.loads(sim.cat.behavior_tree_to_json()))
+
+    stats = sim.run(ticks=args.ticks, seconds=args.seconds, report_interval=args.report)
+
+    print(f"ticks: {stats['ticks']}")
+    print(f"耗时: {stats['seconds']:.3f}s")
+    print(f"ticks/s: {stats['ticks_per_second']:.0f}")
+    # 模拟时间按原游戏每秒3个行为时间单位换算
+    print(f"相当于游戏时间: {stats['ticks'] * args.dt / (DEFAULT_DT * 30):.0f}s")
+    print("状态分布:")
+    for state, count in sorted(stats["state_counts"].items(), key=lambda x: x[1], reverse=True):
+        print(f"  {state}: {count}")
+
+def run_batch(args):
+    """使用批量引擎模拟多只猫并报告吞吐量"""
+    if args.numpy:
+        from behavior_tree.vectorized import VectorBatchEngine as BatchEngine
+    else:
+        from behavior_tree.batch import BatchEngine
+
+    cat = Cat(35, 12, seed=args.seed)
+    if args.tree:
+        print(cat.load_behavior_tree(args.tree))
+    engine = BatchEngine.from_cat(cat, args.cats, seed=args.seed)
+
+    start = time.perf_counter()
+    deadline = start + args.seconds if args.seconds is not None else None
+    while args.ticks is None or engine.tick_count < args.ticks:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        engine.tick(args.dt)
+    run_time = time.perf_counter() - start
+
+    print(f"猫数量: {engine.count}")
+    print(f"ticks: {engine.tick_count}")
+    print(f"耗时: {run_time:.3f}s")
+    print(f"cat-ticks/s: {engine.count * engine.tick_count / run_time:.0f}")
+    print(f"node-ticks/s: {engine.node_ticks / run_time:.0f}")
+
+def run_sharded(args):
+    """把猫切分给多个工作进程并行模拟，报告吞吐量"""
+    from sharded_world import ShardedWorld
+
+    tree_data = None
+    if args.tree:
+        with open(args.tree, "r", encoding="utf-8") as f:
+            tree_data = json.load(f)
+
+    setup_start = time.perf_counter()
+    with ShardedWorld(args.cats, tree_data, shards=args.shards, seed=args.seed,
+                      vectorized=args.numpy) as world:
+        setup_time = time.perf_counter() - setup_start
+        start = time.perf_counter()
+        deadline = start + args.seconds if args.seconds is not None else None
+        while args.ticks is None or world.tick_count < args.ticks:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            step = args.step_ticks if args.ticks is None else min(args.step_ticks, args.ticks - world.tick_count)
+            world.step(step, args.dt)
+        run_time = time.perf_counter() - start
+
+    print(f"猫数量: {world.count}  工作进程: {len(world.ranges)}")
+    print(f"创建耗时: {setup_time:.3f}s")
+    print(f"ticks: {world.tick_count}")
+    print(f"耗时: {run_time:.3f}s")
+    print(f"cat-ticks/s: {world.count * world.tick_count / run_time:.0f}")
+    print(f"node-ticks/s: {world.node_ticks / run_time:.0f}")
+
+def run_scheduled(args):
+    """使用TickScheduler模拟多只独立的猫，报告实际参与tick的比例"""
+    from behavior_tree.scheduler import TickScheduler
+
+    setup_start = time.perf_counter()
+    if args.shared:
+        cats = create_shared_agents(args)
+    else:
+        cats = [Cat(35, 12, resume_running_leaf=args.resume, rng=agent_rng(args.seed, i))
+                for i in range(args.agents)]
+        for cat in cats:
+            for command in args.command:
+                cat.modify_behavior(command)
+            if args.tree:
+                cat.load_behavior_tree(args.tree)
+    setup_time = time.perf_counter() - setup_start
+    scheduler = TickScheduler(cats, dt=args.dt)
+
+    start = time.perf_counter()
+    deadline = start + args.seconds if args.seconds is not None else None
+    while args.ticks is None or scheduler.now < args.ticks:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        scheduler.tick()
+    run_time = time.perf_counter() - start
+
+    total = scheduler.now * len(cats)
+    print(f"猫数量: {len(cats)}{'（共享行为树模板）' if args.shared else ''}")
+    print(f"创建耗时: {setup_time:.3f}s")
+    print(f"ticks: {scheduler.now}")
+    print(f"耗时: {run_time:.3f}s")
+    print(f"cat-ticks/s: {total / run_time:.0f}")
+    print(f"实际执行比例: {scheduler.updates / max(total, 1):.1%}")
+
+def create_shared_agents(args):
+    """编译一次行为树模板，创建共享它的轻量猫"""
+    from behavior_tree.compiler import compile_tree
+    from behavior_tree.rng import AgentRandom
+    from cat import CatAgent
+
+    if args.tree:
+        with open(args.tree, "r", encoding="utf-8") as f:
+            tree_data = json.load(f)
+    else:
+        source = Cat(35, 12, seed=args.seed)
+        for command in args.command:
+            source.modify_behavior(command)
+        tree_data = json.loads(source.behavior_tree_to_json())
+    template = compile_tree(tree_data)
+    return [CatAgent(35, 12, template, rng=AgentRandom(args.seed, i)) for i in range(args.agents)]
+
+if __name__ == "__main__":
+    main()
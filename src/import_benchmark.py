@@ -0,0 +1,59 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# 默认测量的模块：模拟核心、无窗口入口、游戏入口和LLM生成模块
+DEFAULT_MODULES = ["behavior_tree.node", "cat", "headless", "main", "test_claude_tooluse"]
+
+# 在子进程中执行：导入模块，输出耗时（毫秒）、峰值内存（KB）和被加载的重量级依赖
+PROBE = """
+import sys, time, resource
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [name for name in ("pygame", "numpy", "anthropic", "openai", "httpx") if name in sys.modules]
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, ",".join(heavy))
+"""
+
+def measure(module, repeat):
+    """
+    在全新的解释器中多次导入模块
+
+    返回:
+        (导入耗时中位数毫秒, 峰值内存KB, 加载的重量级依赖)，导入失败时返回None
+    """
+    times = []
+    rss = 0
+    heavy = ""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", PROBE.format(module=module)],
+                                cwd=src_dir, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        fields = result.stdout.strip().splitlines()[-1].split(" ")
+        times.append(float(fields[0]))
+        rss = max(rss, int(fields[1]))
+        heavy = fields[2] if len(fields) > 2 else ""
+    return statistics.median(times), rss, heavy
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量各模块在全新进程中的导入耗时和内存")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="要测量的模块")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块的测量次数")
+    args = parser.parse_args(argv)
+
+    print(f"{'模块':<22}{'导入耗时(ms)':>14}{'峰值内存(MB)':>14}  加载的依赖")
+    for module in args.modules:
+        result = measure(module, args.repeat)
+        if result is None:
+            print(f"{module:<22}{'导入失败':>14}")
+            continue
+        elapsed, rss, heavy = result
+        print(f"{module:<22}{elapsed:>14.1f}{rss / 1024:>14.1f}  {heavy or '-'}")
+
+if __name__ == "__main__":
+    main()
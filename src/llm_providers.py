@@ -0,0 +1,211 @@
+import os
+import threading
+
+class ProviderRegistry:
+    """
+    按服务商名称保存长期存在的LLM客户端
+
+    每个客户端在第一次使用时创建，之后的请求复用同一个客户端及其HTTP连接池，
+    连续的自然语言命令不再重复建立TCP/TLS连接。客户端可以在后台生成线程中安全获取。
+    SDK在创建客户端时才导入，导入本模块本身不依赖anthropic/openai。
+    """
+
+    def __init__(self, timeout=60.0, connect_timeout=10.0, max_connections=10,
+                 max_keepalive_connections=5, keepalive_expiry=60.0, max_retries=2):
+        """
+        参数:
+            timeout: 单次请求的读写超时（秒）
+            connect_timeout: 建立连接的超时（秒）
+            max_connections: 每个客户端的最大连接数
+            max_keepalive_connections: 连接池中保持的空闲连接数
+            keepalive_expiry: 空闲连接保持的秒数
+            max_retries: SDK自动重试次数
+        """
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.max_retries = max_retries
+
+        # 服务商名称 -> 创建客户端的函数，函数接收registry和client()的关键字参数
+        self.factories = {
+            "claude": create_anthropic_client,
+            "azure": create_azure_client,
+        }
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        """注册或替换一个服务商的客户端工厂"""
+        with self._lock:
+            self.factories[name.lower()] = factory
+            self._clients = {key: client for key, client in self._clients.items()
+                             if key[0] != name.lower()}
+
+    def client(self, name, **options):
+        """
+        返回服务商的共享客户端，不存在时创建
+
+        参数:
+            name: 服务商名称（'claude'、'azure'或注册的其他名称）
+            options: 传给客户端工厂的参数（例如Azure的api_version），不同参数各自缓存一个客户端
+
+        返回:
+            SDK客户端实例
+        """
+        key = (name.lower(), tuple(sorted(options.items())))
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                factory = self.factories.get(key[0])
+                if factory is None:
+                    raise ValueError(f"未知的服务商: {name}")
+                client = factory(self, **options)
+                self._clients[key] = client
+            return client
+
+    def http_client(self, sdk):
+        """
+        按配置创建带连接池的HTTP客户端
+
+        使用SDK自带的DefaultHttpxClient（已开启TCP keep-alive），连接池参数的类型取自SDK的
+        默认配置，保证与SDK实际使用的httpx版本一致。
+
+        参数:
+            sdk: anthropic或openai模块
+        """
+        limits = type(sdk.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return sdk.DefaultHttpxClient(
+            limits=limits,
+            timeout=sdk.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+
+    def close(self):
+        """关闭所有客户端及其连接"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients = {}
+        for client in clients:
+            close = getattr(client, "close", None)
+            if close is not None:
+                close()
+
+def create_anthropic_client(registry):
+    """创建Claude客户端，ANTHROPIC_BASE_URL可指向本地测试服务器"""
+    import anthropic
+    return anthropic.Anthropic(
+        api_key=os.environ.get("ANTHROPIC_API_KEY"),
+        base_url=os.environ.get("ANTHROPIC_BASE_URL") or None,
+        max_retries=registry.max_retries,
+        http_client=registry.http_client(anthropic),
+    )
+
+def create_azure_client(registry, api_version="2024-02-01"):
+    """创建Azure OpenAI客户端"""
+    import openai
+    return openai.AzureOpenAI(
+        api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
+        api_version=api_version,
+        azure_endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT"),
+        max_retries=registry.max_retries,
+        http_client=registry.http_client(openai),
+    )
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_provider_registry():
+    """返回全局共享的ProviderRegistry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ProviderRegistry()
+    return _registry
+
+def configure_provider_registry(**options):
+    """
+    用新的连接池配置替换全局ProviderRegistry，旧客户端会被关闭
+
+    参数:
+        options: ProviderRegistry的构造参数
+
+    返回:
+        新的ProviderRegistry
+    """
+    global _registry
+    with _registry_lock:
+        old, _registry = _registry, ProviderRegistry(**options)
+    if old is not None:
+        old.close()
+    return _registry
+
+class TreeProvider:
+    """
+    行为树生成服务商接口
+
+    子类实现request()，返回Text2BehaviorTree工具参数的JSON字符串；
+    支持流式返回的服务商再实现stream()，逐段产出工具参数JSON。
+    """
+
+    # 服务商名称，也是缓存键的一部分
+    name = None
+    # 请求中使用的工具定义，参与缓存键计算
+    tool_schema = None
+    # 结果是否写入磁盘缓存
+    cacheable = True
+
+    @property
+    def model(self):
+        """模型或部署名称"""
+        return None
+
+    def request(self, instruction):
+        """
+        根据自然语言命令生成行为树
+
+        参数:
+            instruction: 自然语言命令
+
+        返回:
+            工具参数JSON字符串，失败时返回None
+        """
+        raise NotImplementedError
+
+    def stream(self, instruction):
+        """逐段产出工具参数JSON，默认一次性返回request()的结果"""
+        result = self.request(instruction)
+        if result is not None:
+            yield result
+
+# 服务商名称 -> TreeProvider实例
+tree_providers = {}
+
+def register_tree_provider(provider, name=None):
+    """
+    注册行为树生成服务商，同名的会被替换
+
+    参数:
+        provider: TreeProvider实例
+        name: 注册名称，默认使用provider.name
+
+    返回:
+        provider，便于链式使用
+    """
+    tree_providers[(name or provider.name).lower()] = provider
+    return provider
+
+def get_tree_provider(name):
+    """按名称返回已注册的行为树生成服务商"""
+    provider = tree_providers.get(name.lower())
+    if provider is None:
+        raise ValueError(f"未知的服务商: {name}（可用: {', '.join(sorted(tree_providers))}）")
+    return provider
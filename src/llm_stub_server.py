@@ -0,0 +1,268 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 测试服务器固定返回的行为树（Text2BehaviorTree工具的输入格式）
+STUB_TREE = {
+    "structure": {
+        "name": "BehaviorTree",
+        "type": "Root",
+        "children": [
+            {
+                "name": "Selector",
+                "type": "Selector",
+                "children": [
+                    {
+                        "name": "Sequence",
+                        "type": "Sequence",
+                        "children": [
+                            {"type": "CustomCondition", "name": "IsTired"},
+                            {"type": "CustomAction", "name": "Sleep", "params": [2.0]}
+                        ]
+                    },
+                    {
+                        "name": "Sequence",
+                        "type": "Sequence",
+                        "children": [
+                            {"type": "CustomAction", "name": "AgentPatrol"},
+                            {"type": "CustomAction", "name": "Play", "params": [3.0]}
+                        ]
+                    }
+                ]
+            }
+        ]
+    }
+}
+
+class StubHandler(BaseHTTPRequestHandler):
+    """模拟Anthropic Messages接口和Azure OpenAI Chat Completions接口，请求中stream为true时以SSE流式返回"""
+
+    # HTTP/1.1才能保持连接，用于验证客户端是否复用连接
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+
+        path = self.path.split("?")[0]
+        stream = body.get("stream", False)
+        if path.endswith("/messages"):
+            if stream:
+                self._send_events(self._anthropic_events(body))
+                return
+            response = self._anthropic_response(body)
+        elif path.endswith("/chat/completions"):
+            if stream:
+                self._send_events(self._azure_events(body))
+                return
+            response = self._azure_response(body)
+        else:
+            self._send(404, {"error": {"type": "not_found", "message": self.path}})
+            return
+        self._send(200, response)
+
+    def _anthropic_response(self, body):
+        return {
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "stub"),
+            "content": [{
+                "type": "tool_use",
+                "id": "toolu_stub",
+                "name": "Text2BehaviorTree",
+                "input": self.server.tree,
+            }],
+            "stop_reason": "tool_use",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": 0},
+        }
+
+    def _azure_response(self, body):
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": "call_stub",
+                        "type": "function",
+                        "function": {
+                            "name": "Text2BehaviorTree",
+                            "arguments": json.dumps(self.server.tree, ensure_ascii=False),
+                        },
+                    }],
+                },
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def _tree_chunks(self):
+        """把行为树JSON切成固定大小的片段，模拟模型逐步输出工具参数"""
+        text = json.dumps(self.server.tree, ensure_ascii=False)
+        size = self.server.chunk_size
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def _anthropic_events(self, body):
+        message = self._anthropic_response(body)
+        message["content"] = []
+        message["stop_reason"] = None
+        yield "message_start", {"type": "message_start", "message": message}
+        yield "content_block_start", {
+            "type": "content_block_start",
+            "index": 0,
+            "content_block": {"type": "tool_use", "id": "toolu_stub", "name": "Text2BehaviorTree", "input": {}},
+        }
+        for chunk in self._tree_chunks():
+            yield "content_block_delta", {
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "input_json_delta", "partial_json": chunk},
+            }
+        yield "content_block_stop", {"type": "content_block_stop", "index": 0}
+        yield "message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": "tool_use", "stop_sequence": None},
+            "usage": {"output_tokens": 0},
+        }
+        yield "message_stop", {"type": "message_stop"}
+
+    def _azure_events(self, body):
+        def chunk(delta, finish_reason=None):
+            return None, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        yield chunk({"role": "assistant", "tool_calls": [{
+            "index": 0,
+            "id": "call_stub",
+            "type": "function",
+            "function": {"name": "Text2BehaviorTree", "arguments": ""},
+        }]})
+        for text in self._tree_chunks():
+            yield chunk({"tool_calls": [{"index": 0, "function": {"arguments": text}}]})
+        yield chunk({}, "tool_calls")
+        yield None, "[DONE]"
+
+    def _send_events(self, events):
+        """以分块传输编码发送SSE事件，每个事件之间等待chunk_delay秒"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event, payload in events:
+            data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+            text = f"event: {event}\ndata: {data}\n\n" if event else f"data: {data}\n\n"
+            encoded = text.encode("utf-8")
+            self.wfile.write(f"{len(encoded):X}\r\n".encode("ascii") + encoded + b"\r\n")
+            self.wfile.flush()
+            if self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    本地LLM测试服务器，统计收到的TCP连接数和请求数
+
+    将ANTHROPIC_BASE_URL或AZURE_OPENAI_ENDPOINT指向它即可离线测试生成流程，
+    连接数小于请求数说明客户端复用了连接。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, tree=None, verbose=False,
+                 chunk_size=16, chunk_delay=0.0):
+        """
+        参数:
+            host, port: 监听地址，端口为0时自动选择
+            tree: 返回的行为树，默认为STUB_TREE
+            verbose: 是否打印每个请求
+            chunk_size: 流式返回时每个片段的字符数
+            chunk_delay: 流式返回时每个片段之间的间隔（秒），用于模拟生成速度
+        """
+        super().__init__((host, port), StubHandler)
+        self.tree = tree or STUB_TREE
+        self.verbose = verbose
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程中运行服务器，返回自身以便链式调用"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务器并释放端口"""
+        self.shutdown()
+        self.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地LLM测试服务器（Anthropic/Azure OpenAI接口）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tree", help="返回指定的行为树JSON文件（Text2BehaviorTree工具的输入格式）")
+    parser.add_argument("--chunk-size", type=int, default=16, help="流式返回时每个片段的字符数")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="流式返回时片段之间的间隔（秒）")
+    args = parser.parse_args(argv)
+
+    tree = None
+    if args.tree:
+        with open(args.tree, "r", encoding="utf-8") as f:
+            tree = json.load(f)
+
+    server = StubLLMServer(args.host, args.port, tree=tree, verbose=True,
+                           chunk_size=args.chunk_size, chunk_delay=args.chunk_delay)
+    print(f"测试服务器已启动: {server.url}")
+    print(f"  ANTHROPIC_BASE_URL={server.url}")
+    print(f"  AZURE_OPENAI_ENDPOINT={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"连接数: {server.connections}，请求数: {server.requests}")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,29 @@
+import os
 import pygame
 import sys
 import json
 from renderer import ASCIIRenderer
-from cat import Cat
+from cat import Cat, STATE_CHARS
 from tree_visualizer import TreeVisualizer
 from util import get_font, debug_fonts
+from behavior_tree.node import DEFAULT_DT
+from behavior_tree.registry import TreeValidationError
+from async_generation import AsyncTreeGenerator
 
-# Import the behavior tree generation function
-from test_claude_tooluse import generate_behavior_tree
+# 每秒真实时间对应的行为时间（原游戏以30 ticks/s、每tick 0.1运行）
+BEHAVIOR_TIME_PER_SECOND = DEFAULT_DT * 30
+
+def generate_behavior_tree(command, on_progress=None):
+    """
+    在第一次使用自然语言命令时才导入LLM客户端，避免拖慢启动；传入on_progress时流式生成。
+    服务商由环境变量BEHAVIOR_TREE_PROVIDER指定（claude、azure或离线的mock），默认为claude。
+    """
+    from test_claude_tooluse import generate_behavior_tree as generate
+    provider = os.environ.get("BEHAVIOR_TREE_PROVIDER", "claude")
+    return generate(command, provider=provider, on_progress=on_progress)
 
 class Game:
-    def __init__(self):
+    def __init__(self, sim_rate=30, render_fps=30, crowd=0, crowd_shards=None):
         # 调整窗口大小以适应行为树可视化
         self.width = 70
         self.height = 24
@@ -47,12 +60,30 @@ class Game:
         self.renderer.screen = self.game_surface  # 指定渲染到游戏区域表面
         
         # 猫和其他游戏元素
-        self.cat = Cat(self.width // 2, self.height // 2)
+        # 启用resume_running_leaf，活动路径作为tick的副产品由执行器维护
+        self.cat = Cat(self.width // 2, self.height // 2, resume_running_leaf=True)
+        # 可选的背景猫群：使用默认行为树，由多个工作进程分片模拟，渲染时从共享内存读取位置和状态
+        self.crowd = None
+        if crowd:
+            from sharded_world import ShardedWorld
+            self.crowd = ShardedWorld(crowd, json.loads(self.cat.behavior_tree_to_json()),
+                                      shards=crowd_shards, width=self.width, height=self.height)
         self.command_buffer = ""
         self.running = True
         self.clock = pygame.time.Clock()
+        
+        # 固定步长模拟：模拟频率与渲染帧率解耦，渲染卡顿时模拟速度保持不变
+        self.sim_rate = sim_rate  # 每秒模拟步数
+        self.render_fps = render_fps  # 渲染帧率上限
+        self.sim_dt = BEHAVIOR_TIME_PER_SECOND / sim_rate  # 每步推进的行为时间
+        self.sim_accumulator = 0.0
+        # 单帧最多补偿的真实时间（秒），卡顿后最多连续执行约8个模拟步，超出的时间直接丢弃
+        self.max_catchup_time = 0.25
+        
         self.show_help = True
         self.debug_mode = False
+        # 调试模式下生成的行为树会导出到这个文件
+        self.tree_debug_file = "behavior_tree_temp.json"
         
         # 文本光标相关
         self.cursor_visible = True
@@ -68,7 +99,8 @@ class Game:
         # 确保加载可用字体
         self.load_fonts()
         
-        # 记录当前活动节点
+        # 记录当前活动路径（根节点到运行中的叶子）和活动节点
+        self.active_path = []
         self.active_node = None
         
         # 记录被点击的节点和时间
@@ -76,6 +108,12 @@ class Game:
         self.clicked_node_time = 0
         self.clicked_node_display_time = 5000  # 显示5秒
         
+        # 后台流式生成行为树，避免LLM请求阻塞游戏循环
+        self.tree_generator = AsyncTreeGenerator(generate_behavior_tree, streaming=True)
+        # 生成过程中显示的部分行为树，以及已经提前应用的完整structure
+        self.preview_root = None
+        self.streamed_structure = None
+        
         # 命令历史记录
         self.command_history = []
         self.max_history = 5
@@ -94,6 +132,10 @@ class Game:
             'command': (190, 132, 255)
         }
         
+        # 局部重绘：只有窗口重建或被遮挡后才整屏重绘，其余帧只更新变化的区域
+        self.needs_full_redraw = True
+        self.info_render_key = None
+        
         # 预定义的命令列表
         self.predefined_commands = [
             "default", "sleep", "play", "wander", "explore", "interact", 
@@ -231,6 +273,7 @@ class Game:
             self.tree_visualizer.screen_width = self.tree_area.width
             self.tree_visualizer.screen_height = self.tree_area.height
             self.tree_visualizer.needs_recalculation = True
+            self.needs_full_redraw = True
             
     def toggle_fullscreen(self):
         """切换全屏/窗口模式"""
@@ -263,6 +306,7 @@ class Game:
         self.tree_visualizer.screen_width = self.tree_area.width
         self.tree_visualizer.screen_height = self.tree_area.height
         self.tree_visualizer.needs_recalculation = True
+        self.needs_full_redraw = True
         
     def load_fonts(self):
         """加载字体并进行测试"""
@@ -295,6 +339,10 @@ class Game:
             elif event.type == pygame.VIDEORESIZE:
                 self.handle_resize(event.size)
                 
+            # 窗口内容被系统丢弃（例如被遮挡后恢复）时整屏重绘
+            elif event.type == pygame.VIDEOEXPOSE:
+                self.needs_full_redraw = True
+                
             elif event.type == pygame.KEYDOWN:
                 # 重置光标状态 - 确保在键盘输入时光标立即可见
                 self.cursor_visible = True
@@ -373,15 +421,34 @@ class Game:
                             self.clicked_node_time = pygame.time.get_ticks()  # 记录点击时间，用于临时显示
     
     def process_natural_language_command(self, command):
-        """处理自然语言命令，生成行为树"""
+        """处理自然语言命令，在后台线程中生成行为树"""
         self.add_to_history(command)
         
         print(f"处理自然语言命令: {command}")
-        
-        try:
-            # 使用Claude生成行为树JSON
-            behavior_tree_json = generate_behavior_tree(command)
+        if self.tree_generator.pending:
+            print(f"取消未完成的请求: {self.tree_generator.pending_command}")
+        self.tree_generator.submit(command)
+        self.preview_root = None
+        self.streamed_structure = None
+        
+    def poll_generated_tree(self):
+        """检查后台生成的进度和结果，在主线程中预览或替换行为树"""
+        progress = self.tree_generator.poll_progress()
+        if progress is not None:
+            self.apply_generation_progress(*progress)
+        
+        result = self.tree_generator.poll()
+        if result is None:
+            return
+            
+        command, behavior_tree_json, error = result
+        self.preview_root = None
+        streamed_structure, self.streamed_structure = self.streamed_structure, None
+        if error is not None:
+            print(f"处理自然语言命令时出错: {error}")
+            return
             
+        try:
             if behavior_tree_json:
                 print("生成的行为树JSON:")
                 print(behavior_tree_json)
@@ -391,17 +458,9 @@ class Game:
                 
                 # 从behavior_tree.json格式提取structure部分
                 if "structure" in tree_data:
-                    # 保存为临时文件并应用
-                    with open("behavior_tree_temp.json", "w", encoding="utf-8") as f:
-                        json.dump(tree_data["structure"], f, ensure_ascii=False, indent=2)
-                    
-                    # 使用猫的方法加载这个行为树
-                    self.cat.load_behavior_tree("behavior_tree_temp.json")
-                    
-                    # 强制行为树可视化器重新计算布局
-                    self.tree_visualizer.needs_recalculation = True
-                    
-                    print("成功应用新的行为树")
+                    # 流式生成时structure完整后已经提前应用过
+                    if tree_data["structure"] != streamed_structure:
+                        self.apply_generated_structure(command, tree_data["structure"])
                 else:
                     print("生成的JSON格式不正确，缺少structure字段")
             else:
@@ -410,6 +469,41 @@ class Game:
         except Exception as e:
             print(f"处理自然语言命令时出错: {e}")
     
+    def apply_generation_progress(self, command, kind, structure):
+        """
+        处理流式生成的进度
+        
+        参数:
+            command: 正在生成的命令
+            kind: "preview"表示部分结构，"structure"表示structure已经完整
+            structure: 行为树结构字典
+        """
+        try:
+            if kind == "structure":
+                # 顶层结构已完整，不必等待其余字段，立即切换
+                self.preview_root = None
+                self.apply_generated_structure(command, structure)
+                self.streamed_structure = structure
+            else:
+                # 部分结构只用于可视化预览，不影响猫的行为
+                self.preview_root = self.cat.build_behavior_tree(structure)
+        except TreeValidationError as e:
+            if kind == "structure":
+                print(f"处理生成进度时出错: {e}")
+            # 不合法的预览保留上一次的预览，完整的structure到达时会报告错误
+        except Exception as e:
+            print(f"处理生成进度时出错: {e}")
+    
+    def apply_generated_structure(self, command, structure):
+        """将生成的structure直接应用到猫上，调试模式下同时导出到文件"""
+        debug_file = self.tree_debug_file if self.debug_mode else None
+        self.cat.apply_behavior_tree(structure, debug_file=debug_file)
+        
+        # 强制行为树可视化器重新计算布局
+        self.tree_visualizer.needs_recalculation = True
+        
+        print(f"成功应用新的行为树: {command}")
+    
     def add_to_history(self, command):
         """添加命令到历史记录"""
         if command in self.command_history:
@@ -418,30 +512,22 @@ class Game:
         if len(self.command_history) > self.max_history:
             self.command_history.pop()
                         
-    def update(self):
-        # 更新猫的行为
-        self.cat.update()
+    def update_simulation(self):
+        """执行一个固定步长的模拟步"""
+        # 猫群在工作进程中推进的同时，在主进程中更新玩家的猫
+        if self.crowd is not None:
+            self.crowd.begin_step(dt=self.sim_dt)
+        self.cat.update(self.sim_dt)
+        if self.crowd is not None:
+            self.crowd.finish_step()
         
-        # 更新活动节点（用于行为树可视化）
-        active_nodes = self.tree_visualizer.find_active_nodes(self.cat.root)
-        
-        # 特殊处理：检查特定状态并确保对应节点被标记为活动
-        if self.cat.state == "sleeping" and hasattr(self.cat, 'sleep_node'):
-            # 确保sleep_node在活动节点列表中
-            if self.cat.sleep_node not in active_nodes:
-                active_nodes.append(self.cat.sleep_node)
-        
-        # 同样处理其他核心行为
-        if self.cat.state == "playing" and hasattr(self.cat, 'play_node'):
-            if self.cat.play_node not in active_nodes:
-                active_nodes.append(self.cat.play_node)
-                
-        if self.cat.state == "wandering" and hasattr(self.cat, 'wander_node'):
-            if self.cat.wander_node not in active_nodes:
-                active_nodes.append(self.cat.wander_node)
+    def update(self):
+        # 应用后台生成完成的行为树
+        self.poll_generated_tree()
         
-        # 设置活动节点
-        self.active_node = active_nodes[0] if active_nodes else None
+        # 更新活动路径（用于行为树可视化），活动节点为正在运行的叶子
+        self.active_path = self.cat.active_path()
+        self.active_node = self.active_path[-1] if self.active_path else None
         
         # 更新光标闪烁
         current_time = pygame.time.get_ticks()
@@ -450,35 +536,52 @@ class Game:
             self.cursor_blink_time = current_time
         
     def render(self):
-        # 清除主屏幕
-        self.screen.fill(self.colors['background'])
-        
-        # 清除各子表面
-        self.game_surface.fill(self.colors['panel_bg'])
-        self.tree_surface.fill(self.colors['panel_bg'])
-        self.info_surface.fill(self.colors['panel_bg'])
+        """渲染一帧，只把各面板中发生变化的区域更新到屏幕上"""
+        full_redraw = self.needs_full_redraw
+        if full_redraw:
+            # 清除主屏幕，并让各面板在本帧完整重绘
+            self.screen.fill(self.colors['background'])
+            self.renderer.invalidate()
+            self.info_render_key = None
         
         # 绘制行为树区域 (先渲染行为树，因为它在上方)
-        self.render_tree_view()
+        tree_rects = self.render_tree_view()
         
         # 绘制游戏区域
-        self.render_game_view()
+        game_rects = self.render_game_view()
         
         # 绘制信息区域
-        self.render_info_view()
+        info_rects = self.update_info_view()
         
-        # 将子表面绘制到主屏幕上
-        self.screen.blit(self.tree_surface, self.tree_area)
-        self.screen.blit(self.game_surface, self.game_area)
-        self.screen.blit(self.info_surface, self.info_area)
+        panels = [
+            (self.tree_surface, self.tree_area, tree_rects, "行为树可视化 (上方)"),
+            (self.game_surface, self.game_area, game_rects, "游戏视图 (左下)"),
+            (self.info_surface, self.info_area, info_rects, "状态与信息 (右下)"),
+        ]
         
-        # 绘制区域边框和标题
-        self.draw_panel(self.tree_area, "行为树可视化 (上方)")
-        self.draw_panel(self.game_area, "游戏视图 (左下)")
-        self.draw_panel(self.info_area, "状态与信息 (右下)")
+        if full_redraw:
+            # 将子表面绘制到主屏幕上，并绘制区域边框和标题
+            for surface, area, _, title in panels:
+                self.screen.blit(surface, area)
+            for _, area, _, title in panels:
+                self.draw_panel(area, title)
+            pygame.display.flip()
+            self.needs_full_redraw = False
+            return
+        
+        # 只复制变化的区域，边框和标题可能被覆盖，需要重新绘制
+        update_rects = []
+        for surface, area, rects, title in panels:
+            if not rects:
+                continue
+            for rect in rects:
+                self.screen.blit(surface, rect.move(area.topleft), rect)
+                update_rects.append(rect.move(area.topleft))
+            self.draw_panel(area, title)
         
         # 更新屏幕
-        pygame.display.flip()
+        if update_rects:
+            pygame.display.update(update_rects)
     
     def draw_panel(self, rect, title):
         """绘制面板边框和标题"""
@@ -514,6 +617,11 @@ class Game:
         # 清除渲染器屏幕
         self.renderer.clear()
         
+        # 绘制猫群（每个格子只画一只），玩家的猫画在最上面
+        if self.crowd is not None:
+            for (x, y), state in self.crowd.cells().items():
+                self.renderer.draw_char(x, y, STATE_CHARS.get(state, "@"), self.get_state_color(state))
+        
         # 绘制猫
         cat_char = self.cat.get_display_char()
         self.renderer.draw_char(self.cat.x, self.cat.y, cat_char, self.get_state_color())
@@ -566,13 +674,42 @@ class Game:
             line = f"[{i+1}] {cmd}"
             self.renderer.draw_text(2, input_y - 5 + i, line, history_color)
         
-        # 更新渲染器
-        self.renderer.update()
+        # 更新渲染器，返回重绘的区域
+        return self.renderer.update()
         
     def render_tree_view(self):
-        """渲染行为树可视化"""
+        """渲染行为树可视化，返回重绘的区域"""
+        # 流式生成过程中显示已经到达的部分行为树
+        if self.preview_root is not None:
+            return self.tree_visualizer.render(self.tree_surface, self.preview_root)
         # 使用树可视化器渲染行为树
-        self.tree_visualizer.render(self.tree_surface, self.cat.root, self.active_node)
+        return self.tree_visualizer.render(self.tree_surface, self.cat.root, self.active_path)
+        
+    def update_info_view(self):
+        """显示内容变化时重绘信息区域，返回重绘的区域"""
+        current_time = pygame.time.get_ticks()
+        clicked_visible = bool(self.clicked_node) and (
+            current_time - self.clicked_node_time < self.clicked_node_display_time)
+        pending_elapsed = f"{self.tree_generator.elapsed():.1f}" if self.tree_generator.pending else None
+        
+        # 信息区域显示的全部内容，任一项变化都需要重绘
+        render_key = (
+            self.chinese_support,
+            self.cat.state, self.cat.x, self.cat.y,
+            self.cat.root.name,
+            self.active_node.name if self.active_node else None,
+            pending_elapsed,
+            self.clicked_node if clicked_visible else None,
+            tuple(self.cat.behavior_weights.items()),
+            tuple(self.command_history),
+        )
+        if render_key == self.info_render_key:
+            return []
+        self.info_render_key = render_key
+        
+        self.info_surface.fill(self.colors['panel_bg'])
+        self.render_info_view()
+        return [self.info_surface.get_rect()]
         
     def render_info_view(self):
         """渲染信息区域"""
@@ -610,6 +747,13 @@ class Game:
                     self.info_surface.blit(active_surface, (20, y_offset))
                     y_offset += line_height
                 
+                # 如果有正在后台生成的行为树，显示等待提示
+                if self.tree_generator.pending:
+                    pending_text = f"正在生成行为树... {self.tree_generator.elapsed():.1f}s"
+                    pending_surface = chinese_font.render(pending_text, True, self.colors['running'])
+                    self.info_surface.blit(pending_surface, (20, y_offset))
+                    y_offset += line_height
+                
                 # 如果有被点击的节点且在显示时间内，显示节点信息
                 current_time = pygame.time.get_ticks()
                 if self.clicked_node and (current_time - self.clicked_node_time < self.clicked_node_display_time):
@@ -701,6 +845,13 @@ class Game:
                 self.info_surface.blit(active_surface, (20, y_offset))
                 y_offset += line_height
             
+            # 如果有正在后台生成的行为树，显示等待提示
+            if self.tree_generator.pending:
+                pending_text = f"Generating tree... {self.tree_generator.elapsed():.1f}s"
+                pending_surface = self.info_font.render(pending_text, True, self.colors['running'])
+                self.info_surface.blit(pending_surface, (20, y_offset))
+                y_offset += line_height
+            
             # 如果有被点击的节点且在显示时间内，显示节点信息
             current_time = pygame.time.get_ticks()
             if self.clicked_node and (current_time - self.clicked_node_time < self.clicked_node_display_time):
@@ -874,37 +1025,55 @@ class Game:
         }
         return colors.get(behavior, (200, 200, 200))
     
-    def get_state_color(self):
-        """根据猫的状态返回对应的颜色"""
-        if self.cat.state == "sleeping":
+    def get_state_color(self, state=None):
+        """根据状态返回对应的颜色，默认使用玩家的猫的状态"""
+        if state is None:
+            state = self.cat.state
+        if state == "sleeping":
             return (160, 160, 255)  # 蓝色
-        elif self.cat.state == "playing":
+        elif state == "playing":
             return (255, 255, 0)    # 黄色
-        elif self.cat.state == "wandering":
+        elif state == "wandering":
             return (0, 255, 0)      # 绿色
-        elif self.cat.state == "observing":
+        elif state == "observing":
             return (255, 165, 0)    # 橙色
-        elif self.cat.state == "waiting":
+        elif state == "waiting":
             return (200, 200, 200)  # 淡灰色
-        elif self.cat.state == "moving":
+        elif state == "moving":
             return (255, 0, 255)    # 紫色
-        elif self.cat.state == "interacting":
+        elif state == "interacting":
             return (255, 0, 0)      # 红色
-        elif self.cat.state == "observing_wait":
+        elif state == "observing_wait":
             return (0, 255, 255)    # 青色
-        elif self.cat.state == "exploring":
+        elif state == "exploring":
             return (255, 128, 0)    # 橙红色
         return (255, 255, 255)      # 白色
         
     def run(self):
+        sim_step = 1.0 / self.sim_rate
+        # 重置时钟，启动耗时不计入第一帧
+        self.clock.tick()
         while self.running:
+            # 上一帧经过的真实时间（包括handle_input中的阻塞）
+            frame_time = self.clock.tick(self.render_fps) / 1000.0
             self.handle_input()
+            
+            # 累积真实时间，按固定步长执行所需数量的模拟步
+            self.sim_accumulator += min(frame_time, self.max_catchup_time)
+            while self.sim_accumulator >= sim_step:
+                self.update_simulation()
+                self.sim_accumulator -= sim_step
+                
             self.update()
             self.render()
-            self.clock.tick(30)
             
+        self.tree_generator.shutdown()
+        if self.crowd is not None:
+            self.crowd.close()
         pygame.quit()
         
 if __name__ == "__main__":
-    game = Game()
+    # CAT_CROWD设置背景猫群的数量，CAT_CROWD_SHARDS设置模拟它们的工作进程数（默认为CPU核数）
+    game = Game(crowd=int(os.environ.get("CAT_CROWD", 0)),
+                crowd_shards=int(os.environ.get("CAT_CROWD_SHARDS", 0)) or None)
     game.run() 
\ No newline at end of file
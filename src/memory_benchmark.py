@@ -0,0 +1,99 @@
+import argparse
+import gc
+import json
+import tracemalloc
+
+from cat import Cat, CatAgent
+from behavior_tree.actions import (
+    Sleep, Wander, Play, ObserveItems, RandomWait,
+    MoveToTarget, Interact, ObserveAndWait, Explore
+)
+from behavior_tree.composite import Sequence, Selector
+from behavior_tree.compiler import compile_tree
+from behavior_tree.registry import NODE_REGISTRY
+
+# 单独测量的节点类型
+NODE_CLASSES = [Sequence, Selector, Sleep, Wander, Play, ObserveItems, RandomWait,
+                MoveToTarget, Interact, ObserveAndWait, Explore]
+
+# 生成深层行为树时轮流使用的叶子
+DEEP_TREE_LEAVES = [
+    {"type": "CustomAction", "name": "Sleep", "params": [2.0]},
+    {"type": "CustomAction", "name": "AgentDestination"},
+    {"type": "CustomAction", "name": "Eat"},
+    {"type": "CustomAction", "name": "Play", "params": [3.0]},
+    {"type": "WaitTime", "params": [1.0]},
+]
+
+def measure(factory, count):
+    """
+    用tracemalloc测量factory()创建的对象平均占用的字节数
+
+    参数:
+        factory: 无参数的创建函数
+        count: 创建的对象数量，结果取平均值
+
+    返回:
+        每个对象的平均字节数（包括它独占的属性值，不包括共享的对象）
+    """
+    keep = [None] * count
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        keep[i] = factory()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count
+
+def deep_tree(depth, branching):
+    """
+    生成指定深度的行为树JSON，复合节点交替使用Selector和Sequence
+
+    返回:
+        (节点字典, 节点总数)
+    """
+    counter = [0]
+
+    def build(level):
+        counter[0] += 1
+        if level == depth:
+            return dict(DEEP_TREE_LEAVES[counter[0] % len(DEEP_TREE_LEAVES)])
+        node_type = "Selector" if level % 2 == 0 else "Sequence"
+        return {"name": node_type, "type": node_type,
+                "children": [build(level + 1) for _ in range(branching)]}
+
+    tree = build(0)
+    return tree, counter[0]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量行为树节点、猫和生成的深层行为树的内存占用")
+    parser.add_argument("--nodes", type=int, default=10000, help="每种节点创建的数量")
+    parser.add_argument("--cats", type=int, default=1000, help="创建的猫数量")
+    parser.add_argument("--depth", type=int, default=8, help="深层行为树的深度")
+    parser.add_argument("--branching", type=int, default=3, help="深层行为树每个复合节点的子节点数")
+    args = parser.parse_args(argv)
+
+    owner = Cat(35, 12)
+    print(f"{'节点类型':<18}{'字节/节点':>12}")
+    for node_class in NODE_CLASSES:
+        if issubclass(node_class, (Sequence, Selector)):
+            factory = lambda: node_class("node", [])
+        else:
+            factory = lambda: node_class("node", owner)
+        print(f"{node_class.__name__:<18}{measure(factory, args.nodes):>12.0f}")
+
+    tree_data, node_count = deep_tree(args.depth, args.branching)
+    tree_bytes = measure(lambda: NODE_REGISTRY.build(tree_data, owner), 1)
+    print(f"\n深层行为树: 深度 {args.depth}  分支 {args.branching}  节点 {node_count}")
+    print(f"  对象行为树: {tree_bytes / 1024:.1f} KB  {tree_bytes / node_count:.0f} 字节/节点")
+
+    template = compile_tree(json.loads(owner.behavior_tree_to_json()))
+    cat_bytes = measure(lambda: Cat(35, 12), args.cats)
+    agent_bytes = measure(lambda: CatAgent(35, 12, template), args.cats)
+    print(f"\n{'猫':<18}{'字节/只':>12}{'总计(MB)':>12}  ({args.cats}只)")
+    print(f"{'Cat':<18}{cat_bytes:>12.0f}{cat_bytes * args.cats / 1024 ** 2:>12.2f}")
+    print(f"{'CatAgent(共享)':<18}{agent_bytes:>12.0f}{agent_bytes * args.cats / 1024 ** 2:>12.2f}")
+
+if __name__ == "__main__":
+    main()
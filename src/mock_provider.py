@@ -0,0 +1,214 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+
+from llm_providers import TreeProvider
+from tree_cache import normalize_instruction
+
+# 规则表：命令中出现任一关键词时加入对应的分支，分支按关键词在命令中首次出现的位置排序
+DEFAULT_RULES = [
+    (("睡", "困", "累", "休息", "sleep", "tired", "rest"), [
+        {"type": "CustomCondition", "name": "IsTired"},
+        {"type": "CustomAction", "name": "Sleep", "params": [2.0]},
+    ]),
+    (("吃", "饿", "食物", "eat", "hungry", "food"), [
+        {"type": "CustomCondition", "name": "IsHungry"},
+        {"type": "CustomAction", "name": "AgentDestination"},
+        {"type": "CustomAction", "name": "Eat"},
+    ]),
+    (("玩", "无聊", "玩具", "play", "bored", "toy"), [
+        {"type": "CustomCondition", "name": "IsBored"},
+        {"type": "CustomAction", "name": "AgentDestination"},
+        {"type": "CustomAction", "name": "Play", "params": [3.0]},
+    ]),
+    (("孤独", "说话", "互动", "lonely", "talk", "interact"), [
+        {"type": "CustomCondition", "name": "IsLonely"},
+        {"type": "CustomAction", "name": "Talk"},
+    ]),
+    (("工作", "work"), [
+        {"type": "CustomAction", "name": "Work"},
+    ]),
+    (("探索", "观察", "explore", "observe"), [
+        {"type": "CustomAction", "name": "Explore"},
+        {"type": "CustomAction", "name": "ObserveItems"},
+    ]),
+]
+
+# 没有规则命中时以及所有分支之后的默认行为
+FALLBACK_BRANCH = [{"type": "CustomAction", "name": "AgentPatrol"}]
+
+def fixture_key(instruction):
+    """录制文件的名称，由规范化后的命令决定"""
+    return hashlib.sha256(normalize_instruction(instruction).encode("utf-8")).hexdigest()[:16]
+
+def record_fixture(directory, instruction, response):
+    """
+    把一次生成结果保存为录制文件，供MockTreeProvider离线回放
+
+    参数:
+        directory: 录制目录
+        instruction: 自然语言命令
+        response: 工具参数JSON字符串或字典
+
+    返回:
+        录制文件路径
+    """
+    if isinstance(response, str):
+        response = json.loads(response)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, fixture_key(instruction) + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"instruction": instruction, "response": response}, f, ensure_ascii=False, indent=2)
+    return path
+
+def load_fixtures(path):
+    """
+    读取录制文件
+
+    参数:
+        path: 录制目录，或包含一条/多条{"instruction", "response"}记录的JSON文件
+
+    返回:
+        {规范化命令: 工具参数字典}
+    """
+    if os.path.isdir(path):
+        files = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".json")]
+    else:
+        files = [path]
+
+    fixtures = {}
+    for filename in files:
+        with open(filename, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if isinstance(records, dict):
+            records = [records]
+        for record in records:
+            fixtures[normalize_instruction(record["instruction"])] = record["response"]
+    return fixtures
+
+class MockTreeProvider(TreeProvider):
+    """
+    离线的确定性行为树生成服务商
+
+    优先回放录制文件中与命令匹配的结果，否则按关键词规则表拼出行为树，
+    同一条命令总是得到相同的结果。可以模拟网络延迟和流式输出速度，
+    用于在没有网络和密钥的机器上测试、压测完整的生成流程。
+    """
+
+    name = "mock"
+    cacheable = False
+
+    def __init__(self, rules=None, fixtures=None, latency=0.0, jitter=0.0, seed=None,
+                 chunk_size=32, chunk_delay=0.0):
+        """
+        参数:
+            rules: 规则表[(关键词元组, 分支节点列表)]，默认为DEFAULT_RULES
+            fixtures: 录制目录/文件路径，或{命令: 工具参数字典}
+            latency: 每次请求返回（或流式返回第一段）前等待的秒数
+            jitter: 延迟的随机浮动范围（秒），由seed决定，可重复
+            seed: 延迟浮动的随机种子
+            chunk_size: 流式返回时每段的字符数
+            chunk_delay: 流式返回时每段之间的间隔（秒）
+        """
+        self.rules = DEFAULT_RULES if rules is None else rules
+        if isinstance(fixtures, str):
+            fixtures = load_fixtures(fixtures)
+        self.fixtures = {normalize_instruction(k): v for k, v in (fixtures or {}).items()}
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+
+    @classmethod
+    def from_env(cls):
+        """按环境变量MOCK_LLM_FIXTURES、MOCK_LLM_LATENCY、MOCK_LLM_CHUNK_DELAY创建"""
+        return cls(
+            fixtures=os.environ.get("MOCK_LLM_FIXTURES") or None,
+            latency=float(os.environ.get("MOCK_LLM_LATENCY", 0.0)),
+            chunk_delay=float(os.environ.get("MOCK_LLM_CHUNK_DELAY", 0.0)),
+        )
+
+    @property
+    def model(self):
+        return "mock-rules"
+
+    def build_structure(self, instruction):
+        """
+        按规则表为命令生成行为树结构
+
+        参数:
+            instruction: 自然语言命令
+
+        返回:
+            Root格式的行为树字典
+        """
+        text = normalize_instruction(instruction)
+        matches = []
+        for index, (keywords, branch) in enumerate(self.rules):
+            positions = [text.find(keyword) for keyword in keywords if keyword in text]
+            if positions:
+                matches.append((min(positions), index, branch))
+        matches.sort(key=lambda match: match[:2])
+
+        branches = [branch for _, _, branch in matches] + [FALLBACK_BRANCH]
+        return {
+            "name": "BehaviorTree",
+            "type": "Root",
+            "children": [{
+                "name": "Selector",
+                "type": "Selector",
+                "children": [
+                    {"name": "Sequence", "type": "Sequence", "children": [dict(node) for node in branch]}
+                    for branch in branches
+                ],
+            }],
+        }
+
+    def response(self, instruction):
+        """返回命令对应的工具参数字典（不含延迟）"""
+        recorded = self.fixtures.get(normalize_instruction(instruction))
+        if recorded is not None:
+            return recorded
+        return {"structure": self.build_structure(instruction)}
+
+    def _wait(self):
+        delay = self.latency
+        if self.jitter:
+            delay += self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def request(self, instruction):
+        self._wait()
+        return json.dumps(self.response(instruction), indent=2, ensure_ascii=False)
+
+    def stream(self, instruction):
+        text = json.dumps(self.response(instruction), ensure_ascii=False)
+        self._wait()
+        for start in range(0, len(text), self.chunk_size):
+            if start and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_size]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线模拟服务商：查看规则生成的行为树或录制真实服务商的结果")
+    parser.add_argument("instruction", help="自然语言命令")
+    parser.add_argument("--record", metavar="DIR", help="调用--provider生成并保存到录制目录")
+    parser.add_argument("--provider", default="claude", help="录制时使用的服务商")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        from test_claude_tooluse import generate_behavior_tree
+        result = generate_behavior_tree(args.instruction, provider=args.provider)
+        if result is None:
+            raise SystemExit("生成失败，没有保存录制文件")
+        print(f"已保存: {record_fixture(args.record, args.instruction, result)}")
+    else:
+        print(MockTreeProvider().request(args.instruction))
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,95 @@
 import pygame
+from collections import OrderedDict
 from util import get_font
 
+class GlyphAtlas:
+    """
+    字形缓存，把渲染好的字符打包到一张图集Surface上
+
+    以(字体, 字符, 颜色, 字号)为键，每个字形占用图集中一个固定大小的槽位，绘制时直接从图集blit，
+    不再每帧调用font.render。槽位用完后按最近最少使用淘汰，超出槽位大小的字形单独保存。
+    """
+
+    def __init__(self, slot_width, slot_height, columns=32, rows=16):
+        """
+        参数:
+            slot_width, slot_height: 每个槽位的像素大小
+            columns, rows: 图集的槽位列数和行数，两者乘积即缓存容量
+        """
+        self.slot_width = slot_width
+        self.slot_height = slot_height
+        self.columns = columns
+        self.capacity = columns * rows
+        self.surface = pygame.Surface((columns * slot_width, rows * slot_height), pygame.SRCALPHA)
+        # 键 -> (源Surface, 源区域, 槽位编号)，单独保存的字形槽位编号为None
+        self.entries = OrderedDict()
+        self.free_slots = list(range(self.capacity - 1, -1, -1))
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _evict(self):
+        """淘汰最久未使用的字形，返回空出的槽位"""
+        _, (_, _, slot) = self.entries.popitem(last=False)
+        if slot is not None:
+            self.free_slots.append(slot)
+
+    def get(self, font, char, color, size):
+        """
+        返回字形在图集中的位置，必要时先渲染并放入图集
+
+        参数:
+            font: 用于渲染的pygame字体
+            char: 单个字符
+            color: 颜色元组
+            size: 字号，作为缓存键的一部分
+
+        返回:
+            (源Surface, 源区域)，源区域为None时表示使用整个Surface
+        """
+        # 键中保存字体对象本身：同一字号换了字体（例如窗口缩放后重新加载）时不会取到旧字形，
+        # 持有引用也保证旧字体不会被回收后让新字体复用同一个id
+        key = (font, char, color, size)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+        self.misses += 1
+        text = font.render(char, True, color)
+        width, height = text.get_size()
+        if len(self.entries) >= self.capacity:
+            self._evict()
+
+        if width > self.slot_width or height > self.slot_height:
+            # 字形比槽位大，单独保存
+            entry = (text, None, None)
+        else:
+            if not self.free_slots:
+                # 单独保存的字形占满了容量但没有占用槽位
+                while not self.free_slots:
+                    self._evict()
+            slot = self.free_slots.pop()
+            slot_x = (slot % self.columns) * self.slot_width
+            slot_y = (slot // self.columns) * self.slot_height
+            self.surface.fill((0, 0, 0, 0), (slot_x, slot_y, self.slot_width, self.slot_height))
+            # BLEND_RGBA_MAX在透明背景上等价于原样复制像素（包括alpha）
+            self.surface.blit(text, (slot_x, slot_y), special_flags=pygame.BLEND_RGBA_MAX)
+            entry = (self.surface, pygame.Rect(slot_x, slot_y, width, height), slot)
+
+        self.entries[key] = entry
+        return entry[0], entry[1]
+
+    def clear(self):
+        """清空缓存"""
+        self.entries.clear()
+        self.free_slots = list(range(self.capacity - 1, -1, -1))
+
 class ASCIIRenderer:
     def __init__(self, width, height, cell_size=20):
         self.width = width
@@ -23,45 +112,74 @@ class ASCIIRenderer:
         # 预加载常用字体以避免渲染时延迟
         self._preload_fonts()
         
+        # 字形缓存，槽位宽度按中文字符占两个单元格计算
+        slot_height = max(get_font(True, self.ascii_font_size).get_height(),
+                          get_font(False, self.chinese_font_size).get_height())
+        self.glyphs = GlyphAtlas(cell_size * 2, slot_height)
+        
+        # 保留模式绘制：draw_char只记录单元格内容，update()时与上一帧比较，只重绘变化的行
+        self.background = (0, 0, 0)
+        self.cells = {}  # 本帧: (x, y) -> [(字符, 颜色), ...]，按绘制顺序
+        self.drawn_cells = {}  # 已经绘制到screen上的内容
+        self.dirty_rects = []  # 最近一次update()重绘的区域（screen坐标）
+        self._drawn_screen = None
+        self._drawn_cell_size = None
+        
     def _preload_fonts(self):
         """预加载常用字体"""
         get_font(True, self.ascii_font_size)  # 预加载ASCII字体
         get_font(False, self.chinese_font_size)  # 预加载中文字体
         
     def clear(self):
-        self.screen.fill((0, 0, 0))
+        """开始新的一帧，清空记录的单元格"""
+        self.cells = {}
+        
+    def invalidate(self):
+        """下一次update()时重绘整个屏幕"""
+        self._drawn_screen = None
         
     def draw_char(self, x, y, char, color=(255, 255, 255)):
         # 检查坐标是否在范围内
         if x < 0 or x >= self.width or y < 0 or y >= self.height:
             return
             
+        cell = self.cells.get((x, y))
+        if cell is None:
+            self.cells[(x, y)] = [(char, tuple(color))]
+        else:
+            cell.append((char, tuple(color)))
+            
+    def _blit_char(self, x, y, char, color):
+        """把单个字符绘制到screen上"""
         # 判断是ASCII字符还是中文字符
         is_ascii = ord(char) < 128
         
         # 获取适当的字体
         try:
-            font = get_font(is_ascii, 
-                         self.ascii_font_size if is_ascii else self.chinese_font_size)
+            size = self.ascii_font_size if is_ascii else self.chinese_font_size
+            font = get_font(is_ascii, size)
             
-            # 渲染文本
-            text = font.render(char, True, color)
+            # 从字形缓存中取出已渲染的字符
+            source, area = self.glyphs.get(font, char, color, size)
+            if area is None:
+                text_width, text_height = source.get_size()
+            else:
+                text_width, text_height = area.width, area.height
             
             # 计算文本位置以居中显示在单元格中
-            text_rect = text.get_rect()
             cell_x = x * self.cell_size
             cell_y = y * self.cell_size
             
             # ASCII字符居中显示
             if is_ascii:
-                pos_x = cell_x + (self.cell_size - text_rect.width) // 2
-                pos_y = cell_y + (self.cell_size - text_rect.height) // 2
+                pos_x = cell_x + (self.cell_size - text_width) // 2
+                pos_y = cell_y + (self.cell_size - text_height) // 2
             # 中文字符可能需要调整
             else:
                 pos_x = cell_x
-                pos_y = cell_y + (self.cell_size - text_rect.height) // 2
+                pos_y = cell_y + (self.cell_size - text_height) // 2
                 
-            self.screen.blit(text, (pos_x, pos_y))
+            self.screen.blit(source, (pos_x, pos_y), area)
         except Exception as e:
             # 如果渲染失败，使用备用方案（简单矩形）
             print(f"字符渲染错误: {e}")
@@ -87,10 +205,56 @@ class ASCIIRenderer:
         for i, line in enumerate(text_lines):
             if y + i < self.height:  # 确保不超出屏幕范围
                 self.draw_text(x, y + i, line, color)
+                
+    def _redraw(self, rect, columns, rows):
+        """清除rect并重绘可能覆盖到它的所有单元格"""
+        self.screen.fill(self.background, rect)
+        clip = self.screen.get_clip()
+        self.screen.set_clip(rect)
+        for (x, y), glyphs in self.cells.items():
+            if x in columns and y in rows:
+                for char, color in glyphs:
+                    self._blit_char(x, y, char, color)
+        self.screen.set_clip(clip)
             
     def update(self):
-        """更新屏幕，如果使用外部Surface则不需要刷新显示"""
-        pass
+        """
+        把本帧记录的单元格绘制到screen上，只重绘内容发生变化的行
+        
+        字形可能超出单元格（中文字符占两格、字体高度大于单元格），所以每个变化的单元格
+        会连同左右两格、上下一行一起在裁剪区域内重绘。重绘区域保存在dirty_rects中。
+        """
+        self.dirty_rects = []
+        cs = self.cell_size
+        
+        if self.screen is not self._drawn_screen or cs != self._drawn_cell_size:
+            # 目标Surface或单元格大小变化，整屏重绘
+            rect = self.screen.get_rect()
+            self._redraw(rect, range(self.width), range(self.height))
+            self.dirty_rects.append(rect)
+        else:
+            # 按行收集变化的列范围
+            changed_rows = {}
+            drawn = self.drawn_cells
+            for key in self.cells.keys() | drawn.keys():
+                if self.cells.get(key) != drawn.get(key):
+                    x, y = key
+                    low, high = changed_rows.get(y, (x, x))
+                    changed_rows[y] = (min(low, x), max(high, x))
+                    
+            # 字形向上下超出单元格的像素数
+            overflow = max(0, (self.glyphs.slot_height - cs + 1) // 2)
+            screen_rect = self.screen.get_rect()
+            for y, (low, high) in sorted(changed_rows.items()):
+                rect = pygame.Rect(low * cs - cs // 2, y * cs - overflow,
+                                   (high - low + 3) * cs, cs + 2 * overflow).clip(screen_rect)
+                self._redraw(rect, range(low - 2, high + 3), range(y - 1, y + 2))
+                self.dirty_rects.append(rect)
+                
+        self.drawn_cells = self.cells
+        self._drawn_screen = self.screen
+        self._drawn_cell_size = cs
+        return self.dirty_rects
         
     def cleanup(self):
         """清理资源，对于共享的屏幕不进行退出"""
@@ -0,0 +1,235 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+from behavior_tree.node import DEFAULT_DT
+from behavior_tree.batch import STATE_NAMES
+from behavior_tree.rng import resolve_seed
+
+def shard_ranges(count, shards):
+    """把count只猫按编号切分为shards个连续区间[(start, end)]，各区间大小最多相差1"""
+    shards = max(1, min(shards, count))
+    base, extra = divmod(count, shards)
+    ranges = []
+    start = 0
+    for i in range(shards):
+        end = start + base + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+class FrameLayout:
+    """
+    共享内存中两帧猫状态的布局
+
+    每帧依次保存x（int32）、y（int32）、state（int8，STATE_NAMES的下标）三个数组，
+    帧大小按8字节对齐。工作进程写入正在计算的一帧，渲染端读取上一次完成的一帧。
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.frame_size = (count * 9 + 7) // 8 * 8
+
+    @property
+    def size(self):
+        return max(self.frame_size * 2, 1)
+
+    def views(self, buf, frame, start=0, end=None):
+        """返回buf中第frame帧[start, end)区间的(x, y, state)内存视图"""
+        end = self.count if end is None else end
+        base = frame * self.frame_size
+        count = self.count
+        return (buf[base + start * 4:base + end * 4].cast('i'),
+                buf[base + (count + start) * 4:base + (count + end) * 4].cast('i'),
+                buf[base + count * 8 + start:base + count * 8 + end].cast('b'))
+
+def _build_engine(tree_data, count, positions, width, height, seed, first_agent, vectorized):
+    """在工作进程中构建本分片的批量引擎"""
+    from cat import Cat
+    if vectorized:
+        from behavior_tree.vectorized import VectorBatchEngine as BatchEngine
+    else:
+        from behavior_tree.batch import BatchEngine
+
+    cat = Cat(0, 0, seed=seed)
+    if tree_data is not None:
+        cat.apply_behavior_tree(tree_data)
+    return BatchEngine(cat.root, count, positions=positions, width=width, height=height,
+                       seed=seed, first_agent=first_agent)
+
+def _shard_worker(conn, shm_name, count, start, end, tree_data, positions, width, height, seed, vectorized):
+    """
+    工作进程主循环：构建分片引擎，按主进程的指令推进并把结果写入共享内存
+
+    指令为("step", ticks, dt, frame)或("close",)；每次step完成后回复本分片累计的node_ticks。
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    layout = FrameLayout(count)
+    frames = [layout.views(shm.buf, frame, start, end) for frame in (0, 1)]
+    try:
+        engine = _build_engine(tree_data, end - start, positions, width, height, seed, start, vectorized)
+
+        def publish(frame):
+            x, y, state = frames[frame]
+            x[:] = engine.x
+            y[:] = engine.y
+            state[:] = engine.state
+
+        publish(0)
+        conn.send("ready")
+        while True:
+            message = conn.recv()
+            if message[0] == "close":
+                break
+            _, ticks, dt, frame = message
+            for _ in range(ticks):
+                engine.tick(dt)
+            publish(frame)
+            conn.send(engine.node_ticks)
+    finally:
+        # 共享内存上的视图必须先释放才能关闭
+        for views in frames:
+            for view in views:
+                view.release()
+        shm.close()
+        conn.close()
+
+class ShardedWorld:
+    """
+    多进程分片的猫群模拟
+
+    猫按编号切分给多个工作进程，每个进程用一个批量引擎（BatchEngine或VectorBatchEngine）
+    模拟自己的分片，各分片每一步并行推进。位置和状态写入双缓冲的共享内存，
+    渲染端直接读取上一次完成的一帧，不需要在进程间传递猫的数据。
+
+    每只猫的随机数流只由seed和它的全局编号决定（见behavior_tree.rng），
+    所以结果与分片数量无关：同一seed下与单个引擎模拟完全相同。
+    """
+
+    def __init__(self, count, tree_data=None, shards=None, seed=None, width=70, height=24,
+                 positions=None, vectorized=False):
+        """
+        参数:
+            count: 猫的数量
+            tree_data: 所有猫共享的行为树JSON（Cat.apply_behavior_tree接受的格式），None表示默认行为树
+            shards: 工作进程数量，默认为CPU核数
+            seed: 随机数种子，None表示从全局random取一个
+            width, height: 活动区域大小
+            positions: 可选的初始坐标列表[(x, y), ...]，默认放在区域中心
+            vectorized: 工作进程是否使用NumPy向量化引擎
+        """
+        self.count = count
+        self.seed = resolve_seed(seed)
+        self.layout = FrameLayout(count)
+        self.ranges = shard_ranges(count, shards or os.cpu_count() or 1)
+        # 最近一次完成的帧，以及正在计算的帧（没有时为None）
+        self.frame = 0
+        self.pending = None
+        self.tick_count = 0
+        self.node_ticks = 0
+        self.shard_node_ticks = [0] * len(self.ranges)
+
+        self.shm = shared_memory.SharedMemory(create=True, size=self.layout.size)
+        self.frames = [self.layout.views(self.shm.buf, frame) for frame in (0, 1)]
+        self.connections = []
+        self.processes = []
+        for start, end in self.ranges:
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_shard_worker, name=f"cat-shard-{start}",
+                args=(child_conn, self.shm.name, count, start, end, tree_data,
+                      positions[start:end] if positions is not None else None,
+                      width, height, self.seed, vectorized),
+                daemon=True)
+            process.start()
+            child_conn.close()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+        try:
+            for conn in self.connections:
+                conn.recv()
+        except EOFError:
+            self.close()
+            raise RuntimeError("分片工作进程启动失败")
+
+    def begin_step(self, ticks=1, dt=DEFAULT_DT):
+        """
+        通知所有分片并行推进ticks次，立即返回
+
+        计算期间仍可以读取上一次完成的帧（positions/cells等），调用finish_step()等待完成。
+        """
+        if self.pending is not None:
+            raise RuntimeError("上一步还没有完成，先调用finish_step()")
+        self.pending = (1 - self.frame, ticks)
+        for conn in self.connections:
+            conn.send(("step", ticks, dt, self.pending[0]))
+
+    def finish_step(self):
+        """等待所有分片完成当前这一步，之后读取到的是新的一帧"""
+        if self.pending is None:
+            return
+        frame, ticks = self.pending
+        for i, conn in enumerate(self.connections):
+            self.shard_node_ticks[i] = conn.recv()
+        self.pending = None
+        self.frame = frame
+        self.tick_count += ticks
+        self.node_ticks = sum(self.shard_node_ticks)
+
+    def step(self, ticks=1, dt=DEFAULT_DT):
+        """所有分片并行推进ticks次并等待完成"""
+        self.begin_step(ticks, dt)
+        self.finish_step()
+
+    def arrays(self):
+        """返回最近完成的一帧的(x, y, state)内存视图，下一步完成后内容会被覆盖"""
+        return self.frames[self.frame]
+
+    def positions(self):
+        """返回所有猫的坐标列表"""
+        x, y, _ = self.arrays()
+        return list(zip(x, y))
+
+    def get_state(self, i):
+        """返回第i只猫的状态名称"""
+        return STATE_NAMES[self.arrays()[2][i]]
+
+    def cells(self):
+        """
+        返回每个被占据格子上显示的猫的状态
+
+        返回:
+            {(x, y): 状态名称}，同一格子有多只猫时取编号最大的一只
+        """
+        x, y, state = self.arrays()
+        return dict(zip(zip(x, y), map(STATE_NAMES.__getitem__, state)))
+
+    def close(self):
+        """停止工作进程并释放共享内存"""
+        if self.shm is None:
+            return
+        for conn in self.connections:
+            try:
+                conn.send(("close",))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for conn in self.connections:
+            conn.close()
+        for views in self.frames:
+            for view in views:
+                view.release()
+        self.frames = []
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
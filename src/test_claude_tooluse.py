@@ -1,20 +1,37 @@
 import base64
-import anthropic
-import httpx
 import os
 import json
-from openai import AzureOpenAI
 from dotenv import load_dotenv
 
+from tree_cache import TreeCache
+from behavior_tree.registry import NODE_REGISTRY, TreeValidationError
+from tree_stream import TreeStreamParser
+from llm_providers import TreeProvider, get_provider_registry, get_tree_provider, register_tree_provider
+from mock_provider import MockTreeProvider
+
+# The provider SDKs (anthropic, openai, httpx) are imported only when a client is
+# first created (see llm_providers), so importing this module stays cheap and
+# cached results never load them at all.
+
 # Load environment variables from .env file
 load_dotenv()
 
 image_url = "https://upload.wikimedia.org/wikipedia/commons/a/a7/Camponotus_flavomarginatus_ant.jpg"
 image_media_type = "image/jpeg"
-image_data = base64.standard_b64encode(httpx.get(image_url).content).decode("utf-8")
+_image_data = None
 
-# Use the API key from .env file
-client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+def get_image_data():
+    """
+    Download the example image on first use and return it base64-encoded.
+    
+    Returns:
+        str: Base64-encoded image bytes
+    """
+    global _image_data
+    if _image_data is None:
+        import httpx
+        _image_data = base64.standard_b64encode(httpx.get(image_url).content).decode("utf-8")
+    return _image_data
 
 # Example instruction for reference
 example_instruction = """
@@ -262,169 +279,158 @@ example_output = """
 }
 """
 
-# Available Action nodes:
-# - AgentPatrol(bool RandomRoute = false): Makes the agent patrol an area, with optional random route
-# - AgentDestination(): Makes the agent move to a specific destination
-# - Eat(): Makes the agent eat
-# - Sleep(): Makes the agent sleep
-# - Play(): Makes the agent play
-# - Talk(): Makes the agent talk
-# - Work(): Makes the agent work
-# - SelectAction(): Makes the agent select an action based on conditions
+# Custom action/condition names the model may use. They come from the node registry
+# shared with the tree loader, so every allowed name is guaranteed to load.
+ALLOWED_CUSTOM_ACTIONS = list(NODE_REGISTRY.exposed_actions)
+ALLOWED_CUSTOM_CONDITIONS = list(NODE_REGISTRY.exposed_conditions)
 
-# Available Condition nodes:
-# - IsTired: Checks if the agent is tired
-# - IsHungry: Checks if the agent is hungry
-# - IsBored: Checks if the agent is bored
-# - IsLonely: Checks if the agent is lonely
-# - HaveNextAction: Checks if the agent has a next action
+# Claude model used for behavior tree generation
+CLAUDE_MODEL = "claude-3-7-sonnet-20250219"
 
-def generate_behavior_tree_with_azure(instruction, api_version="2024-02-01"):
-    """
-    Generate a behavior tree from a natural language instruction using Azure OpenAI.
-    
-    Args:
-        instruction (str): Natural language instruction describing desired behavior
-        api_version (str): Azure OpenAI API version
-        
-    Returns:
-        str: JSON string representation of the behavior tree
-    """
-    # Create Azure OpenAI client
-    client = AzureOpenAI(
-        api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
-        api_version=api_version,
-        azure_endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT")
-    )
-    
-    # Example base behavior tree (same as used for Claude)
-    example_json = """
-    {
-      "name": "BehaviorTree",
-      "type": "Root",
-      "children": [
-        {
-          "type": "Sequence",
-          "name": "Sequence",
-          "children": [
-            {
-              "type": "CustomAction",
-              "name": "Sleep",
-              "params": [
-                0.9158622996289045
-              ]
+# Text2BehaviorTree tool for Claude
+CLAUDE_TEXT2BT_TOOL = {
+    "name": "Text2BehaviorTree",
+    "description": "Based on the user's instruction, generate a well-structured JSON for a behavior tree.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "nodes": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "type": {
+                            "type": "string",
+                            "description": "Type of node (Must be one of: Root, Sequence, Selector, Action, Condition, WaitTime, CustomAction, CustomCondition)"
+                        },
+                        "name": {
+                            "type": "string",
+                            "description": "If type is CustomAction or CustomCondition, this is the name of the node. Otherwise, it is the same as the type."
+                        },
+                        "children": {
+                            "type": "array",
+                            "description": "Child nodes, if applicable"
+                        },
+                        "params": {
+                            "type": "array",
+                            "description": "Parameters for the node, if applicable"
+                        }
+                    },
+                    "required": ["name", "type"]
+                },
+                "description": "All nodes in the behavior tree"
             },
-            {
-              "type": "WaitTime",
-              "name": "WaitTime",
-              "params": [
-                2.5864573062009315
-              ]
+            "structure": {
+                "type": "object",
+                "description": "The full JSON structure of the behavior tree"
             },
-            {
-              "name": "Selector",
-              "type": "Selector",
-              "children": [
-                {
-                  "name": "Sequence",
-                  "type": "Sequence",
-                  "children": [
-                    {
-                      "type": "CustomAction",
-                      "name": "AgentDestination",
-                    },
-                    {
-                      "type": "CustomAction",
-                      "name": "Eat"
-                    }
-                  ]
+            "allowed_custom_actions": {
+                "type": "array",
+                "items": {
+                    "type": "string",
+                    "enum": ALLOWED_CUSTOM_ACTIONS
                 },
-                {
-                  "name": "Sequence",
-                  "type": "Sequence",
-                  "children": [
-                    {
-                      "type": "CustomCondition",
-                      "name": "IsHungry",
-                    },
-                    {
-                      "type": "CustomAction",
-                      "name": "AgentPatrol"
-                    },
-                    {
-                      "type": "CustomAction",
-                      "name": "Talk"
-                    }
-                  ]
-                }
-              ]
+                "description": f"Only these action types are allowed: {', '.join(ALLOWED_CUSTOM_ACTIONS)}"
+            },
+            "allowed_custom_conditions": {
+                "type": "array",
+                "items": {
+                    "type": "string",
+                    "enum": ALLOWED_CUSTOM_CONDITIONS
+                },
+                "description": f"Only these condition types are allowed: {', '.join(ALLOWED_CUSTOM_CONDITIONS)}"
             }
-          ]
-        }
-      ]
+        },
+        "required": ["structure"]
     }
-    """
-    
-    # Define the Text2BehaviorTree tool for Azure OpenAI
-    text2_behavior_tree_tool = {
-        "type": "function",
-        "function": {
-            "name": "Text2BehaviorTree",
-            "description": "Based on the user's instruction, generate a well-structured JSON for a behavior tree.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "nodes": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "type": {
-                                    "type": "string",
-                                    "description": "Type of node (Must be one of: Root, Sequence, Selector, Action, Condition, WaitTime, CustomAction, CustomCondition)"
-                                },
-                                "name": {
-                                    "type": "string",
-                                    "description": "If type is CustomAction or CustomCondition, this is the name of the node. Otherwise, it is the same as the type."
-                                },
-                                "children": {
-                                    "type": "array",
-                                    "description": "Child nodes, if applicable"
-                                },
-                                "params": {
-                                    "type": "array",
-                                    "description": "Parameters for the node, if applicable"
-                                }
+}
+
+# Text2BehaviorTree tool for Azure OpenAI
+AZURE_TEXT2BT_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "Text2BehaviorTree",
+        "description": "Based on the user's instruction, generate a well-structured JSON for a behavior tree.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "nodes": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "type": {
+                                "type": "string",
+                                "description": "Type of node (Must be one of: Root, Sequence, Selector, Action, Condition, WaitTime, CustomAction, CustomCondition)"
+                            },
+                            "name": {
+                                "type": "string",
+                                "description": "If type is CustomAction or CustomCondition, this is the name of the node. Otherwise, it is the same as the type."
+                            },
+                            "children": {
+                                "type": "array",
+                                "description": "Child nodes, if applicable"
                             },
-                            "required": ["name", "type"]
+                            "params": {
+                                "type": "array",
+                                "description": "Parameters for the node, if applicable"
+                            }
                         },
-                        "description": "All nodes in the behavior tree"
+                        "required": ["name", "type"]
                     },
-                    "structure": {
-                        "type": "object",
-                        "description": "The full JSON structure of the behavior tree"
-                    },
-                    "allowed_custom_actions": {
-                        "type": "array",
-                        "items": {
-                            "type": "string",
-                            "enum": ["AgentPatrol", "AgentDestination", "Eat", "Sleep", "Play", "Talk", "Work", "SelectAction"]
-                        },
-                        "description": "Only these action types are allowed: AgentPatrol, AgentDestination, Eat, Sleep, Play, Talk, Work, SelectAction"
+                    "description": "All nodes in the behavior tree"
+                },
+                "structure": {
+                    "type": "object",
+                    "description": "The full JSON structure of the behavior tree"
+                },
+                "allowed_custom_actions": {
+                    "type": "array",
+                    "items": {
+                        "type": "string",
+                        "enum": ALLOWED_CUSTOM_ACTIONS
                     },
-                    "allowed_custom_conditions": {
-                        "type": "array",
-                        "items": {
-                            "type": "string",
-                            "enum": ["IsTired", "IsHungry", "IsBored", "IsLonely", "HaveNextAction"]
-                        },
-                        "description": "Only these condition types are allowed: IsTired, IsHungry, IsBored, IsLonely, HaveNextAction"
-                    }
+                    "description": f"Only these action types are allowed: {', '.join(ALLOWED_CUSTOM_ACTIONS)}"
                 },
-                "required": ["structure"]
-            }
+                "allowed_custom_conditions": {
+                    "type": "array",
+                    "items": {
+                        "type": "string",
+                        "enum": ALLOWED_CUSTOM_CONDITIONS
+                    },
+                    "description": f"Only these condition types are allowed: {', '.join(ALLOWED_CUSTOM_CONDITIONS)}"
+                }
+            },
+            "required": ["structure"]
         }
     }
+}
+
+def build_prompt(instruction):
+    """
+    Build the user prompt asking the model to modify the base behavior tree.
+    
+    Args:
+        instruction (str): Natural language instruction describing desired behavior
+        
+    Returns:
+        str: Prompt text
+    """
+    return f"Based on this instruction, modify original behavior tree JSON: {instruction}. Only use these action nodes: {', '.join(ALLOWED_CUSTOM_ACTIONS)}. And only use these condition nodes: {', '.join(ALLOWED_CUSTOM_CONDITIONS)}. Previous Behavior Tree JSON: {example_json}"
+
+def generate_behavior_tree_with_azure(instruction, api_version="2024-02-01"):
+    """
+    Generate a behavior tree from a natural language instruction using Azure OpenAI.
+    
+    Args:
+        instruction (str): Natural language instruction describing desired behavior
+        api_version (str): Azure OpenAI API version
+        
+    Returns:
+        str: JSON string representation of the behavior tree
+    """
+    # Reuse the shared Azure OpenAI client and its connection pool
+    client = get_provider_registry().client("azure", api_version=api_version)
     
     # Create the message with Azure OpenAI
     response = client.chat.completions.create(
@@ -432,10 +438,10 @@ def generate_behavior_tree_with_azure(instruction, api_version="2024-02-01"):
         messages=[
             {
                 "role": "user",
-                "content": f"Based on this instruction, modify original behavior tree JSON: {instruction}. Only use these action nodes: AgentPatrol, AgentDestination, Eat, Sleep, Play, Talk, Work, SelectAction. And only use these condition nodes: IsTired, IsHungry, IsBored, IsLonely, HaveNextAction. Previous Behavior Tree JSON: {example_json}"
+                "content": build_prompt(instruction)
             }
         ],
-        tools=[text2_behavior_tree_tool],
+        tools=[AZURE_TEXT2BT_TOOL],
         tool_choice={"type": "function", "function": {"name": "Text2BehaviorTree"}}
     )
     
@@ -501,167 +507,204 @@ def parse_claude_response(message):
     print("Warning: Could not extract behavior tree from Claude response")
     return None
 
-def generate_behavior_tree(instruction, provider="claude"):
+# Lazily created on-disk cache of generated trees
+_tree_cache = None
+
+def get_tree_cache():
     """
-    Generate a behavior tree from a natural language instruction.
+    Return the shared on-disk behavior tree cache, creating it on first use.
+    
+    Returns:
+        TreeCache: The module-level cache instance
+    """
+    global _tree_cache
+    if _tree_cache is None:
+        _tree_cache = TreeCache.from_env()
+    return _tree_cache
+
+def is_valid_tree_result(result):
+    """
+    Check whether a generated result can be applied to a cat.
+    
+    Only such results are cached, so a malformed response (for example the raw
+    Azure arguments string) is not replayed on later identical commands.
     
     Args:
-        instruction (str): Natural language instruction describing desired behavior
-        provider (str): The AI provider to use ('claude' or 'azure')
+        result (str): JSON string returned by a provider
         
     Returns:
-        str: JSON string representation of the behavior tree
+        bool: True if the JSON parses and its structure passes node registry validation
     """
-    if provider.lower() == "azure":
-        return generate_behavior_tree_with_azure(instruction)
-    else:  # Use Claude by default
-        # Use the API key from .env file
-        client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-        
-        # Example base behavior tree
-        example_json = """
-        {
-          "name": "BehaviorTree",
-          "type": "Root",
-          "children": [
-            {
-              "type": "Sequence",
-              "name": "Sequence",
-              "children": [
-                {
-                  "type": "CustomAction",
-                  "name": "Sleep",
-                  "params": [
-                    0.9158622996289045
-                  ]
-                },
-                {
-                  "type": "WaitTime",
-                  "name": "WaitTime",
-                  "params": [
-                    2.5864573062009315
-                  ]
-                },
-                {
-                  "name": "Selector",
-                  "type": "Selector",
-                  "children": [
-                    {
-                      "name": "Sequence",
-                      "type": "Sequence",
-                      "children": [
-                        {
-                          "type": "CustomAction",
-                          "name": "AgentDestination",
-                        },
-                        {
-                          "type": "CustomAction",
-                          "name": "Eat"
-                        }
-                      ]
-                    },
-                    {
-                      "name": "Sequence",
-                      "type": "Sequence",
-                      "children": [
-                        {
-                          "type": "CustomCondition",
-                          "name": "IsHungry",
-                        },
-                        {
-                          "type": "CustomAction",
-                          "name": "AgentPatrol"
-                        },
-                        {
-                          "type": "CustomAction",
-                          "name": "Talk"
-                        }
-                      ]
-                    }
-                  ]
-                }
-              ]
-            }
-          ]
-        }
-        """
-        
-        message = client.messages.create(
-            model="claude-3-7-sonnet-20250219",
+    try:
+        tree_data = json.loads(result)
+    except ValueError:
+        return False
+    structure = tree_data.get("structure") if isinstance(tree_data, dict) else None
+    if not isinstance(structure, dict):
+        return False
+    if structure.get("type") == "Root" and structure.get("children"):
+        structure = structure["children"][0]
+    try:
+        NODE_REGISTRY.validate(structure)
+    except TreeValidationError:
+        return False
+    return True
+
+class ClaudeProvider(TreeProvider):
+    """Generate behavior trees with the Claude Messages API."""
+    
+    name = "claude"
+    tool_schema = CLAUDE_TEXT2BT_TOOL
+    
+    @property
+    def model(self):
+        return CLAUDE_MODEL
+    
+    def _create(self, instruction, **kwargs):
+        # Reuse the shared Claude client and its connection pool
+        client = get_provider_registry().client("claude")
+        return client.messages.create(
+            model=CLAUDE_MODEL,
             max_tokens=2048,
-            tools=[
-                {
-                    "name": "Text2BehaviorTree",
-                    "description": "Based on the user's instruction, generate a well-structured JSON for a behavior tree.",
-                    "input_schema": {
-                        "type": "object",
-                        "properties": {
-                            "nodes": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "type": {
-                                            "type": "string",
-                                            "description": "Type of node (Must be one of: Root, Sequence, Selector, Action, Condition, WaitTime, CustomAction, CustomCondition)"
-                                        },
-                                        "name": {
-                                            "type": "string",
-                                            "description": "If type is CustomAction or CustomCondition, this is the name of the node. Otherwise, it is the same as the type."
-                                        },
-                                        "children": {
-                                            "type": "array",
-                                            "description": "Child nodes, if applicable"
-                                        },
-                                        "params": {
-                                            "type": "array",
-                                            "description": "Parameters for the node, if applicable"
-                                        }
-                                    },
-                                    "required": ["name", "type"]
-                                },
-                                "description": "All nodes in the behavior tree"
-                            },
-                            "structure": {
-                                "type": "object",
-                                "description": "The full JSON structure of the behavior tree"
-                            },
-                            "allowed_custom_actions": {
-                                "type": "array",
-                                "items": {
-                                    "type": "string",
-                                    "enum": ["AgentPatrol", "AgentDestination", "Eat", "Sleep", "Play", "Talk", "Work", "SelectAction"]
-                                },
-                                "description": "Only these action types are allowed: AgentPatrol, AgentDestination, Eat, Sleep, Play, Talk, Work, SelectAction"
-                            },
-                            "allowed_custom_conditions": {
-                                "type": "array",
-                                "items": {
-                                    "type": "string",
-                                    "enum": ["IsTired", "IsHungry", "IsBored", "IsLonely", "HaveNextAction"]
-                                },
-                                "description": "Only these condition types are allowed: IsTired, IsHungry, IsBored, IsLonely, HaveNextAction"
-                            }
-                        },
-                        "required": ["structure"]
-                    }
-                }
-            ],
+            tools=[CLAUDE_TEXT2BT_TOOL],
             tool_choice={"type": "tool", "name": "Text2BehaviorTree"},
             messages=[
                 {
                     "role": "user",
                     "content": [
-                        {"type": "text", "text": f"Based on this instruction, modify original behavior tree JSON: {instruction}. Only use these action nodes: AgentPatrol, AgentDestination, Eat, Sleep, Play, Talk, Work, SelectAction. And only use these condition nodes: IsTired, IsHungry, IsBored, IsLonely, HaveNextAction. Previous Behavior Tree JSON: {example_json}"}
+                        {"type": "text", "text": build_prompt(instruction)}
                     ]
                 }
-            ]
+            ],
+            **kwargs
         )
-
+    
+    def request(self, instruction):
+        message = self._create(instruction)
+        
         print(message)
         
         # Use the dedicated parser function to extract the behavior tree
         return parse_claude_response(message)
+    
+    def stream(self, instruction):
+        with self._create(instruction, stream=True) as stream:
+            for event in stream:
+                if event.type == "content_block_delta" and event.delta.type == "input_json_delta":
+                    yield event.delta.partial_json
+
+class AzureProvider(TreeProvider):
+    """Generate behavior trees with Azure OpenAI function calling."""
+    
+    name = "azure"
+    tool_schema = AZURE_TEXT2BT_TOOL
+    
+    def __init__(self, api_version="2024-02-01"):
+        self.api_version = api_version
+    
+    @property
+    def model(self):
+        return os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME")
+    
+    def request(self, instruction):
+        return generate_behavior_tree_with_azure(instruction, self.api_version)
+    
+    def stream(self, instruction):
+        client = get_provider_registry().client("azure", api_version=self.api_version)
+        stream = client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": build_prompt(instruction)}],
+            tools=[AZURE_TEXT2BT_TOOL],
+            tool_choice={"type": "function", "function": {"name": "Text2BehaviorTree"}},
+            stream=True
+        )
+        with stream:
+            for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.tool_calls:
+                    continue
+                for tool_call in chunk.choices[0].delta.tool_calls:
+                    if tool_call.function is not None and tool_call.function.arguments:
+                        yield tool_call.function.arguments
+
+# Built-in providers; more can be added with llm_providers.register_tree_provider().
+# The offline mock is configured from MOCK_LLM_* environment variables.
+register_tree_provider(ClaudeProvider())
+register_tree_provider(AzureProvider())
+register_tree_provider(MockTreeProvider.from_env())
+
+def generate_behavior_tree(instruction, provider="claude", use_cache=True, on_progress=None):
+    """
+    Generate a behavior tree from a natural language instruction.
+    
+    Identical requests (same provider, model, normalized instruction, base tree
+    and tool schema) are answered from the on-disk cache without calling the API;
+    only results that pass is_valid_tree_result are written to it.
+    When on_progress is given the response is streamed and the partially built
+    tree is reported while it arrives (see stream_tool_input); cache hits report nothing.
+    
+    Args:
+        instruction (str): Natural language instruction describing desired behavior
+        provider (str or TreeProvider): A registered provider name ('claude', 'azure',
+            'mock', ...) or a provider instance
+        use_cache (bool): Whether to read and write the on-disk cache
+        on_progress (callable): Optional callback(kind, structure), enables streaming
+        
+    Returns:
+        str: JSON string representation of the behavior tree
+    """
+    if not isinstance(provider, TreeProvider):
+        provider = get_tree_provider(provider)
+
+    use_cache = use_cache and provider.cacheable
+    if use_cache:
+        cache = get_tree_cache()
+        key = cache.make_key(provider.name, provider.model, instruction, example_json, provider.tool_schema)
+        cached = cache.get(key)
+        if cached is not None:
+            print("Using cached behavior tree")
+            return cached
+
+    if on_progress is not None:
+        result = stream_tool_input(provider.stream(instruction), on_progress)
+    else:
+        result = provider.request(instruction)
+    if use_cache and result is not None:
+        if is_valid_tree_result(result):
+            cache.put(key, result)
+        else:
+            print("Not caching invalid behavior tree")
+    return result
+
+def stream_tool_input(chunks, on_progress):
+    """
+    Incrementally parse streamed Text2BehaviorTree tool input.
+    
+    on_progress is called with ("preview", structure) whenever another node has fully
+    arrived, and once with ("structure", structure) as soon as the top-level structure
+    object is complete, before the remaining fields (nodes, allowed_*) have streamed in.
+    
+    Args:
+        chunks: Iterable of partial tool-input JSON strings
+        on_progress (callable): Callback(kind, structure)
+        
+    Returns:
+        str: JSON string of the complete tool input, or None if nothing arrived
+    """
+    parser = TreeStreamParser()
+    previewed = 0
+    for chunk in chunks:
+        structure = parser.feed(chunk)
+        if structure is not None:
+            on_progress("structure", structure)
+        elif not parser.structure_complete and parser.closed_objects != previewed:
+            # The preview only changes when another object has closed
+            previewed = parser.closed_objects
+            preview = parser.preview()
+            if preview is not None:
+                on_progress("preview", preview)
+    if not parser.length:
+        return None
+    return json.dumps(parser.result(), indent=2, ensure_ascii=False)
 
 def format_azure_response(azure_response):
     """
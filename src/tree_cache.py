@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import time
+
+DEFAULT_CACHE_DIR = ".tree_cache"
+DEFAULT_MAX_ENTRIES = 256
+
+def normalize_instruction(instruction):
+    """合并多余空白并忽略大小写，使只有格式差异的命令命中同一条缓存"""
+    return " ".join(instruction.split()).casefold()
+
+class TreeCache:
+    """
+    按内容寻址的行为树磁盘缓存
+
+    缓存键是(服务商, 模型, 规范化后的命令, 原始行为树JSON, 工具schema)的SHA-256，
+    每条记录保存为目录下的一个<哈希>.json文件。读取命中时更新文件修改时间，
+    写入时按修改时间淘汰最久未使用的记录，直到条目数和总大小都在限制以内。
+    """
+
+    def __init__(self, directory=None, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=16 * 1024 * 1024, ttl=None):
+        """
+        参数:
+            directory: 缓存目录，默认读取环境变量BEHAVIOR_TREE_CACHE_DIR
+            max_entries: 最多保存的记录数
+            max_bytes: 所有记录文件的总大小上限
+            ttl: 记录有效期（秒），None表示永不过期
+        """
+        self.directory = directory or os.environ.get("BEHAVIOR_TREE_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        按环境变量创建缓存，未设置的项使用默认值
+
+        BEHAVIOR_TREE_CACHE_DIR: 缓存目录
+        BEHAVIOR_TREE_CACHE_TTL: 记录有效期（秒），未设置时永不过期
+        BEHAVIOR_TREE_CACHE_MAX_ENTRIES: 最多保存的记录数
+        """
+        ttl = os.environ.get("BEHAVIOR_TREE_CACHE_TTL")
+        max_entries = os.environ.get("BEHAVIOR_TREE_CACHE_MAX_ENTRIES")
+        return cls(
+            ttl=float(ttl) if ttl else None,
+            max_entries=int(max_entries) if max_entries else DEFAULT_MAX_ENTRIES,
+        )
+
+    @staticmethod
+    def make_key(provider, model, instruction, base_tree, tool_schema):
+        """
+        计算缓存键
+
+        参数:
+            provider: 服务商名称
+            model: 模型或部署名称
+            instruction: 自然语言命令
+            base_tree: 作为修改基础的行为树JSON字符串
+            tool_schema: 请求中使用的工具定义（字典）
+
+        返回:
+            十六进制哈希字符串
+        """
+        payload = json.dumps([
+            provider.lower(),
+            model or "",
+            normalize_instruction(instruction),
+            base_tree,
+            tool_schema,
+        ], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        """返回缓存的行为树JSON字符串，未命中或已过期时返回None"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except OSError:
+            self.misses += 1
+            return None
+        except ValueError:
+            record = None
+
+        # 损坏或格式不对的记录（例如被其他程序改写）视为未命中并删除
+        if (not isinstance(record, dict) or "value" not in record
+                or not isinstance(record.get("created"), (int, float))):
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        if self.ttl is not None and time.time() - record["created"] > self.ttl:
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return record["value"]
+
+    def put(self, key, value):
+        """保存一条记录并按需淘汰旧记录"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # 先写临时文件再替换，避免其他进程读到写了一半的记录
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "value": value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def _entries(self):
+        """返回[(修改时间, 大小, 路径)]，按最近使用时间从旧到新排序"""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        return entries
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """删除过期记录以及超出条目数或大小限制的最久未使用记录"""
+        entries = self._entries()
+        if self.ttl is not None:
+            cutoff = time.time() - self.ttl
+            # 修改时间只会因命中而变新，因此早于截止时间的记录一定已经过期
+            for entry in [e for e in entries if e[0] < cutoff]:
+                self._remove(entry[2])
+                entries.remove(entry)
+
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """删除所有记录"""
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def stats(self):
+        """返回命中统计和当前占用"""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,202 @@
+import json
+
+# 容器的开闭括号
+CLOSERS = {"{": "}", "[": "]"}
+# 预览时补在未闭合对象末尾的标记键，真实的工具参数中不会出现
+OPEN_KEY = "\x00open"
+OPEN_MARK = json.dumps(OPEN_KEY) + ":true"
+
+class TreeStreamParser:
+    """
+    增量解析流式返回的Text2BehaviorTree工具参数
+
+    工具参数的JSON以任意大小的片段到达。每个片段只扫描一次，记录括号栈、字符串状态和
+    "安全截断点"（某个对象或数组刚闭合的位置及当时的括号栈）。需要预览时从最近的截断点
+    截断并补齐括号，得到合法JSON，预览中只保留已经闭合的叶子节点；顶层structure对象闭合后
+    立即解析出完整行为树，无需等待nodes等其余字段。
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.length = 0
+
+        # 扫描状态
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        # 顶层对象中当前键名的收集状态
+        self.expect_key = False
+        self.key_chars = None
+        self.top_key = None
+
+        # 最近的安全截断点：(位置, 当时的括号栈, 截断点是否紧跟在开括号之后)
+        self.cut = None
+        # 已闭合的对象数量，预览内容只会在它变化时改变
+        self.closed_objects = 0
+
+        self.structure_start = None
+        self.structure = None
+
+    @property
+    def structure_complete(self):
+        """顶层structure对象是否已经完整到达"""
+        return self.structure is not None
+
+    def text(self):
+        """返回目前收到的全部文本"""
+        return "".join(self.buffer)
+
+    def feed(self, chunk):
+        """
+        输入一个文本片段
+
+        参数:
+            chunk: 工具参数JSON的一段
+
+        返回:
+            本片段使structure完整时返回structure字典，否则返回None
+        """
+        if not chunk:
+            return None
+        self.buffer.append(chunk)
+        offset = self.length
+        self.length += len(chunk)
+        completed = None
+
+        stack = self.stack
+        for i, ch in enumerate(chunk):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.key_chars is not None:
+                        self.top_key = "".join(self.key_chars)
+                        self.key_chars = None
+                elif self.key_chars is not None:
+                    self.key_chars.append(ch)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                # 只需要顶层对象的键名，用来识别structure字段
+                if len(stack) == 1 and self.expect_key:
+                    self.key_chars = []
+                    self.expect_key = False
+            elif ch == "{" or ch == "[":
+                stack.append(ch)
+                if len(stack) == 1:
+                    self.expect_key = ch == "{"
+                elif len(stack) == 2 and ch == "{" and self.top_key == "structure":
+                    self.structure_start = offset + i
+                self.cut = (offset + i + 1, "".join(stack), True)
+            elif ch == "}" or ch == "]":
+                if not stack:
+                    continue
+                stack.pop()
+                if ch == "}":
+                    self.closed_objects += 1
+                if len(stack) == 1 and self.structure_start is not None and self.structure is None:
+                    end = offset + i + 1
+                    self.structure = json.loads(self.text()[self.structure_start:end])
+                    completed = self.structure
+                self.cut = (offset + i + 1, "".join(stack), False)
+            elif ch == "," and len(stack) == 1:
+                self.expect_key = stack[0] == "{"
+        return completed
+
+    @staticmethod
+    def _closing(stack, just_opened, mark_open):
+        """
+        截断点处需要补齐的闭括号
+
+        参数:
+            stack: 截断点处的括号栈
+            just_opened: 截断点是否紧跟在最内层的开括号之后
+            mark_open: 是否在每个未闭合的对象末尾加上OPEN_KEY标记
+        """
+        parts = []
+        for depth, ch in enumerate(reversed(stack)):
+            if ch == "{" and mark_open:
+                # 只有刚打开的空对象不需要逗号，其余截断点都紧跟在一个完整的值之后
+                parts.append(("" if depth == 0 and just_opened else ",") + OPEN_MARK)
+            parts.append(CLOSERS[ch])
+        return "".join(parts)
+
+    def _parse_prefix(self, mark_open):
+        if self.cut is None:
+            return None
+        position, stack, just_opened = self.cut
+        try:
+            return json.loads(self.text()[:position] + self._closing(stack, just_opened, mark_open))
+        except ValueError:
+            return None
+
+    def partial(self):
+        """
+        返回目前可以解析的最大前缀对应的JSON对象
+
+        返回:
+            补齐括号后的字典，尚无可用内容时返回None
+        """
+        return self._parse_prefix(False)
+
+    def preview(self):
+        """
+        返回当前可预览的行为树结构
+
+        structure完整时直接返回它，否则返回部分结构：叶子节点只有闭合后才出现（此前name、params
+        可能还没到达），仍在接收子节点的复合节点保留已闭合的子节点，缺少type字段的节点会被去掉；Root下还没有节点时返回None。
+
+        返回:
+            structure字典，尚无内容时返回None
+        """
+        if self.structure is not None:
+            return self.structure
+        data = self._parse_prefix(True)
+        if not isinstance(data, dict):
+            return None
+        structure = data.get("structure")
+        if not isinstance(structure, dict):
+            return None
+        structure = prune_incomplete_nodes(structure)
+        if structure is not None and structure.get("type") == "Root" and not structure.get("children"):
+            # Root包装下还没有任何节点，没有可预览的内容
+            return None
+        return structure
+
+    def result(self):
+        """
+        返回完整的工具参数
+
+        返回:
+            解析后的字典，JSON不完整时抛出ValueError
+        """
+        return json.loads(self.text())
+
+def prune_incomplete_nodes(node_data):
+    """
+    递归去掉不完整的节点并清除OPEN_KEY标记
+
+    没有type字段的节点，以及带OPEN_KEY标记（尚未闭合）且没有children数组的叶子节点会被去掉。
+
+    参数:
+        node_data: 节点字典
+
+    返回:
+        新的节点字典，自身不完整时返回None
+    """
+    if not isinstance(node_data, dict) or "type" not in node_data:
+        return None
+    children = node_data.get("children")
+    if OPEN_KEY in node_data:
+        if not isinstance(children, list):
+            return None
+        node_data = {key: value for key, value in node_data.items() if key != OPEN_KEY}
+    if not isinstance(children, list):
+        return node_data
+    pruned = dict(node_data)
+    pruned["children"] = [child for child in map(prune_incomplete_nodes, children) if child is not None]
+    return pruned
@@ -34,7 +34,17 @@ class TreeVisualizer:
         
         # 初始化变量
         self.needs_recalculation = True
-        self.last_tree_hash = None
+        # 上一次计算布局时的(根节点, 结构版本号)，用于O(1)检测结构变化
+        self.last_structure = None
+        
+        # 预渲染的静态行为树（连接线、节点、标签），结构或缩放变化时重建
+        self.static_surface = None
+        self.node_labels = {}
+        self.node_bounds = {}
+        
+        # 上一次绘制的目标表面和高亮状态，没有变化时跳过重绘
+        self.last_surface = None
+        self.last_render_key = ()
         
     def init_fonts(self):
         """初始化字体并测试中文支持"""
@@ -66,22 +76,11 @@ class TreeVisualizer:
         else:
             self.info_font = pygame.font.SysFont('Arial', 14)
     
-    def tree_hash(self, root_node):
-        """计算行为树的哈希值，用于检测变化"""
-        if not root_node:
-            return 0
-            
-        result = hash(root_node.__class__.__name__ + root_node.name)
-        
-        if hasattr(root_node, 'children') and root_node.children:
-            for child in root_node.children:
-                result ^= self.tree_hash(child)
-                
-        return result
-        
     def calculate_layout(self, root_node):
         """计算行为树节点的位置和大小"""
         self.nodes_info = {}
+        # 各节点子树宽度，只在布局计算期间使用，不写到节点上
+        self.subtree_widths = {}
         
         # 执行递归布局算法
         self._calculate_subtree_width(root_node)
@@ -107,8 +106,8 @@ class TreeVisualizer:
         if self.scale_factor < 1.0:
             self._apply_scaling()
         
-        # 计算树哈希值，用于检测变化
-        self.last_tree_hash = self.tree_hash(root_node)
+        # 记录结构版本，用于检测变化
+        self.last_structure = (root_node, root_node.structure_version)
         self.needs_recalculation = False
         
         return self.nodes_info
@@ -129,7 +128,7 @@ class TreeVisualizer:
         if not hasattr(node, 'children') or not node.children:
             # 叶子节点宽度
             min_width = self.node_width + self.horizontal_spacing // 2  # 给叶子节点额外空间
-            node.subtree_width = min_width
+            self.subtree_widths[node] = min_width
             return min_width
             
         # 计算所有子节点的总宽度
@@ -154,10 +153,11 @@ class TreeVisualizer:
         
         # 如果只有一个子节点，确保父节点比子节点宽
         if len(node.children) == 1:
-            min_node_width = max(min_node_width, node.children[0].subtree_width + self.horizontal_spacing // 2)
+            min_node_width = max(min_node_width, self.subtree_widths[node.children[0]] + self.horizontal_spacing // 2)
             
-        node.subtree_width = max(total_width, min_node_width)
-        return node.subtree_width
+        width = max(total_width, min_node_width)
+        self.subtree_widths[node] = width
+        return width
         
     def _assign_positions(self, node, x_start, x_end, level):
         """为节点分配位置"""
@@ -181,7 +181,7 @@ class TreeVisualizer:
             current_x = x_start
             
             # 如果子节点总宽度小于可用宽度，则在每个子节点之间添加额外的间距
-            total_subtree_width = sum(child.subtree_width for child in node.children)
+            total_subtree_width = sum(self.subtree_widths[child] for child in node.children)
             extra_spacing = 0
             
             if total_subtree_width < available_width:
@@ -189,23 +189,67 @@ class TreeVisualizer:
             
             for child in node.children:
                 # 计算子节点所需宽度占比，同时考虑额外间距
-                child_width = child.subtree_width
+                child_width = self.subtree_widths[child]
                 
                 # 为子节点分配位置
                 self._assign_positions(child, current_x, current_x + child_width, level + 1)
                 current_x += child_width + self.horizontal_spacing + extra_spacing
         
-    def render(self, surface, root_node, active_node=None):
-        """渲染行为树"""
+    def render(self, surface, root_node, active_path=None):
+        """
+        渲染行为树
+        
+        连接线、节点和标签预先绘制在离屏的静态表面上，只在结构或缩放变化时重建；
+        每帧只把高亮发生变化的节点从静态表面恢复，再叠加当前高亮的节点。
+        
+        参数:
+            surface: 目标表面
+            root_node: 行为树根节点
+            active_path: 从根节点到运行中叶子的节点列表，这些节点会被高亮
+        
+        返回:
+            本次重绘的区域列表（surface坐标），结构和高亮都没有变化时返回空列表
+        """
         # 检测树结构是否发生变化，如果变化则重新计算布局
-        current_hash = self.tree_hash(root_node)
-        if current_hash != self.last_tree_hash:
+        if (root_node, root_node.structure_version) != self.last_structure:
             self.needs_recalculation = True
         
         # 确保节点布局已计算
-        if self.needs_recalculation or not hasattr(self, 'nodes_info') or not self.nodes_info:
+        relayout = self.needs_recalculation or not hasattr(self, 'nodes_info') or not self.nodes_info
+        if relayout:
             self.calculate_layout(root_node)
             
+        rebuild = (relayout or self.static_surface is None
+                   or self.static_surface.get_size() != surface.get_size())
+        if rebuild:
+            self._build_static_surface(surface.get_size(), root_node)
+            
+        # 高亮的节点（活动路径）及其状态决定了除静态表面以外的全部绘制内容
+        render_key = tuple((node, getattr(node, 'status', None)) for node in active_path or ()
+                           if node in self.nodes_info)
+        full = rebuild or surface is not self.last_surface
+        if not full and render_key == self.last_render_key:
+            return []
+            
+        if full:
+            surface.blit(self.static_surface, (0, 0))
+            dirty_rects = [surface.get_rect()]
+        else:
+            # 先恢复高亮变化的节点区域，再统一绘制高亮，避免相邻节点的恢复覆盖高亮
+            changed = {node for node, _ in self.last_render_key} | {node for node, _ in render_key}
+            dirty_rects = [self.node_bounds[node] for node in changed]
+            for rect in dirty_rects:
+                surface.blit(self.static_surface, rect, rect)
+                
+        for node, _ in render_key:
+            self._draw_node(surface, node, self._highlight_color(node))
+            
+        self.last_surface = surface
+        self.last_render_key = render_key
+        return dirty_rects
+        
+    def _build_static_surface(self, size, root_node):
+        """把连接线、所有节点（未高亮状态）和树结构信息绘制到离屏表面"""
         # 根据缩放因子更新字体大小
         if self.scale_factor < 1.0:
             scaled_font_size = max(int(self.font_size * (0.8 + self.scale_factor * 0.2)), 10)
@@ -217,18 +261,31 @@ class TreeVisualizer:
                 self.info_font = self.font
             except Exception as e:
                 print(f"调整字体大小失败: {e}")
+                
+        # 预先渲染所有节点标签，并记录每个节点（含标签）覆盖的区域
+        self.node_labels = {}
+        self.node_bounds = {}
+        for node, info in self.nodes_info.items():
+            labels = self._render_label(node)
+            bounds = pygame.Rect(info['x'], info['y'], info['width'], info['height'])
+            for _, text_rect in labels:
+                bounds.union_ip(text_rect)
+            self.node_labels[node] = labels
+            self.node_bounds[node] = bounds.clip(pygame.Rect((0, 0), size))
             
+        self.static_surface = pygame.Surface(size)
+        
         # 清除表面
-        surface.fill(self.colors['background'])
+        self.static_surface.fill(self.colors['background'])
         
         # 渲染连接线
-        self._render_connections(surface, root_node)
+        self._render_connections(self.static_surface, root_node)
         
         # 渲染节点
-        self._render_nodes(surface, root_node, active_node)
+        self._render_nodes(self.static_surface, root_node)
         
         # 渲染树结构信息
-        self._render_tree_info(surface, root_node)
+        self._render_tree_info(self.static_surface, root_node)
         
     def handle_click(self, x, y, root_node, cat_instance=None):
         """处理点击事件，检查是否点击到节点，如果是则返回该节点"""
@@ -422,56 +479,44 @@ class TreeVisualizer:
             # 递归处理子节点
             self._render_connections(surface, child)
             
-    def _render_nodes(self, surface, node, active_node=None):
-        """渲染节点"""
-        if node not in self.nodes_info:
-            return
-            
-        node_info = self.nodes_info[node]
-        x, y = node_info['x'], node_info['y']
-        width, height = node_info['width'], node_info['height']
-        
-        # 确定是否是活动节点 - 不仅检查当前节点，还要递归查找到叶节点
-        is_active_node = False
-        if active_node is not None:
-            is_active_node = node == active_node
-            
-            # 如果当前节点是sleep_node且猫处于sleeping状态，强制高亮
-            if hasattr(node, 'name') and node.name == "sleep" and hasattr(node, 'cat'):
-                if node.cat.state == "sleeping":
-                    is_active_node = True
-            
-            # 同样对于其他叶节点也检查对应状态
-            if hasattr(node, 'name') and hasattr(node, 'cat'):
-                if node.name == "play" and node.cat.state == "playing":
-                    is_active_node = True
-                elif node.name == "wander" and node.cat.state == "wandering":
-                    is_active_node = True
-        
-        # 根据节点类型确定基础颜色
+    def _base_color(self, node):
+        """根据节点类型确定未高亮时的颜色"""
         base_color = self.colors['inactive']  # 默认为灰色
         if node.__class__.__name__ == 'Sequence':
             base_color = self.colors['sequence']
         elif node.__class__.__name__ == 'Selector':
             base_color = self.colors['selector']
+        return base_color
+        
+    def _highlight_color(self, node):
+        """当前活动节点使用特定颜色高亮显示"""
+        if hasattr(node, 'status'):
+            if node.status == NodeStatus.RUNNING:
+                return self.colors['running']
+            elif node.status == NodeStatus.SUCCESS:
+                return self.colors['success']
+            elif node.status == NodeStatus.FAILURE:
+                return self.colors['failure']
+        return self.colors['active']
+        
+    def _render_nodes(self, surface, node):
+        """以未高亮的颜色渲染节点及其子树"""
+        if node not in self.nodes_info:
+            return
             
-        # 确定节点颜色 - 根据用户要求修改颜色逻辑
-        if is_active_node:
-            # 当前活动节点使用特定颜色高亮显示
-            if hasattr(node, 'status'):
-                if node.status == NodeStatus.RUNNING:
-                    color = self.colors['running']
-                elif node.status == NodeStatus.SUCCESS:
-                    color = self.colors['success']
-                elif node.status == NodeStatus.FAILURE:
-                    color = self.colors['failure']
-                else:
-                    color = self.colors['active']
-            else:
-                color = self.colors['active']
-        else:
-            # 非活动节点使用基础颜色
-            color = base_color
+        self._draw_node(surface, node, self._base_color(node))
+        
+        # 递归渲染子节点
+        if hasattr(node, 'children') and node.children:
+            for child in node.children:
+                if child in self.nodes_info:  # 确保子节点在布局信息中
+                    self._render_nodes(surface, child)
+                    
+    def _draw_node(self, surface, node, color):
+        """用指定颜色绘制单个节点及其预渲染的标签"""
+        node_info = self.nodes_info[node]
+        x, y = node_info['x'], node_info['y']
+        width, height = node_info['width'], node_info['height']
         
         # 根据节点类型绘制不同形状的节点
         if node.__class__.__name__ == 'Sequence' or node.__class__.__name__ == 'Selector':
@@ -482,6 +527,20 @@ class TreeVisualizer:
             # 叶节点使用矩形
             pygame.draw.rect(surface, color, (x, y, width, height))
             pygame.draw.rect(surface, self.colors['text'], (x, y, width, height), 2)
+            
+        for text, text_rect in self.node_labels[node]:
+            surface.blit(text, text_rect)
+            
+    def _render_label(self, node):
+        """
+        渲染节点名称
+        
+        返回:
+            [(文字Surface, 位置Rect), ...]
+        """
+        node_info = self.nodes_info[node]
+        x, y = node_info['x'], node_info['y']
+        width, height = node_info['width'], node_info['height']
         
         # 绘制节点名称
         name = node.name if hasattr(node, 'name') else node.__class__.__name__
@@ -513,17 +572,16 @@ class TreeVisualizer:
                     text1 = self.font.render(lines[0], True, self.colors['text'])
                     text1_rect = text1.get_rect(centerx=x + width//2, 
                                               centery=y + height//2 - line_height//2)
-                    surface.blit(text1, text1_rect)
                     # 渲染第二行
                     text2 = self.font.render(lines[1], True, self.colors['text'])
                     text2_rect = text2.get_rect(centerx=x + width//2, 
                                               centery=y + height//2 + line_height//2)
-                    surface.blit(text2, text2_rect)
+                    return [(text1, text1_rect), (text2, text2_rect)]
                 else:
                     # 单行渲染
                     text = self.font.render(name, True, self.colors['text'])
                     text_rect = text.get_rect(center=(x + width//2, y + height//2))
-                    surface.blit(text, text_rect)
+                    return [(text, text_rect)]
             else:
                 # 如果不支持中文，使用简化的英文替代
                 if name == "观察并检索周围物品":
@@ -545,7 +603,7 @@ class TreeVisualizer:
                 
                 text = pygame.font.SysFont('Arial', self.font_size).render(name, True, self.colors['text'])
                 text_rect = text.get_rect(center=(x + width//2, y + height//2))
-                surface.blit(text, text_rect)
+                return [(text, text_rect)]
         except Exception as e:
             print(f"节点名称渲染错误 '{name}': {e}")
             # 错误情况下，回退到简单的文本渲染
@@ -553,51 +611,4 @@ class TreeVisualizer:
             fallback_text = pygame.font.SysFont('Arial', self.font_size).render(
                 fallback_name, True, self.colors['text'])
             fallback_rect = fallback_text.get_rect(center=(x + width//2, y + height//2))
-            surface.blit(fallback_text, fallback_rect)
-        
-        # 递归渲染子节点
-        if hasattr(node, 'children') and node.children:
-            for child in node.children:
-                if child in self.nodes_info:  # 确保子节点在布局信息中
-                    self._render_nodes(surface, child, active_node)
-                
-    def find_active_nodes(self, node):
-        """查找当前活动的节点（状态为RUNNING的节点）"""
-        active_nodes = []
-        
-        # 添加当前节点如果它是RUNNING状态
-        if hasattr(node, 'status') and node.status == NodeStatus.RUNNING:
-            active_nodes.append(node)
-            
-        # 检查是否为复合节点，如果是则递归查找
-        if hasattr(node, 'children') and node.children:
-            # 首先检查和添加复合节点本身
-            if hasattr(node, 'status') and node.status == NodeStatus.RUNNING:
-                if node not in active_nodes:  # 避免重复添加
-                    active_nodes.append(node)
-            
-            # 对于Sequence和Selector，找到当前正在执行的子节点
-            if hasattr(node, 'current_child') and 0 <= node.current_child < len(node.children):
-                active_child = node.children[node.current_child]
-                
-                # 如果当前子节点处于RUNNING状态，添加它及其所有父节点
-                if hasattr(active_child, 'status') and active_child.status == NodeStatus.RUNNING:
-                    active_nodes.append(active_child)
-                
-                # 递归搜索当前活动子节点
-                active_nodes.extend(self.find_active_nodes(active_child))
-            
-            # 对于其他类型的节点或者确保全面检查，遍历所有子节点
-            else:
-                for child in node.children:
-                    if hasattr(child, 'status') and child.status == NodeStatus.RUNNING:
-                        active_nodes.append(child)
-                    active_nodes.extend(self.find_active_nodes(child))
-        
-        # 确保没有重复节点
-        unique_active_nodes = []
-        for n in active_nodes:
-            if n not in unique_active_nodes:
-                unique_active_nodes.append(n)
-                
-        return unique_active_nodes 
\ No newline at end of file
+            return [(fallback_text, fallback_rect)]
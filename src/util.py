@@ -1,15 +1,21 @@
 import pygame
 import os
 import sys
+import json
 
 # 确保pygame初始化
 if not pygame.get_init():
     pygame.init()
 
-def load_chinese_font(size=24):
-    """加载中文字体，尝试多种方法"""
-    font = None
-    
+# 字体路径缓存文件，记录每种用途解析到的字体文件及其修改时间
+FONT_CACHE_FILE = os.environ.get("FONT_CACHE_FILE", ".font_cache.json")
+
+def default_font_path():
+    """pygame自带默认字体（pygame.font.Font(None)）的文件路径"""
+    return os.path.join(os.path.dirname(pygame.font.__file__), pygame.font.get_default_font())
+
+def find_chinese_font_path(size=24):
+    """查找能显示中文的字体文件，尝试多种方法，返回字体文件路径"""
     # 方法1: 尝试查找系统中所有可用字体
     try:
         all_fonts = pygame.font.get_fonts()
@@ -27,17 +33,14 @@ def load_chinese_font(size=24):
         'arialunicodems', 'msjh', 'msjhbd', 'msgothic', 'malgun', 'gulim'
     ]
     
-    # 将所有可用字体转换为小写，用于比较
-    all_fonts_lower = [f.lower() for f in all_fonts]
-    
     # 直接尝试加载系统字体
     for font_name in system_fonts:
         try:
-            font = pygame.font.SysFont(font_name, size)
+            path = pygame.font.match_font(font_name)
             # 测试是否能渲染中文
-            if test_font_chinese(font):
+            if path and test_font_chinese(pygame.font.Font(path, size)):
                 print(f"成功加载中文字体: {font_name}")
-                return font
+                return path
         except Exception as e:
             print(f"尝试加载系统字体 {font_name} 失败")
     
@@ -46,10 +49,10 @@ def load_chinese_font(size=24):
         lower_name = font_name.lower()
         if any(keyword in lower_name for keyword in ['sim', 'hei', 'song', 'yuan', 'kai', 'ming', 'han', 'gothic', 'yahei']):
             try:
-                font = pygame.font.SysFont(font_name, size)
-                if test_font_chinese(font):
+                path = pygame.font.match_font(font_name)
+                if path and test_font_chinese(pygame.font.Font(path, size)):
                     print(f"成功加载模糊匹配字体: {font_name}")
-                    return font
+                    return path
             except:
                 continue
     
@@ -57,16 +60,16 @@ def load_chinese_font(size=24):
     generic_fonts = ["sans", "serif", "monospace"]
     for font_name in generic_fonts:
         try:
-            font = pygame.font.SysFont(font_name, size)
-            if test_font_chinese(font):
+            path = pygame.font.match_font(font_name)
+            if path and test_font_chinese(pygame.font.Font(path, size)):
                 print(f"成功加载通用字体: {font_name}")
-                return font
+                return path
         except:
             continue
     
     # 方法4: 使用系统默认字体（可能无法显示中文）
     print("警告: 未找到能显示中文的字体，使用默认字体")
-    return pygame.font.Font(None, size)
+    return default_font_path()
 
 def test_font_chinese(font):
     """测试字体是否能够渲染中文"""
@@ -77,8 +80,8 @@ def test_font_chinese(font):
     except:
         return False
 
-def load_ascii_font(size=24):
-    """加载用于ASCII字符的字体"""
+def find_ascii_font_path():
+    """查找用于ASCII字符的字体文件，返回字体文件路径"""
     # 尝试加载常见的等宽字体，这些字体对ASCII符号的支持较好
     ascii_system_fonts = ['courier', 'couriernew', 'consolas', 'lucidaconsole', 'dejavusansmono', 'monospace']
     
@@ -93,25 +96,84 @@ def load_ascii_font(size=24):
     # 尝试完全匹配的等宽字体
     for font_name in ascii_system_fonts:
         if font_name.lower() in all_fonts_lower:
-            try:
-                font = pygame.font.SysFont(font_name, size)
-                return font
-            except:
-                pass
+            path = pygame.font.match_font(font_name)
+            if path:
+                return path
     
     # 尝试部分匹配的等宽字体
     for font_name in all_fonts:
         lower_name = font_name.lower()
         if any(keyword in lower_name for keyword in ['mono', 'courier', 'console', 'terminal', 'fixed']):
-            try:
-                font = pygame.font.SysFont(font_name, size)
-                return font
-            except:
-                pass
+            path = pygame.font.match_font(font_name)
+            if path:
+                return path
     
     # 如果找不到合适的等宽字体，使用Pygame默认字体
     print("使用默认ASCII字体")
-    return pygame.font.Font(None, size)
+    return default_font_path()
+
+def _read_font_path_cache():
+    try:
+        with open(FONT_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_font_path_cache(entries):
+    try:
+        with open(FONT_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"无法写入字体缓存 {FONT_CACHE_FILE}: {e}")
+
+# 已解析的字体路径: 用途('ascii'/'chinese') -> 字体文件路径
+font_paths = {}
+
+def get_font_path(is_ascii=False):
+    """
+    返回某种用途的字体文件路径
+    
+    查找结果保存在FONT_CACHE_FILE中，字体文件的修改时间不变时直接使用，
+    避免每次启动都枚举系统字体。删除缓存文件即可重新查找。
+    """
+    role = 'ascii' if is_ascii else 'chinese'
+    if role in font_paths:
+        return font_paths[role]
+        
+    entries = _read_font_path_cache()
+    entry = entries.get(role)
+    if entry:
+        try:
+            if os.path.getmtime(entry["path"]) == entry["mtime"]:
+                font_paths[role] = entry["path"]
+                return entry["path"]
+        except (OSError, KeyError, TypeError):
+            pass
+            
+    path = find_ascii_font_path() if is_ascii else find_chinese_font_path()
+    font_paths[role] = path
+    try:
+        entries[role] = {"path": path, "mtime": os.path.getmtime(path)}
+        _write_font_path_cache(entries)
+    except OSError:
+        pass
+    return path
+
+def forget_font_path(is_ascii=False):
+    """丢弃某种用途已解析的字体路径，下次使用时重新查找"""
+    role = 'ascii' if is_ascii else 'chinese'
+    font_paths.pop(role, None)
+    entries = _read_font_path_cache()
+    if entries.pop(role, None) is not None:
+        _write_font_path_cache(entries)
+
+def load_chinese_font(size=24):
+    """加载中文字体"""
+    return pygame.font.Font(get_font_path(False), size)
+
+def load_ascii_font(size=24):
+    """加载用于ASCII字符的字体"""
+    return pygame.font.Font(get_font_path(True), size)
 
 # 创建字体缓存字典
 font_cache = {}
@@ -125,10 +187,13 @@ def get_font(is_ascii=False, size=24):
     
     # 检查缓存中是否已有此字体
     if cache_key not in font_cache:
-        if is_ascii:
-            font_cache[cache_key] = load_ascii_font(size)
-        else:
-            font_cache[cache_key] = load_chinese_font(size)
+        try:
+            font_cache[cache_key] = load_ascii_font(size) if is_ascii else load_chinese_font(size)
+        except (OSError, pygame.error) as e:
+            # 缓存的字体文件无法打开，重新查找
+            print(f"加载字体失败，重新查找: {e}")
+            forget_font_path(is_ascii)
+            font_cache[cache_key] = load_ascii_font(size) if is_ascii else load_chinese_font(size)
     
     return font_cache[cache_key]
 
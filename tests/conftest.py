@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 源码模块以src为根目录平铺导入（与python src/main.py运行时相同）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
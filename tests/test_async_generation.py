@@ -0,0 +1,36 @@
+import threading
+import time
+
+from async_generation import AsyncTreeGenerator
+
+def test_superseded_streaming_request_stops_early():
+    started = threading.Event()
+    progress_calls = {}
+
+    def generate(command, on_progress):
+        started.set()
+        calls = 0
+        for _ in range(100):
+            time.sleep(0.01)
+            calls += 1
+            progress_calls[command] = calls
+            on_progress("preview", {"command": command})
+        return command
+
+    generator = AsyncTreeGenerator(generate, streaming=True)
+    try:
+        generator.submit("old")
+        started.wait(1)
+        generator.submit("new")
+        deadline = time.monotonic() + 5
+        result = None
+        while result is None and time.monotonic() < deadline:
+            result = generator.poll()
+            time.sleep(0.005)
+    finally:
+        generator.shutdown()
+
+    command, tree, error = result
+    assert (command, tree, error) == ("new", "new", None)
+    # 旧请求在下一次报告进度时就结束了，没有跑完100个片段
+    assert progress_calls["old"] < 10
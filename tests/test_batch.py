@@ -0,0 +1,130 @@
+import json
+import os
+
+import pytest
+
+from cat import Cat, CatAgent
+from behavior_tree.actions import ticks_until
+from behavior_tree.batch import BatchEngine
+from behavior_tree.compiler import compile_tree
+from behavior_tree.vectorized import VectorBatchEngine
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 所有叶子都会结束（没有Wander），猫会反复走完整棵树
+FINITE_TREE = {
+    "type": "Selector", "name": "Selector", "children": [
+        {"type": "Sequence", "name": "Sequence", "children": [
+            {"type": "CustomAction", "name": "ObserveItems"},
+            {"type": "CustomAction", "name": "Explore"},
+            {"type": "Selector", "name": "Selector", "children": []},
+        ]},
+        {"type": "Sequence", "name": "Sequence", "children": [
+            {"type": "CustomAction", "name": "Play", "params": [2.0]},
+            {"type": "Sequence", "name": "Sequence", "children": []},
+            {"type": "CustomAction", "name": "AgentDestination"},
+            {"type": "CustomCondition", "name": "IsHungry"},
+        ]},
+    ],
+}
+
+def load_tree(name):
+    if name is None or isinstance(name, dict):
+        return name
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+def make_cat(tree_data):
+    cat = Cat(35, 12, seed=7)
+    if tree_data is not None:
+        cat.apply_behavior_tree(tree_data)
+    cat.resume_running_leaf = True
+    return cat
+
+def visits(active_leaf, tick, count, ticks):
+    """记录每个tick运行的叶子，合并连续重复后返回前count个"""
+    order = []
+    for _ in range(ticks):
+        leaf = active_leaf()
+        if not order or order[-1] is not leaf:
+            order.append(leaf)
+        if len(order) >= count:
+            break
+        tick()
+    return order[:count]
+
+@pytest.mark.parametrize("tree_name", [None, "llm_tree.json", FINITE_TREE],
+                         ids=["default", "llm_tree", "finite"])
+def test_batch_visits_leaves_in_object_tree_order(tree_name):
+    cat = make_cat(load_tree(tree_name))
+    # 批量引擎共享同一棵节点树，叶子可以直接按对象比较
+    engine = BatchEngine(cat.root, 1, seed=7)
+    expected = visits(lambda: cat.active_path()[-1], cat.update, 30, 20000)
+    actual = visits(lambda: engine.get_active_node(0), engine.tick, 30, 20000)
+    assert len(expected) == 30
+    assert [leaf.name for leaf in actual] == [leaf.name for leaf in expected]
+    assert all(a is e for a, e in zip(actual, expected))
+
+def test_batch_uses_json_params():
+    tree = {"type": "Sequence", "name": "Sequence", "children": [
+        {"type": "CustomAction", "name": "Sleep", "params": [2.0]},
+        {"type": "WaitTime", "params": [0.5]},
+        {"type": "CustomAction", "name": "Wander", "params": [1.5]},
+    ]}
+    cat = make_cat(tree)
+    engine = BatchEngine(cat.root, 50, seed=3)
+
+    def ticks_in_first_leaf(active_leaf, tick):
+        first = active_leaf()
+        ticks = 0
+        while active_leaf() is first:
+            tick()
+            ticks += 1
+        return ticks
+
+    expected = ticks_in_first_leaf(lambda: cat.active_path()[-1], cat.update)
+    # 每只猫第一次睡眠都使用JSON中的2.0而不是随机时长
+    assert list(engine.duration) == [2.0] * 50
+    assert ticks_in_first_leaf(lambda: engine.get_active_node(0), engine.tick) == expected
+    assert list(engine.duration) == [0.5] * 50
+    while engine.get_active_node(0).name != "Wander":
+        engine.tick()
+    # Wander的参数是进入时的冷却时间，第一次移动要等冷却结束
+    assert engine.cooldown[0] == 1.5
+
+# 所有会结束的叶子都带JSON参数，叶子时长与随机数无关
+PARAM_TREE = {"type": "Sequence", "name": "Sequence", "children": [
+    {"type": "CustomCondition", "name": "IsTired"},
+    {"type": "CustomAction", "name": "Play", "params": [0.5]},
+    {"type": "WaitTime", "name": "wait", "params": [0.3]},
+    {"type": "ObserveItems", "name": "observe", "params": [0.7]},
+    {"type": "CustomAction", "name": "Sleep", "params": [2]},
+]}
+
+def segments(active_name, tick, ticks):
+    """返回每段连续运行的(叶子名称, tick数)"""
+    runs = []
+    for _ in range(ticks):
+        name = active_name()
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+        tick()
+    return [tuple(run) for run in runs[:-1]]
+
+def test_json_params_apply_on_every_run_in_all_engines():
+    cat = make_cat(PARAM_TREE)
+    agent = CatAgent(35, 12, compile_tree(PARAM_TREE), seed=7)
+    runner = agent.runner
+    batch = BatchEngine(cat.root, 1, seed=7)
+    vector = VectorBatchEngine(cat.root, 1, seed=7)
+
+    expected = segments(lambda: cat.active_path()[-1].name, cat.update, 400)
+    # 每一轮（不只是第一轮）都使用JSON中的时长，计时到达后的下一个tick结束
+    durations = {"IsTired": 1.0, "Play": 0.5, "wait": 0.3, "observe": 0.7, "Sleep": 2}
+    assert len(expected) > 3 * len(durations)
+    assert expected == [(name, ticks_until(0.0, durations[name]) + 1) for name, _ in expected]
+    assert segments(lambda: runner.tree.names[runner.active_leaf()], agent.update, 400) == expected
+    assert segments(lambda: batch.get_active_node(0).name, batch.tick, 400) == expected
+    assert segments(lambda: vector.get_active_node(0).name, vector.tick, 400) == expected
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+from cat import Cat
+from behavior_tree.compiler import compile_tree, CompiledTreeRunner, RUNNING, SUCCESS, FAILURE
+from behavior_tree.node import NodeStatus
+from behavior_tree.registry import TreeValidationError
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 空的复合节点在被访问时立即成功/失败，整棵树会反复走完
+EMPTY_COMPOSITE_TREE = {
+    "type": "Selector", "name": "Selector", "children": [
+        {"type": "Sequence", "name": "Sequence", "children": [
+            {"type": "CustomAction", "name": "ObserveItems"},
+            {"type": "Selector", "name": "empty_selector", "children": []},
+        ]},
+        {"type": "Sequence", "name": "Sequence", "children": [
+            {"type": "Sequence", "name": "empty_sequence", "children": []},
+            {"type": "WaitTime", "name": "wait", "params": [0.2]},
+            {"type": "Selector", "name": "Selector", "children": [
+                {"type": "Selector", "name": "empty_selector", "children": []},
+                {"type": "CustomAction", "name": "Play"},
+            ]},
+        ]},
+    ],
+}
+
+BAD_TREES = [
+    {"type": "Sequence", "children": [
+        {"type": "CustomAction", "name": "Fly"},
+        {"type": "WaitTime", "params": ["x"]},
+        {"type": "Bogus"},
+        {"type": "Selector", "children": "no"},
+        3,
+    ]},
+    {"type": "Root", "children": [{"type": "CustomCondition", "name": "IsFlying"}]},
+    {"name": "missing type"},
+    {"type": "CustomAction", "name": "Sleep", "params": [-1]},
+]
+
+@pytest.mark.parametrize("tree_data", BAD_TREES)
+def test_compile_tree_reports_same_errors_as_cat(tree_data):
+    with pytest.raises(TreeValidationError) as compiled:
+        compile_tree(tree_data)
+    with pytest.raises(TreeValidationError) as built:
+        Cat(35, 12, seed=0).apply_behavior_tree(tree_data)
+    assert compiled.value.errors == built.value.errors
+
+def test_compile_tree_rejects_non_object():
+    with pytest.raises(TreeValidationError):
+        compile_tree([])
+
+def test_compile_tree_accepts_exported_tree():
+    cat = Cat(35, 12, seed=0)
+    tree = compile_tree(json.loads(cat.behavior_tree_to_json()))
+    assert len(tree) > 1
+
+STATUS_NAMES = {RUNNING: "RUNNING", SUCCESS: "SUCCESS", FAILURE: "FAILURE"}
+
+def events(active_name, tick, count):
+    """记录每次换到的叶子和根节点的结束状态，返回前count个"""
+    order = []
+    for _ in range(20000):
+        name = active_name()
+        if not order or order[-1] != ("leaf", name):
+            order.append(("leaf", name))
+        status = tick()
+        if status != "RUNNING":
+            order.append(("root", status))
+        if len(order) >= count:
+            break
+    return order[:count]
+
+@pytest.mark.parametrize("tree_name", [None, "llm_tree.json", EMPTY_COMPOSITE_TREE],
+                         ids=["default", "llm_tree", "empty_composite"])
+def test_runner_visits_leaves_in_object_tree_order(tree_name):
+    cat = Cat(35, 12, seed=5)
+    if isinstance(tree_name, dict):
+        tree_data = tree_name
+    elif tree_name is not None:
+        with open(os.path.join(FIXTURES, tree_name), encoding="utf-8") as f:
+            tree_data = json.load(f)
+    else:
+        tree_data = json.loads(cat.behavior_tree_to_json())
+    cat.apply_behavior_tree(tree_data)
+    runner = CompiledTreeRunner(compile_tree(tree_data), Cat(35, 12, seed=5))
+
+    expected = events(lambda: cat.active_path()[-1].name, lambda: cat.root.tick().value, 60)
+    actual = events(lambda: runner.tree.names[runner.active_leaf()],
+                    lambda: STATUS_NAMES[runner.tick()], 60)
+    assert len(expected) == 60
+    assert actual == expected
+    if tree_name is EMPTY_COMPOSITE_TREE:
+        assert ("root", NodeStatus.SUCCESS.value) in expected
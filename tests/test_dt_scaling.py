@@ -0,0 +1,51 @@
+import pytest
+
+from cat import Cat, CatAgent
+from behavior_tree.batch import BatchEngine
+from behavior_tree.compiler import compile_tree
+from behavior_tree.rng import AgentRandom
+from behavior_tree.vectorized import VectorBatchEngine
+
+# 只有移动节点的行为树：每DEFAULT_DT秒走一格，与每个tick的dt无关
+MOVE_TREE = {"type": "Sequence", "name": "Sequence", "children": [
+    {"type": "CustomAction", "name": "AgentDestination"},
+]}
+
+def object_path(dt, ticks):
+    cat = Cat(35, 12, seed=4)
+    cat.apply_behavior_tree(MOVE_TREE)
+    path = []
+    for _ in range(ticks):
+        cat.update(dt)
+        path.append((cat.x, cat.y))
+    return path
+
+def agent_path(dt, ticks):
+    agent = CatAgent(35, 12, compile_tree(MOVE_TREE), rng=AgentRandom(4, 0))
+    path = []
+    for _ in range(ticks):
+        agent.update(dt)
+        path.append((agent.x, agent.y))
+    return path
+
+def engine_path(engine_class):
+    def run(dt, ticks):
+        cat = Cat(35, 12, seed=0)
+        cat.apply_behavior_tree(MOVE_TREE)
+        engine = engine_class(cat.root, 20, width=80, height=24, seed=4)
+        path = []
+        for _ in range(ticks):
+            engine.tick(dt)
+            path.append(engine.positions())
+        return path
+    return run
+
+@pytest.mark.parametrize("run", [object_path, agent_path, engine_path(BatchEngine),
+                                 engine_path(VectorBatchEngine)],
+                         ids=["object", "compiled", "batch", "numpy"])
+def test_half_dt_walks_same_path_in_same_game_time(run):
+    coarse = run(0.1, 300)
+    fine = run(0.05, 600)
+    # 每两个0.05秒的tick等于一个0.1秒的tick
+    assert fine[1::2] == coarse
+    assert coarse[0] != coarse[-1]
@@ -0,0 +1,41 @@
+import json
+import os
+
+import pytest
+
+from cat import Cat
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def trajectory(cat, ticks, commands=()):
+    """运行ticks次，在指定tick执行modify_behavior，返回每个tick后的(x, y, state)"""
+    commands = dict(commands)
+    result = []
+    for tick in range(ticks):
+        if tick in commands:
+            cat.modify_behavior(commands[tick])
+        cat.update()
+        result.append((cat.x, cat.y, cat.state))
+    return result
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_resuming_executor_matches_plain_update(seed):
+    plain = Cat(35, 12, seed=seed)
+    resuming = Cat(35, 12, seed=seed, resume_running_leaf=True)
+    assert trajectory(resuming, 3000) == trajectory(plain, 3000)
+
+def test_resuming_executor_follows_tree_changes():
+    # 运行中切换行为树、修改子节点列表后，执行器要重新下降
+    commands = [(200, "sleep"), (700, "play"), (1200, "default"), (1600, "wander")]
+    plain = Cat(35, 12, seed=5)
+    resuming = Cat(35, 12, seed=5, resume_running_leaf=True)
+    assert trajectory(resuming, 2500, commands) == trajectory(plain, 2500, commands)
+
+def test_resuming_executor_on_generated_tree():
+    with open(os.path.join(FIXTURES, "llm_tree.json"), encoding="utf-8") as f:
+        tree_data = json.load(f)
+    plain = Cat(35, 12, seed=8)
+    resuming = Cat(35, 12, seed=8, resume_running_leaf=True)
+    plain.apply_behavior_tree(tree_data)
+    resuming.apply_behavior_tree(tree_data)
+    assert trajectory(resuming, 3000) == trajectory(plain, 3000)
@@ -0,0 +1,14 @@
+import pytest
+
+import headless
+
+def state_lines(output):
+    """返回输出中"状态分布"之后的状态名称"""
+    lines = output.split("状态分布:")[1].strip().splitlines()
+    return {line.split(":")[0].strip() for line in lines}
+
+@pytest.mark.parametrize("compiled", [False, True], ids=["object", "compiled"])
+def test_commands_apply_before_simulation(capsys, compiled):
+    argv = ["--ticks", "2000", "--seed", "1", "--command", "sleep", "--command", "sleep"]
+    headless.main(argv + (["--compiled"] if compiled else []))
+    assert "sleeping" in state_lines(capsys.readouterr().out)
@@ -0,0 +1,46 @@
+import pytest
+
+from llm_providers import ProviderRegistry
+from llm_stub_server import StubLLMServer
+
+REQUESTS = 5
+
+@pytest.fixture
+def server(monkeypatch):
+    server = StubLLMServer().start()
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "stub")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", server.url)
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "stub")
+    yield server
+    server.stop()
+
+@pytest.fixture
+def registry():
+    registry = ProviderRegistry(max_retries=0)
+    yield registry
+    registry.close()
+
+def test_anthropic_client_reuses_connections(server, registry):
+    pytest.importorskip("anthropic")
+    for i in range(REQUESTS):
+        response = registry.client("claude").messages.create(
+            model="stub", max_tokens=16, messages=[{"role": "user", "content": f"command {i}"}])
+        assert response.content[0].input["structure"]["type"] == "Root"
+    assert server.requests == REQUESTS
+    assert server.connections == 1
+
+def test_azure_client_reuses_connections(server, registry):
+    pytest.importorskip("openai")
+    for i in range(REQUESTS):
+        response = registry.client("azure").chat.completions.create(
+            model="stub", messages=[{"role": "user", "content": f"command {i}"}])
+        assert response.choices[0].message.tool_calls[0].function.name == "Text2BehaviorTree"
+    assert server.requests == REQUESTS
+    assert server.connections == 1
+
+def test_registry_returns_same_client(server, registry):
+    pytest.importorskip("anthropic")
+    assert registry.client("claude") is registry.client("claude")
+    with pytest.raises(ValueError):
+        registry.client("unknown")
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from cat import Cat, CatAgent
+from behavior_tree.compiler import compile_tree
+from behavior_tree.rng import agent_rng, AgentRandom
+from behavior_tree.scheduler import TickScheduler
+
+TICKS = 400
+
+def snapshot(cats):
+    return [(cat.x, cat.y, cat.state) for cat in cats]
+
+def run_plain(cats, ticks):
+    for _ in range(ticks):
+        for cat in cats:
+            cat.update()
+    return snapshot(cats)
+
+def run_scheduled(cats, ticks):
+    scheduler = TickScheduler(cats)
+    for _ in range(ticks):
+        scheduler.tick()
+    return snapshot(cats), scheduler
+
+@pytest.mark.parametrize("commands", [[], ["sleep", "sleep"]], ids=["default", "sleepy"])
+def test_scheduler_matches_plain_update_for_cats(commands):
+    def make():
+        cats = [Cat(35, 12, rng=agent_rng(9, i)) for i in range(50)]
+        for cat in cats:
+            for command in commands:
+                cat.modify_behavior(command)
+        return cats
+
+    expected = run_plain(make(), TICKS)
+    actual, scheduler = run_scheduled(make(), TICKS)
+    assert actual == expected
+    # 等待中的猫被跳过，实际执行的update少于猫数乘以tick数
+    assert scheduler.updates < 50 * TICKS
+
+def test_scheduler_matches_plain_update_for_shared_agents():
+    template = compile_tree(json.loads(Cat(0, 0, seed=1).behavior_tree_to_json()))
+
+    def make():
+        return [CatAgent(35, 12, template, rng=AgentRandom(9, i)) for i in range(50)]
+
+    expected = run_plain(make(), TICKS)
+    actual, _ = run_scheduled(make(), TICKS)
+    assert actual == expected
@@ -0,0 +1,48 @@
+import json
+import os
+
+import pytest
+
+from cat import Cat
+from behavior_tree.batch import BatchEngine
+from behavior_tree.vectorized import VectorBatchEngine
+from sharded_world import ShardedWorld, shard_ranges
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+COUNT = 1001
+
+def load_tree():
+    with open(os.path.join(FIXTURES, "llm_tree.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+def test_shard_ranges_cover_all_cats():
+    ranges = shard_ranges(1001, 4)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 1001
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert max(end - start for start, end in ranges) - min(end - start for start, end in ranges) <= 1
+
+@pytest.mark.parametrize("vectorized", [False, True], ids=["batch", "numpy"])
+@pytest.mark.parametrize("use_tree", [False, True], ids=["default", "llm_tree"])
+def test_four_shards_match_single_engine(vectorized, use_tree):
+    tree_data = load_tree() if use_tree else None
+    cat = Cat(0, 0, seed=3)
+    if tree_data is not None:
+        cat.apply_behavior_tree(tree_data)
+    engine_class = VectorBatchEngine if vectorized else BatchEngine
+    reference = engine_class(cat.root, COUNT, width=70, height=24, seed=3)
+    for _ in range(200):
+        reference.tick()
+
+    with ShardedWorld(COUNT, tree_data, shards=4, seed=3, vectorized=vectorized) as world:
+        for _ in range(50):
+            world.step(2)
+        # 计算期间读取的是上一次完成的一帧
+        world.begin_step(100)
+        before = world.positions()
+        world.finish_step()
+        assert world.positions() != before
+
+        assert world.tick_count == 200
+        assert world.positions() == [tuple(map(int, p)) for p in reference.positions()]
+        assert [world.get_state(i) for i in range(COUNT)] == [reference.get_state(i) for i in range(COUNT)]
+        assert world.node_ticks == reference.node_ticks
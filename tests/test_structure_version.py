@@ -0,0 +1,45 @@
+from cat import Cat
+from behavior_tree.composite import Sequence, Selector
+from behavior_tree.executor import ResumingExecutor
+
+def test_version_is_per_tree():
+    a = Cat(35, 12, seed=1)
+    b = Cat(35, 12, seed=2)
+    before_a, before_b = a.root.structure_version, b.root.structure_version
+    a.standard_behavior.children.append(Sequence("extra", []))
+    assert a.root.structure_version == before_a + 1
+    assert b.root.structure_version == before_b
+
+def test_nested_change_reaches_root_and_executor():
+    inner = Sequence("inner", [])
+    middle = Selector("middle", [inner])
+    root = Sequence("root", [middle])
+    executor = ResumingExecutor(root)
+    executor.active_path()
+    version = executor.version
+    inner.children.append(Selector("leaf", []))
+    assert root.structure_version == version + 1
+    assert executor.active_path()[-1].name == "leaf"
+    assert executor.version == root.structure_version
+
+def test_other_cats_executor_keeps_cached_path():
+    a = Cat(35, 12, seed=1)
+    b = Cat(35, 12, seed=2)
+    a.resume_running_leaf = b.resume_running_leaf = True
+    for _ in range(20):
+        a.update()
+        b.update()
+    path = b.executor.path
+    a.standard_behavior.children.append(Sequence("extra", []))
+    assert b.executor.active_path() is path
+
+def test_reinserted_branch_restarts_its_wait():
+    cat = Cat(35, 12, seed=3)
+    cat.modify_behavior("sleep")
+    for _ in range(5):
+        cat.update()
+    assert cat.sleep_wait_node.wait_time > 0
+    cat.modify_behavior("play")
+    cat.modify_behavior("sleep")
+    assert cat.sleep_wait_node.wait_time == 0
+    assert cat.sleep_tree.current_child == 0
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import test_claude_tooluse
+from llm_providers import TreeProvider
+from tree_cache import TreeCache, DEFAULT_MAX_ENTRIES
+
+VALID = json.dumps({"structure": {"type": "Root", "name": "BehaviorTree", "children": [
+    {"type": "Sequence", "name": "Sequence", "children": [
+        {"type": "CustomAction", "name": "Sleep", "params": [2.0]},
+    ]},
+]}})
+
+class FixedProvider(TreeProvider):
+    name = "fixed"
+
+    def __init__(self, result):
+        self.result = result
+        self.requests = 0
+
+    def request(self, instruction):
+        self.requests += 1
+        return self.result
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = TreeCache(directory=str(tmp_path))
+    monkeypatch.setattr(test_claude_tooluse, "_tree_cache", cache)
+    return cache
+
+@pytest.mark.parametrize("result", [
+    "{not json",
+    json.dumps({"nodes": []}),
+    json.dumps({"structure": {"type": "Sequence", "name": "Sequence", "children": [
+        {"type": "CustomAction", "name": "Fly"},
+    ]}}),
+    json.dumps({"structure": {"type": "Sequence", "children": [
+        {"type": "CustomAction", "name": "Sleep", "params": [-1]},
+    ]}}),
+], ids=["unparsable", "no_structure", "unknown_action", "bad_param"])
+def test_invalid_result_is_not_cached(cache, result):
+    provider = FixedProvider(result)
+    for _ in range(2):
+        assert test_claude_tooluse.generate_behavior_tree("sleep", provider) == result
+    assert provider.requests == 2
+
+def test_valid_result_is_cached(cache):
+    provider = FixedProvider(VALID)
+    for _ in range(2):
+        assert test_claude_tooluse.generate_behavior_tree("sleep", provider) == VALID
+    assert provider.requests == 1
+
+def test_cache_limits_from_env(monkeypatch):
+    monkeypatch.setenv("BEHAVIOR_TREE_CACHE_TTL", "3600")
+    monkeypatch.setenv("BEHAVIOR_TREE_CACHE_MAX_ENTRIES", "8")
+    cache = TreeCache.from_env()
+    assert cache.ttl == 3600.0
+    assert cache.max_entries == 8
+
+    monkeypatch.delenv("BEHAVIOR_TREE_CACHE_TTL")
+    monkeypatch.delenv("BEHAVIOR_TREE_CACHE_MAX_ENTRIES")
+    cache = TreeCache.from_env()
+    assert cache.ttl is None
+    assert cache.max_entries == DEFAULT_MAX_ENTRIES
@@ -0,0 +1,87 @@
+import json
+
+from cat import Cat
+from tree_stream import TreeStreamParser
+
+# 叶子节点的params写在name之前，截断点可能落在两者之间
+STRUCTURE = {
+    "type": "Root",
+    "name": "BehaviorTree",
+    "children": [{
+        "type": "Selector",
+        "name": "Selector",
+        "children": [
+            {"type": "Sequence", "name": "Sequence", "children": [
+                {"type": "CustomCondition", "name": "IsTired"},
+                {"type": "CustomAction", "params": [2.0], "name": "Sleep"},
+            ]},
+            {"type": "Sequence", "children": [
+                {"type": "WaitTime", "params": [1.5]},
+                {"type": "CustomAction", "params": [3.0], "name": "Play"},
+            ], "name": "Sequence"},
+        ],
+    }],
+}
+PAYLOAD = json.dumps({"structure": STRUCTURE, "nodes": [{"name": "Sleep"}, {"name": "Play"}]})
+
+def leaves(node):
+    """返回子树中所有叶子节点字典"""
+    children = node.get("children")
+    if children is None:
+        return [node]
+    return [leaf for child in children for leaf in leaves(child)]
+
+def stream(chunks):
+    """按stream_tool_input的方式逐段输入，返回(解析器, 所有预览, structure完整时的结构)"""
+    parser = TreeStreamParser()
+    previews = []
+    completed = None
+    for chunk in chunks:
+        structure = parser.feed(chunk)
+        if structure is not None:
+            completed = structure
+        elif not parser.structure_complete:
+            preview = parser.preview()
+            if preview is not None:
+                previews.append(preview)
+    return parser, previews, completed
+
+def test_split_at_every_offset_gives_same_structure():
+    for offset in range(len(PAYLOAD) + 1):
+        parser, _, completed = stream([PAYLOAD[:offset], PAYLOAD[offset:]])
+        assert completed == STRUCTURE, offset
+        assert parser.result() == json.loads(PAYLOAD)
+
+def test_split_at_every_offset_in_three_chunks():
+    step = 7
+    for first in range(0, len(PAYLOAD), step):
+        for second in range(first, len(PAYLOAD), step):
+            parser, _, completed = stream([PAYLOAD[:first], PAYLOAD[first:second], PAYLOAD[second:]])
+            assert completed == STRUCTURE, (first, second)
+
+def test_previews_contain_only_closed_leaves():
+    final_leaves = leaves(STRUCTURE)
+    cat = Cat(35, 12)
+    _, previews, _ = stream(PAYLOAD)
+    assert previews
+    for preview in previews:
+        for leaf in leaves(preview):
+            # 复合节点没有子节点时本身也是叶子
+            if leaf.get("children") == []:
+                continue
+            assert leaf in final_leaves, leaf
+        # 预览总能构建为行为树，不会因为name还没到达而校验失败
+        cat.build_behavior_tree(preview)
+
+def test_previews_grow_monotonically():
+    _, previews, _ = stream(PAYLOAD)
+    counts = [len(leaves(preview)) for preview in previews if preview.get("children")]
+    assert counts == sorted(counts)
+
+def test_partial_is_valid_json_prefix():
+    parser = TreeStreamParser()
+    for ch in PAYLOAD:
+        parser.feed(ch)
+        partial = parser.partial()
+        assert partial is None or isinstance(partial, dict)
+    assert parser.partial() == json.loads(PAYLOAD)
@@ -0,0 +1,93 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from cat import Cat
+from behavior_tree.actions import ticks_until
+from behavior_tree.batch import BatchEngine
+from behavior_tree.vectorized import VectorAgentStreams, VectorBatchEngine, VectorTimers, STATUS_SUCCESS
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 覆盖所有叶子操作码：空的Selector/Sequence（没有时长范围）、Explore和Wander的移动冷却，
+# 前两个分支都以失败结束，猫最终停在Wander上
+ALL_LEAVES_TREE = {
+    "type": "Selector", "name": "Selector", "children": [
+        {"type": "Sequence", "name": "Sequence", "children": [
+            {"type": "CustomAction", "name": "ObserveItems"},
+            {"type": "CustomAction", "name": "Explore"},
+            {"type": "Selector", "name": "Selector", "children": []},
+        ]},
+        {"type": "Sequence", "name": "Sequence", "children": [
+            {"type": "CustomAction", "name": "Play", "params": [2.0]},
+            {"type": "Sequence", "name": "Sequence", "children": []},
+            {"type": "CustomAction", "name": "AgentDestination"},
+            {"type": "CustomAction", "name": "Eat"},
+            {"type": "Selector", "name": "Selector", "children": []},
+        ]},
+        {"type": "CustomAction", "name": "Wander"},
+    ],
+}
+
+def load_tree(name):
+    if isinstance(name, dict):
+        return name
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+def tree_root(tree_data):
+    cat = Cat(35, 12, seed=0)
+    if tree_data is not None:
+        cat.apply_behavior_tree(tree_data)
+    return cat.root
+
+@pytest.mark.parametrize("tree_name", [None, "llm_tree.json", ALL_LEAVES_TREE],
+                         ids=["default", "llm_tree", "all_leaves"])
+@pytest.mark.parametrize("dt", [0.1, 0.05, 0.25])
+def test_vector_engine_matches_batch_engine(tree_name, dt):
+    root = tree_root(load_tree(tree_name) if tree_name else None)
+    batch = BatchEngine(root, 64, seed=42)
+    vector = VectorBatchEngine(root, 64, seed=42)
+    for tick in range(400):
+        batch.tick(dt)
+        vector.tick(dt)
+        assert list(batch.x) == vector.x.tolist(), tick
+        assert list(batch.y) == vector.y.tolist(), tick
+        assert list(batch.state) == vector.state.tolist(), tick
+        assert list(batch.cursor) == vector.cursor.tolist(), tick
+    # 两个引擎每只猫消耗的随机数个数相同
+    assert list(batch.streams.counters) == vector.streams.counters.tolist()
+    assert batch.node_ticks == vector.node_ticks
+
+def test_vector_timers_finish_on_same_tick_as_scalar_timers():
+    count = 200
+    timers = VectorTimers(count, VectorAgentStreams(5, count))
+    index = np.arange(count)
+    integer = np.arange(count) % 2 == 0
+    timers.restart(index, np.full(count, 0.5), np.full(count, 3.0), integer, np.ones(count, dtype=bool))
+    # 标量节点从0开始每次累加dt，到时后的下一个tick返回SUCCESS
+    expected = [ticks_until(0.0, duration) + 1 for duration in timers.duration]
+    finished = np.zeros(count, dtype=np.int64)
+    active = np.ones(count, dtype=bool)
+    for tick in range(1, 40):
+        status = timers.advance(active)
+        done = active & (status == STATUS_SUCCESS)
+        finished[done] = tick
+        active &= ~done
+    assert finished.tolist() == expected
+
+@pytest.mark.parametrize("engine_class", [BatchEngine, VectorBatchEngine])
+def test_sharded_engines_match_single_engine(engine_class):
+    root = tree_root(ALL_LEAVES_TREE)
+    full = engine_class(root, 100, seed=42)
+    shards = [engine_class(root, 30, seed=42, first_agent=0),
+              engine_class(root, 70, seed=42, first_agent=30)]
+    for _ in range(500):
+        full.tick()
+        for shard in shards:
+            shard.tick()
+    assert full.positions() == shards[0].positions() + shards[1].positions()
+    assert ([full.get_state(i) for i in range(100)] ==
+            [shard.get_state(i) for shard in shards for i in range(shard.count)])